@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+
+try:
+    import pyarrow as pa  # also installed with streamlit
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+import db
+
+# --- Analytics Snapshots ---
+# Columnar copies of the ledger and the users table for full-history admin
+# analysis, kept in SNAPSHOT_DIR as uncompressed Arrow IPC files so readers
+# memory-map them and only page in the columns they select, without querying
+# the live database at all.
+#
+#   bets-<first id>-<last id>.arrow   one immutable segment per export, holding
+#                                     the bets after the previous high-water mark
+#   users.arrow                       every user, rewritten on each export
+#   manifest.json                     segments, high-water mark, export time
+#
+# Bets never change once settled, so each export only reads ids above the
+# high-water mark (archive partitions included, see db.iter_bets_after).
+# Bets of users deleted later stay in the segments until a full re-export.
+# Segments are merged once there are more than MAX_SEGMENTS of them.
+#
+#   python analytics.py [--full]
+
+SNAPSHOT_DIR = os.environ.get("CRASH_GAME_ANALYTICS_DIR", "analytics")
+
+# Seconds between background exports (0: export only when asked)
+EXPORT_INTERVAL = float(os.environ.get("CRASH_GAME_ANALYTICS_INTERVAL", "600"))
+
+# Rows fetched from the database per record batch
+EXPORT_CHUNK = 100000
+
+# Merge the bet segments into one once there are more than this many
+MAX_SEGMENTS = 32
+
+MANIFEST = "manifest.json"
+USERS_FILE = "users.arrow"
+
+USER_COLUMNS = ("id", "username", "balance", "is_admin", "rounds_played", "total_wagered",
+                "total_won", "created_at", "last_login")
+
+logger = logging.getLogger(__name__)
+
+# One export at a time per process
+_export_lock = threading.Lock()
+
+
+def available():
+    return pa is not None
+
+
+def _bets_schema():
+    return pa.schema([
+        ("id", pa.int64()), ("username", pa.string()), ("bet_amount", pa.float64()),
+        ("cashout_multiplier", pa.float64()), ("win_amount", pa.float64()),
+        ("crash_multiplier", pa.float64()), ("timestamp", pa.string()), ("round_id", pa.int64()),
+    ])
+
+
+def _users_schema():
+    return pa.schema([
+        ("id", pa.int64()), ("username", pa.string()), ("balance", pa.float64()), ("is_admin", pa.int64()),
+        ("rounds_played", pa.int64()), ("total_wagered", pa.float64()), ("total_won", pa.float64()),
+        ("created_at", pa.string()), ("last_login", pa.string()),
+    ])
+
+
+def _batch(rows, schema):
+    # Row tuples from sqlite3 -> one record batch, a column at a time
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+    )
+
+
+def _write(path, batches, schema):
+    # Write record batches to an Arrow IPC file, atomically
+    partial = path + ".part"
+    with pa.OSFile(partial, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+    os.replace(partial, path)
+
+
+def _read(path, columns=None):
+    # Memory-mapped read: only the selected columns are ever paged in
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.select(list(columns)) if columns else table
+
+
+def read_manifest(directory=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"bets_hwm": 0, "segments": [], "bets_rows": 0, "users_rows": 0, "exported_at": None}
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".part", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".part", path)
+
+
+def _compact(directory, manifest):
+    # Merge every bet segment into one file
+    schema = _bets_schema()
+    segments = manifest["segments"]
+    first, last = segments[0]["first_id"], segments[-1]["last_id"]
+    name = f"bets-{first:012d}-{last:012d}.arrow"
+    batches = (batch for s in segments for batch in _read(os.path.join(directory, s["file"])).to_batches())
+    _write(os.path.join(directory, name), batches, schema)
+    for s in segments:
+        if s["file"] != name:
+            os.remove(os.path.join(directory, s["file"]))
+    manifest["segments"] = [{"file": name, "first_id": first, "last_id": last,
+                             "rows": sum(s["rows"] for s in segments)}]
+
+
+def export(directory=SNAPSHOT_DIR, full=False):
+    # Bring the snapshot up to date; returns a dict of stats.
+    # full=True drops the segments and re-exports every bet.
+    if pa is None:
+        raise RuntimeError('Analytics snapshots need pyarrow: pip install pyarrow')
+    with _export_lock:
+        start = time.perf_counter()
+        os.makedirs(directory, exist_ok=True)
+        manifest = read_manifest(directory)
+        if full:
+            for s in manifest["segments"]:
+                os.remove(os.path.join(directory, s["file"]))
+            manifest.update(bets_hwm=0, segments=[], bets_rows=0)
+
+        # New bets since the high-water mark -> one new segment, streamed a
+        # chunk at a time so a first export of the whole ledger stays small
+        schema = _bets_schema()
+        new_rows, first, last = 0, None, manifest["bets_hwm"]
+        partial = os.path.join(directory, "bets-new.arrow.part")
+        with pa.OSFile(partial, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for rows in db.iter_bets_after(manifest["bets_hwm"], EXPORT_CHUNK):
+                writer.write_batch(_batch(rows, schema))
+                new_rows += len(rows)
+                # each chunk is in id order
+                first = rows[0][0] if first is None else min(first, rows[0][0])
+                last = max(last, rows[-1][0])
+        if new_rows:
+            name = f"bets-{first:012d}-{last:012d}.arrow"
+            os.replace(partial, os.path.join(directory, name))
+            manifest["segments"].append({"file": name, "first_id": first, "last_id": last, "rows": new_rows})
+            manifest["bets_hwm"] = last
+            manifest["bets_rows"] += new_rows
+        else:
+            os.remove(partial)
+        if len(manifest["segments"]) > MAX_SEGMENTS:
+            _compact(directory, manifest)
+
+        # Users change in place, so they are rewritten whole (one row per user)
+        users = db.get_user_totals()
+        _write(os.path.join(directory, USERS_FILE), [_batch(users, _users_schema())], _users_schema())
+        manifest["users_rows"] = len(users)
+        manifest["exported_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        _write_manifest(directory, manifest)
+
+        return {
+            "new_bets": new_rows,
+            "bets_rows": manifest["bets_rows"],
+            "users_rows": len(users),
+            "segments": len(manifest["segments"]),
+            "seconds": time.perf_counter() - start,
+        }
+
+
+def load_bets(columns=("bet_amount", "win_amount", "cashout_multiplier", "timestamp"), directory=SNAPSHOT_DIR):
+    # The selected bet columns of the whole snapshot as an Arrow table
+    schema = _bets_schema()
+    manifest = read_manifest(directory)
+    tables = [_read(os.path.join(directory, s["file"]), columns) for s in manifest["segments"]]
+    if not tables:
+        return schema.empty_table().select(list(columns))
+    return pa.concat_tables(tables)
+
+
+def load_users(columns=USER_COLUMNS, directory=SNAPSHOT_DIR):
+    path = os.path.join(directory, USERS_FILE)
+    if not os.path.exists(path):
+        return _users_schema().empty_table().select(list(columns))
+    return _read(path, columns)
+
+
+def with_month(table):
+    # Swap the text timestamp for a dictionary-encoded "YYYY-MM" month, so
+    # pandas gets a categorical to group by instead of millions of strings
+    month = pc.utf8_slice_codeunits(table["timestamp"], 0, 7).dictionary_encode()
+    others = [name for name in table.column_names if name != "timestamp"]
+    return table.select(others).append_column("month", month)
+
+
+def to_pandas(table):
+    # split_blocks keeps pandas from consolidating the columns into one copied
+    # 2-D block, so null-free numeric columns are used in place
+    return table.to_pandas(split_blocks=True)
+
+
+# --- Background Export ---
+class SnapshotExporter:
+    # Runs export() every `interval` seconds on a background thread
+
+    def __init__(self, interval=EXPORT_INTERVAL, directory=SNAPSHOT_DIR):
+        self.interval = interval
+        self.directory = directory
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.failures = 0
+        self.last = None  # stats of the last export
+
+    def _run(self):
+        while True:
+            try:
+                self.last = export(self.directory)
+                self.runs += 1
+            except Exception:
+                self.failures += 1
+                logger.exception("Exporting analytics snapshots to %s failed", self.directory)
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="analytics-export", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export columnar analytics snapshots")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--full", action="store_true", help="re-export every bet instead of only new ones")
+    args = parser.parse_args()
+
+    stats = export(args.dir, full=args.full)
+    print(f"Exported {stats['new_bets']:,} new bets ({stats['bets_rows']:,} total in {stats['segments']} "
+          f"segment(s)) and {stats['users_rows']:,} users to {args.dir} in {stats['seconds']:.2f} s")
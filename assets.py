@@ -0,0 +1,71 @@
+# Static page assets, built once per server process.
+# Streamlit drops any element that a rerun does not emit again, so the markup is
+# still sent on every rerun, but as one pre-built string in a single delta.
+
+# Hide Streamlit menu, footer, and prevent code inspection
+HIDE_CHROME = """
+    <style>
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    header {visibility: hidden;}
+    .stDeployButton {display: none !important;}  /* Hide GitHub button */
+    </style>
+
+    <script>
+    document.addEventListener('contextmenu', event => event.preventDefault());
+    document.onkeydown = function(e) {
+        if (e.ctrlKey && (e.keyCode === 85 || e.keyCode === 83)) {
+            return false;  // Disable "Ctrl + U" (View Source) & "Ctrl + S" (Save As)
+        }
+        if (e.keyCode == 123) {
+            return false;  // Disable "F12" (DevTools)
+        }
+    };
+    </script>
+    """
+
+# Custom CSS for better styling
+CUSTOM_CSS = """
+    <style>
+    /* General Styling */
+    body {
+        font-family: 'Arial', sans-serif;
+        background-color: #f5f5f5;
+    }
+    @keyframes slide {
+        0% { transform: translateX(0%); }
+        100% { transform: translateX(-100%); }
+    }
+    /* Popup CSS */
+    .popup {
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        background-color: #4CAF50;
+        color: white;
+        padding: 15px;
+        border-radius: 5px;
+        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
+        z-index: 1000;
+        animation: fadeInOut 3s ease-in-out;
+    }
+    @keyframes fadeInOut {
+        0% { opacity: 0; }
+        10% { opacity: 1; }
+        90% { opacity: 1; }
+        100% { opacity: 0; }
+    }
+    .admin-button {
+        background-color: #dc3545 !important;
+        color: white !important;
+        border: none !important;
+    }
+    .user-button {
+        background-color: #28a745 !important;
+        color: white !important;
+        border: none !important;
+    }
+    </style>
+    """
+
+PAGE_ASSETS = HIDE_CHROME + CUSTOM_CSS
@@ -0,0 +1,222 @@
+import os
+import hmac
+import time
+import base64
+import hashlib
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# --- Password Hashing ---
+# Passwords are stored as self-describing strings, so cost settings can change
+# without breaking existing accounts:
+#   scrypt$<n>$<r>$<p>$<salt>$<key>            (default, memory-hard)
+#   pbkdf2_sha256$<iterations>$<salt>$<key>
+# salt and key are unpadded base64. Old unsalted SHA-256 hex digests still
+# verify, and any hash not made with the current settings is replaced by a
+# fresh one on the next successful login (see needs_rehash).
+
+# "scrypt" or "pbkdf2_sha256" for new hashes
+PASSWORD_SCHEME = os.environ.get("CRASH_GAME_PASSWORD_SCHEME", "scrypt")
+
+# scrypt cost: N (CPU/memory, a power of two), r (block size), p (parallelism).
+# Memory per hash is about 128 * N * r bytes: 16 MB at the defaults.
+SCRYPT_N = int(os.environ.get("CRASH_GAME_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.environ.get("CRASH_GAME_SCRYPT_R", "8"))
+SCRYPT_P = int(os.environ.get("CRASH_GAME_SCRYPT_P", "1"))
+
+# PBKDF2-HMAC-SHA256 iterations
+PBKDF2_ITERATIONS = int(os.environ.get("CRASH_GAME_PBKDF2_ITERATIONS", "600000"))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# Hashes computed at once, and hashes allowed to wait for a worker before
+# new logins are turned away. Bounds CPU and memory during a login burst.
+HASH_WORKERS = int(os.environ.get("CRASH_GAME_HASH_WORKERS", "4"))
+HASH_QUEUE = int(os.environ.get("CRASH_GAME_HASH_QUEUE", "32"))
+
+# Seconds a caller waits for its hash before giving up
+HASH_TIMEOUT = 10.0
+
+
+class HashingBusy(Exception):
+    # Every hashing worker and queue slot is taken, or the hash waited longer
+    # than HASH_TIMEOUT for a worker; try again shortly
+    pass
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem leaves headroom over the 128 * n * r bytes scrypt needs
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 2 ** 20, dklen=KEY_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=KEY_BYTES)
+
+
+def make_hash(password, scheme=None):
+    # Hash with the current settings on the calling thread (see hash_password)
+    scheme = scheme or PASSWORD_SCHEME
+    salt = os.urandom(SALT_BYTES)
+    if scheme == "scrypt":
+        key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+    if scheme == "pbkdf2_sha256":
+        key = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(key)}"
+    raise ValueError(f"Unknown password scheme: {scheme}")
+
+
+def check_hash(password, stored):
+    # True if `password` matches the stored hash, in constant time
+    if not stored:
+        return False
+    parts = stored.split("$")
+    if parts[0] == "scrypt" and len(parts) == 6:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        key = _scrypt(password, _unb64(parts[4]), n, r, p)
+        return hmac.compare_digest(key, _unb64(parts[5]))
+    if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+        key = _pbkdf2(password, _unb64(parts[2]), int(parts[1]))
+        return hmac.compare_digest(key, _unb64(parts[3]))
+    if len(stored) == 64:
+        # Legacy unsalted SHA-256 hex digest
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    return False
+
+
+@functools.lru_cache(maxsize=1)
+def dummy_hash():
+    # Checked against when the username doesn't exist, so the response time
+    # doesn't reveal which usernames are taken
+    return make_hash(os.urandom(16).hex())
+
+
+def needs_rehash(stored):
+    # True for legacy hashes and hashes made with other cost settings
+    parts = (stored or "").split("$")
+    if PASSWORD_SCHEME == "scrypt":
+        return parts[:4] != ["scrypt", str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+    return parts[:2] != ["pbkdf2_sha256", str(PBKDF2_ITERATIONS)]
+
+
+# --- Hashing Pool ---
+class HashingPool:
+    # Runs hashes on a few worker threads. hashlib's scrypt and pbkdf2_hmac
+    # release the GIL, so other sessions' reruns keep going while a login
+    # waits for its hash, and a burst of logins can't use more than
+    # `workers` hashes' worth of CPU and memory.
+
+    def __init__(self, workers=HASH_WORKERS, queue_size=HASH_QUEUE):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self.hashed = 0
+        self.rejected = 0
+
+    def run(self, fn, *args, timeout=HASH_TIMEOUT):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy("The server is busy, please try again in a moment.")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            # The hash still finishes (and frees its slot); this caller stops waiting
+            self.rejected += 1
+            raise HashingBusy("The server is busy, please try again in a moment.") from None
+        self.hashed += 1
+        return result
+
+
+hashing_pool = HashingPool()
+
+
+def hash_password(password):
+    return hashing_pool.run(make_hash, password)
+
+
+def verify_password(password, stored):
+    return hashing_pool.run(check_hash, password, stored)
+
+
+# --- Login Rate Limiting ---
+class LoginRateLimiter:
+    # At most `max_failures` failed logins per username, and
+    # `max_client_failures` per client address, within `window` seconds;
+    # further attempts are refused until enough failures age out. Failures
+    # are kept in memory, per server process. Only keys with a failure inside
+    # the window are kept, and at most `max_keys` of them (least recently
+    # failed dropped first), so submitting random usernames can't grow it.
+
+    def __init__(self, max_failures=5, window=300.0, max_client_failures=20, max_keys=100000):
+        self.max_failures = max_failures
+        self.max_client_failures = max_client_failures
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # ("user", username) / ("client", address) -> monotonic times of recent
+        # failures, least recently failed key first
+        self._failures = OrderedDict()
+
+    def _limits(self, username, client):
+        limits = [(("user", username), self.max_failures)]
+        if client:
+            limits.append((("client", client), self.max_client_failures))
+        return limits
+
+    def _prune(self, now):
+        # Expired keys sit at the front, behind every key that failed later
+        while self._failures:
+            key, times = next(iter(self._failures.items()))
+            if now - times[-1] < self.window and len(self._failures) <= self.max_keys:
+                return
+            del self._failures[key]
+
+    def retry_after(self, username, client=None, now=None):
+        # Seconds until `username` (from `client`) may try again (0.0 if allowed now)
+        now = time.monotonic() if now is None else now
+        wait = 0.0
+        with self._lock:
+            self._prune(now)
+            for key, limit in self._limits(username, client):
+                recent = [t for t in self._failures.get(key, ()) if now - t < self.window]
+                if len(recent) >= limit:
+                    wait = max(wait, self.window - (now - recent[-limit]))
+        return wait
+
+    def failed(self, username, client=None, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for key, limit in self._limits(username, client):
+                times = [t for t in self._failures.pop(key, ()) if now - t < self.window]
+                times.append(now)
+                self._failures[key] = times[-limit:]
+            self._prune(now)
+
+    def succeeded(self, username):
+        # Only the username's failures: a client's count isn't reset by logging into its own account
+        with self._lock:
+            self._failures.pop(("user", username), None)
+
+
+login_limiter = LoginRateLimiter(
+    max_failures=int(os.environ.get("CRASH_GAME_LOGIN_MAX_FAILURES", "5")),
+    window=float(os.environ.get("CRASH_GAME_LOGIN_WINDOW", "300")),
+    max_client_failures=int(os.environ.get("CRASH_GAME_LOGIN_MAX_CLIENT_FAILURES", "20")),
+)
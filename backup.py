@@ -0,0 +1,233 @@
+import os
+import gzip
+import time
+import shutil
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import db
+from storage import SQLiteBackend
+
+# --- Online Backup ---
+# Copies the live SQLite database with the online backup API, a few pages at a
+# time, while the game keeps writing. The copy runs inside one read
+# transaction on its own connection: under WAL that pins a consistent snapshot
+# without blocking writers, and it stops SQLite from restarting the copy every
+# time a bet commits mid-backup. A short pause between steps leaves the disk
+# to the live traffic. Snapshots go to BACKUP_DIR as
+# crash_game-YYYYmmdd-HHMMSS.db[.gz]; only the newest BACKUP_KEEP are kept.
+#
+# While a backup holds its snapshot, WAL checkpoints can't get past it, so
+# the -wal file grows until the backup finishes.
+#
+#   python backup.py [--dir backups] [--no-compress]
+
+BACKUP_DIR = os.environ.get("CRASH_GAME_BACKUP_DIR", "backups")
+
+# Pages copied per step (-1: everything in one step), and seconds to pause between steps
+BACKUP_PAGES = int(os.environ.get("CRASH_GAME_BACKUP_PAGES", "256"))
+BACKUP_PAUSE = float(os.environ.get("CRASH_GAME_BACKUP_PAUSE", "0.005"))
+
+# Snapshots kept in BACKUP_DIR; older ones are deleted after each backup
+BACKUP_KEEP = int(os.environ.get("CRASH_GAME_BACKUP_KEEP", "7"))
+
+# Seconds between scheduled snapshots (0: no scheduled snapshots)
+BACKUP_INTERVAL = float(os.environ.get("CRASH_GAME_BACKUP_INTERVAL", "0"))
+
+# gzip level for compressed snapshots (1 fastest .. 9 smallest)
+COMPRESS_LEVEL = int(os.environ.get("CRASH_GAME_BACKUP_COMPRESS_LEVEL", "6"))
+
+# How often the stall probe tries to take the write lock during a backup
+PROBE_INTERVAL = 0.02
+
+SNAPSHOT_PREFIX = "crash_game-"
+SNAPSHOT_SUFFIXES = (".db", ".db.gz")
+
+logger = logging.getLogger(__name__)
+
+# One backup at a time per process
+_backup_lock = threading.Lock()
+
+class _StallProbe(threading.Thread):
+    # Opens and commits an empty write transaction every PROBE_INTERVAL while a
+    # backup runs; the slowest one is the longest a real writer would have
+    # waited for the write lock.
+
+    def __init__(self):
+        super().__init__(name="backup-stall-probe", daemon=True)
+        self._done = threading.Event()
+        self.probes = 0
+        self.max_ms = 0.0
+
+    def run(self):
+        while not self._done.wait(PROBE_INTERVAL):
+            start = time.perf_counter()
+            try:
+                with db.transaction():
+                    pass
+            except Exception:
+                logger.exception("Backup stall probe failed")
+                continue
+            self.probes += 1
+            self.max_ms = max(self.max_ms, (time.perf_counter() - start) * 1000)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def list_snapshots(directory=BACKUP_DIR):
+    # [(file name, bytes, modified datetime)], newest first
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIXES):
+            stat = os.stat(os.path.join(directory, name))
+            snapshots.append((name, stat.st_size, datetime.fromtimestamp(stat.st_mtime)))
+    # Names embed the UTC time, so they sort chronologically
+    return sorted(snapshots, reverse=True)
+
+
+def prune(directory=BACKUP_DIR, keep=BACKUP_KEEP):
+    # Delete all but the newest `keep` snapshots; returns the names deleted
+    removed = [name for name, _, _ in list_snapshots(directory)[keep:]]
+    for name in removed:
+        os.remove(os.path.join(directory, name))
+    return removed
+
+
+def _compress(source, target, level=COMPRESS_LEVEL):
+    with open(source, "rb") as src, gzip.open(target, "wb", compresslevel=level) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.remove(source)
+
+
+def backup(directory=BACKUP_DIR, compress=True, pages=BACKUP_PAGES, pause=BACKUP_PAUSE, keep=BACKUP_KEEP):
+    # Snapshot the configured database into `directory`; returns a dict of stats.
+    # Raises RuntimeError for non-SQLite backends or when a backup is already running.
+    backend = db.get_backend()
+    if not isinstance(backend, SQLiteBackend):
+        raise RuntimeError(f"Online backup needs a SQLite database file, not {backend.describe()} "
+                           "(use pg_dump for PostgreSQL)")
+    if not _backup_lock.acquire(blocking=False):
+        raise RuntimeError("A backup is already running")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(directory, f"{SNAPSHOT_PREFIX}{stamp}.db")
+        n = 1
+        while any(os.path.exists(path[:-len(".db")] + suffix) for suffix in SNAPSHOT_SUFFIXES):
+            # Two backups within one second
+            path = os.path.join(directory, f"{SNAPSHOT_PREFIX}{stamp}-{n}.db")
+            n += 1
+        partial = path + ".part"
+
+        steps = []  # seconds spent copying, per step
+        last = [time.perf_counter()]
+
+        def progress(status, remaining, total):
+            now = time.perf_counter()
+            steps.append(now - last[0])
+            if remaining and pause:
+                time.sleep(pause)
+            last[0] = time.perf_counter()
+
+        probe = _StallProbe()
+        src = backend.connect()
+        dst = sqlite3.connect(partial)
+        probe.start()
+        start = time.perf_counter()
+        try:
+            # Pin one snapshot for the whole copy (see the note at the top)
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            last[0] = time.perf_counter()
+            src.backup(dst, pages=pages, progress=progress)
+            src.execute("COMMIT")
+        except BaseException:
+            dst.close()
+            os.remove(partial)
+            raise
+        finally:
+            copy_seconds = time.perf_counter() - start
+            probe.stop()
+            src.close()
+        dst.close()
+
+        db_bytes = os.path.getsize(partial)
+        compress_seconds = 0.0
+        if compress:
+            t0 = time.perf_counter()
+            path += ".gz"
+            _compress(partial, path)
+            compress_seconds = time.perf_counter() - t0
+        else:
+            os.replace(partial, path)
+
+        stats = {
+            "path": path,
+            "db_bytes": db_bytes,
+            "file_bytes": os.path.getsize(path),
+            "copy_seconds": copy_seconds,
+            "compress_seconds": compress_seconds,
+            "mb_per_sec": db_bytes / 1e6 / copy_seconds if copy_seconds else 0.0,
+            "steps": len(steps),
+            "max_step_ms": max(steps, default=0.0) * 1000,
+            "max_writer_stall_ms": probe.max_ms,
+            "writer_probes": probe.probes,
+            "pruned": prune(directory, keep),
+        }
+        return stats
+    finally:
+        _backup_lock.release()
+
+
+# --- Scheduled Snapshots ---
+class BackupScheduler:
+    # Takes a snapshot every `interval` seconds on a background thread
+
+    def __init__(self, interval=BACKUP_INTERVAL, directory=BACKUP_DIR):
+        self.interval = interval
+        self.directory = directory
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.failures = 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                backup(self.directory)
+                self.runs += 1
+            except Exception:
+                self.failures += 1
+                logger.exception("Scheduled backup to %s failed", self.directory)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Online backup of the crash game database")
+    parser.add_argument("--dir", default=BACKUP_DIR, help="directory for the snapshot")
+    parser.add_argument("--no-compress", action="store_true", help="write a plain .db file instead of .db.gz")
+    args = parser.parse_args()
+
+    stats = backup(args.dir, compress=not args.no_compress)
+    print(f"Wrote {stats['path']} ({stats['db_bytes'] / 1e6:.1f} MB in {stats['copy_seconds']:.2f} s, "
+          f"{stats['mb_per_sec']:.1f} MB/s, {stats['steps']} steps, "
+          f"max writer stall {stats['max_writer_stall_ms']:.1f} ms)")
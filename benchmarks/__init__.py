@@ -0,0 +1,4 @@
+# Benchmarks for the crash game. Run them from the repository root, e.g.
+#   python -m benchmarks.db_pool
+# Every benchmark works on a throwaway database so the live
+# crash_game_secure.db is never touched.
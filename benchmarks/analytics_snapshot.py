@@ -0,0 +1,63 @@
+# Columnar analytics snapshots (needs pyarrow): a full export of the ledger,
+# an incremental export after more bets settle, and loading the Game
+# Statistics columns from the memory-mapped snapshot versus fetching the same
+# rows from the database into pandas.
+#
+#   python -m benchmarks.analytics_snapshot [--users 2000] [--bets 1000000]
+import time
+import random
+import argparse
+import tempfile
+
+import db
+import analytics
+from benchmarks.common import temp_database, timed, report
+from benchmarks.seed_data import seed
+
+COLUMNS = ("bet_amount", "win_amount", "cashout_multiplier", "timestamp")
+
+
+def sql_load():
+    # The row-at-a-time alternative: every bet through sqlite3 tuples into pandas
+    import pandas as pd
+
+    rows = [row for chunk in db.iter_bets_after(0) for row in chunk]
+    return pd.DataFrame([(r[2], r[4], r[3], r[6]) for r in rows], columns=list(COLUMNS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics snapshot benchmark")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--bets", type=int, default=1000000)
+    parser.add_argument("--new-bets", type=int, default=10000, help="bets settled before the incremental export")
+    args = parser.parse_args()
+    if not analytics.available():
+        raise SystemExit("pyarrow is not installed")
+
+    temp_database()
+    seed(args.users, args.bets)
+    directory = tempfile.mkdtemp(prefix="crash_analytics_")
+
+    full = analytics.export(directory)
+    rng = random.Random(3)
+    db.settle_bets([(f"player{rng.randrange(args.users)}", 10.0, 1.5, 15.0, 2.0) for _ in range(args.new_bets)])
+    incremental = analytics.export(directory)
+
+    load_seconds, df = timed(lambda: analytics.to_pandas(analytics.load_bets(COLUMNS, directory)))
+    month_seconds, _ = timed(lambda: analytics.to_pandas(analytics.with_month(analytics.load_bets(COLUMNS, directory)))
+                             .groupby("month", observed=True)["bet_amount"].sum())
+    sql_seconds, sql_df = timed(sql_load)
+    assert len(df) == len(sql_df)
+
+    report(f"{args.bets:,} bets, {args.users:,} users", [
+        ("full export", f"{full['new_bets']:,} bets in {full['seconds']:.2f} s "
+                        f"({full['new_bets'] / full['seconds']:,.0f} bets/sec)"),
+        ("incremental export", f"{incremental['new_bets']:,} bets in {incremental['seconds']:.3f} s"),
+        ("snapshot -> pandas", f"{load_seconds * 1000:,.0f} ms for {len(df):,} rows x {len(COLUMNS)} columns"),
+        ("snapshot -> monthly totals", f"{month_seconds * 1000:,.0f} ms"),
+        ("database -> pandas", f"{sql_seconds * 1000:,.0f} ms"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
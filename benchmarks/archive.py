@@ -0,0 +1,103 @@
+# Ledger archival: moves the bets older than --days into monthly partitions
+# while writers keep committing, then compares the hot-path reads against
+# the unarchived database: My Bets pages (first and deep), the hourly volume
+# chart and delete_user. Checks that totals are unchanged.
+#
+#   python -m benchmarks.archive [--users 2000] [--bets 500000] [--history-days 180] [--days 30]
+import time
+import random
+import argparse
+import threading
+
+import db
+from benchmarks.common import temp_database, percentiles, timed, report
+from benchmarks.seed_data import seed
+
+MY_BETS_PAGE_SIZE = 50
+
+
+def hot_reads(n_users, samples=300):
+    # (first-page, 10th-page, hourly volume) latencies in seconds
+    rng = random.Random(7)
+    first, deep, volume = [], [], []
+    for _ in range(samples):
+        username = f"player{rng.randrange(n_users)}"
+        t, page = timed(db.get_bets_page, username, limit=MY_BETS_PAGE_SIZE)
+        first.append(t)
+        cursor = page[-1][0] if page else None
+        start = time.perf_counter()
+        for _ in range(9):
+            if cursor is None:
+                break
+            page = db.get_bets_page(username, before_id=cursor, limit=MY_BETS_PAGE_SIZE)
+            cursor = page[-1][0] if page else None
+        deep.append(time.perf_counter() - start)
+    for _ in range(20):
+        volume.append(timed(db.get_bet_volume, "hour", 7)[0])
+    return first, deep, volume
+
+
+def with_writer(n_users, fn):
+    # Run fn() while one thread keeps updating balances; returns (result, write latencies)
+    latencies = []
+    done = threading.Event()
+
+    def writer():
+        rng = random.Random()
+        while not done.is_set():
+            t0 = time.perf_counter()
+            db.update_balance(f"player{rng.randrange(n_users)}", 1.0)
+            latencies.append(time.perf_counter() - t0)
+            time.sleep(0.001)
+
+    t = threading.Thread(target=writer)
+    t.start()
+    try:
+        result = fn()
+    finally:
+        done.set()
+        t.join()
+    return result, latencies
+
+
+def hot_rows():
+    with db.connection() as c:
+        return c.execute("SELECT COUNT(*) FROM bets").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ledger archival benchmark")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--bets", type=int, default=500000)
+    parser.add_argument("--history-days", type=int, default=180)
+    parser.add_argument("--days", type=int, default=30, help="archive bets older than this")
+    args = parser.parse_args()
+
+    temp_database()
+    seed(args.users, args.bets, days=args.history_days)
+
+    rows = []
+    for label, victim in (("before", "player0"), ("after", "player1")):
+        if label == "after":
+            totals = db.get_game_stats()
+            (elapsed, moved), latencies = with_writer(args.users, lambda: timed(db.archive_bets, args.days))
+            after = db.get_game_stats()
+            preserved = all(abs(after[k] - totals[k]) <= 1e-9 * abs(totals[k])
+                            for k in ("total_bets", "total_wagered", "total_won"))
+            p50, p99 = percentiles(latencies)
+            rows.append(("archived", f"{moved:,} bets in {elapsed:.1f} s ({moved / elapsed:,.0f}/sec), "
+                                     f"{len(db.get_archive_partitions())} partitions, totals preserved: "
+                                     f"{'yes' if preserved else 'NO'}"))
+            rows.append(("writes during archival", f"p50 / p99 / max {p50:.2f} / {p99:.2f} / "
+                                                   f"{max(latencies, default=0) * 1000:.2f} ms"))
+        first, deep, volume = hot_reads(args.users)
+        rows.append((f"{label}: hot rows", f"{hot_rows():,}"))
+        rows.append((f"{label}: My Bets page 1 p50 / p99", "%.3f / %.3f ms" % percentiles(first)))
+        rows.append((f"{label}: My Bets pages 2-10 p50 / p99", "%.3f / %.3f ms" % percentiles(deep)))
+        rows.append((f"{label}: hourly volume 7d p50 / p99", "%.3f / %.3f ms" % percentiles(volume)))
+        rows.append((f"{label}: delete_user", f"{timed(db.delete_user, victim)[0] * 1000:.2f} ms"))
+    report(f"{args.users:,} users, {args.bets:,} bets over {args.history_days} days, archive after {args.days}", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Runs the same repository workload against one or more storage backends and
+# checks the results agree: migrations, sign-ups, bets, settled rounds and the
+# maintained statistics (compared with a full rebuild). Also reports settled
+# bets/sec so backends can be compared.
+#
+#   python -m benchmarks.backends [--rounds 200] [--players 50] [targets ...]
+#
+# Targets are CRASH_GAME_DB values; the default runs a SQLite file and memory://.
+# For PostgreSQL, point at an empty local database you can throw away:
+#   python -m benchmarks.backends postgresql://localhost/crash_test
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import db
+import engine
+from benchmarks.common import report
+
+
+def workload(n_players, n_rounds, seed=7):
+    rng = random.Random(seed)
+    db.init_db()
+    players = [f"player{i}" for i in range(n_players)]
+    for username in players:
+        assert db.add_user(username, "secret")
+    assert not db.add_user(players[0], "secret"), "duplicate username accepted"
+    assert db.verify_user(players[0], "secret") is not None
+
+    start = time.perf_counter()
+    settled = 0
+    for _ in range(n_rounds):
+        crash = round(rng.uniform(1.0, 5.0), 2)
+        settlements = []
+        for username in rng.sample(players, min(10, n_players)):
+            bet = float(rng.randint(10, 100))
+            if not db.place_bet(username, bet):
+                continue
+            cashout = round(rng.uniform(1.0, 3.0), 2)
+            win = bet * cashout if engine.target_reached(cashout, crash) else 0.0
+            settlements.append((username, bet, cashout if win else crash, win, crash))
+        db.record_round(crash, settlements)
+        settled += len(settlements)
+    elapsed = time.perf_counter() - start
+
+    db.update_last_login(players[0])
+    db.delete_user(players[-1])
+    maintained = db.get_game_stats()
+    db.rebuild_stats()
+    rebuilt = db.get_game_stats()
+    return {
+        "settled": settled,
+        "elapsed": elapsed,
+        "stats": rebuilt,
+        "stats_ok": all(abs(maintained[k] - rebuilt[k]) < 1e-6 for k in rebuilt),
+        "leaderboard": db.get_leaderboard.uncached(limit=10),
+        "rank": db.get_user_rank.uncached(players[0]),
+        "history": [row[1:5] for row in db.get_bets_page(players[0], limit=20)],
+        "volume": db.get_bet_volume("week")[1:],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage backend conformance check")
+    parser.add_argument("targets", nargs="*")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--players", type=int, default=50)
+    args = parser.parse_args()
+
+    targets = args.targets or [os.path.join(tempfile.mkdtemp(prefix="crash_bench_"), "bench.db"), "memory://"]
+    results = {}
+    for target in targets:
+        db.configure(target)
+        result = workload(args.players, args.rounds)
+        results[target] = result
+        report(db.get_backend().describe(), [
+            ("bets settled", f"{result['settled']:,}"),
+            ("bets/sec", f"{result['settled'] / result['elapsed']:,.0f}"),
+            ("stats match rebuild", "yes" if result["stats_ok"] else "NO"),
+        ])
+
+    reference = results[targets[0]]
+    failures = [target for target, result in results.items() if not result["stats_ok"]]
+    for target, result in results.items():
+        for key in ("settled", "leaderboard", "rank", "history", "volume"):
+            if result[key] != reference[key]:
+                failures.append(f"{target}: {key} differs from {targets[0]}")
+    report("conformance", [("result", "all backends agree" if not failures else "; ".join(failures))])
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
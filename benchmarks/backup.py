@@ -0,0 +1,84 @@
+# Online backup of a populated database while writers keep committing:
+# throughput, step count and the longest writer stall for a few step sizes,
+# next to the writers' own latency with no backup running.
+#
+#   python -m benchmarks.backup [--users 2000] [--bets 500000] [--writers 4]
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+import db
+import backup
+from benchmarks.common import temp_database, percentiles, report
+from benchmarks.seed_data import seed
+
+# Pages per step to compare (-1: the whole database in one step)
+STEP_SIZES = (64, 256, 1024, -1)
+
+
+def with_writers(n_writers, n_users, fn):
+    # Run fn() while n_writers threads update balances; returns (result, write latencies)
+    latencies = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def writer():
+        rng = random.Random()
+        local = []
+        while not done.is_set():
+            t0 = time.perf_counter()
+            db.update_balance(f"player{rng.randrange(n_users)}", 1.0)
+            local.append(time.perf_counter() - t0)
+            time.sleep(0.001)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=writer) for _ in range(n_writers)]
+    for t in threads:
+        t.start()
+    try:
+        result = fn()
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+    return result, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online backup benchmark")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--bets", type=int, default=500000)
+    parser.add_argument("--writers", type=int, default=4)
+    args = parser.parse_args()
+
+    temp_database()
+    seed(args.users, args.bets)
+    directory = tempfile.mkdtemp(prefix="crash_backups_")
+
+    _, idle = with_writers(args.writers, args.users, lambda: time.sleep(2.0))
+    p50, p99 = percentiles(idle)
+    rows = [("no backup", f"writes p50 / p99 / max {p50:.2f} / {p99:.2f} / {max(idle) * 1000:.2f} ms")]
+    for pages in STEP_SIZES:
+        stats, writes = with_writers(args.writers, args.users,
+                                     lambda: backup.backup(directory, compress=False, pages=pages))
+        p50, p99 = percentiles(writes)
+        rows.append((f"{pages} pages/step", (
+            f"{stats['db_bytes'] / 1e6:.0f} MB at {stats['mb_per_sec']:.0f} MB/s, {stats['steps']} steps "
+            f"(max {stats['max_step_ms']:.1f} ms), probe stall {stats['max_writer_stall_ms']:.1f} ms, "
+            f"writes p50 / p99 / max {p50:.2f} / {p99:.2f} / {max(writes, default=0) * 1000:.2f} ms"
+        )))
+    report(f"{args.writers} writers, {args.users:,} users, {args.bets:,} bets", rows)
+
+    stats = backup.backup(directory, compress=True)
+    report("compressed snapshot", [
+        ("database", f"{stats['db_bytes'] / 1e6:.1f} MB"),
+        ("gzip", f"{stats['file_bytes'] / 1e6:.1f} MB in {stats['compress_seconds']:.2f} s"),
+        ("snapshots kept", f"{len(backup.list_snapshots(directory))} of {backup.BACKUP_KEEP}"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
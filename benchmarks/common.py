@@ -0,0 +1,39 @@
+import os
+import time
+import tempfile
+import statistics
+
+import db
+
+
+def temp_database():
+    # Point the db pool at a fresh file in a temporary directory
+    tmpdir = tempfile.mkdtemp(prefix="crash_bench_")
+    path = os.path.join(tmpdir, "bench.db")
+    db.configure(path)
+    db.init_db()
+    return path
+
+
+def percentiles(samples):
+    # p50 / p99 in milliseconds from a list of second-valued samples
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0, 0.0
+    p50 = statistics.median(ordered)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return p50 * 1000, p99 * 1000
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def report(title, rows):
+    # rows: list of (label, value) pairs
+    print(f"\n== {title} ==")
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label.ljust(width)}  {value}")
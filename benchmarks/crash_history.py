@@ -0,0 +1,55 @@
+# Crash History over a long ledger of rounds: the distribution summary from
+# crash_counts against scanning every round, and the downsampled timeline
+# for each range, cold (empty block cache), warm, and right after one more
+# round is recorded. Checks the summary against the scan.
+#
+#   python -m benchmarks.crash_history [--rounds 1000000]
+import argparse
+
+import numpy as np
+
+import db
+import history
+from benchmarks.common import temp_database, timed, report
+from benchmarks.seed_data import seed
+
+RANGES = (100, 10000, 1000000, None)
+
+
+def scan_summary():
+    # Without crash_counts: every crash point through Python
+    with db.connection() as c:
+        crashes = np.array([row[0] for row in c.execute('SELECT crash_multiplier FROM rounds')])
+    return len(crashes), float(crashes.mean()), float(np.percentile(crashes, 99, method="inverted_cdf"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crash History benchmark")
+    parser.add_argument("--rounds", type=int, default=1000000)
+    args = parser.parse_args()
+
+    temp_database()
+    seed(100, args.rounds, players_per_round=1)
+
+    scan_seconds, (n, mean, p99) = timed(scan_summary)
+    summary_seconds, summary = timed(history.crash_summary)
+    same = summary["rounds"] == n and abs(summary["mean"] - mean) < 1e-6 * mean and summary["percentiles"][99] == p99
+    rows = [
+        ("scan every round", f"{scan_seconds * 1000:,.0f} ms"),
+        ("crash_counts summary", f"{summary_seconds * 1000:,.1f} ms over {len(db.get_crash_distribution())} "
+                                 f"distinct crash points, matches scan: {'yes' if same else 'NO'}"),
+    ]
+    for rounds in RANGES:
+        history.blocks.clear()
+        cold, (x, _) = timed(history.crash_series, rounds)
+        warm, _ = timed(history.crash_series, rounds)
+        db.record_round(2.0, [])
+        new, _ = timed(history.crash_series, rounds)
+        rows.append((f"timeline last {rounds:,}" if rounds else "timeline all",
+                     f"{len(x):,} points, cold {cold * 1000:,.0f} ms, warm {warm * 1000:,.1f} ms, "
+                     f"after a new round {new * 1000:,.1f} ms"))
+    report(f"{args.rounds:,} rounds", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Connect-per-call vs pooled connections for the queries one logged-in rerun makes.
+#
+#   python -m benchmarks.db_pool [--users 200] [--bets 20000] [--reruns 2000]
+import time
+import random
+import sqlite3
+import argparse
+
+import db
+from benchmarks.common import temp_database, percentiles, report
+
+
+# The pre-pool helpers: open, query, close on every call
+def legacy_query(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute(sql, params)
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+
+def seed(n_users, n_bets):
+    password = db.hash_password("secret")
+    with db.transaction() as c:
+        c.executemany(
+            "INSERT INTO users (username, password, balance) VALUES (?, ?, ?)",
+            [(f"player{i}", password, random.uniform(0, 50000)) for i in range(n_users)],
+        )
+        c.executemany(
+            "INSERT INTO bets (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier) VALUES (?, ?, ?, ?, ?)",
+            [(f"player{random.randrange(n_users)}", 100.0, 1.5, 150.0, 2.0) for _ in range(n_bets)],
+        )
+
+
+RERUN_QUERIES = (
+    ("SELECT * FROM users WHERE username=?", True),
+    ("SELECT COUNT(*) FROM bets WHERE username=?", True),
+    ("SELECT id, username, balance, rounds_played, is_admin, created_at, last_login FROM users ORDER BY balance DESC", False),
+    ("SELECT * FROM users WHERE username=?", True),
+    ("SELECT username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, timestamp FROM bets ORDER BY id DESC LIMIT 50", False),
+)
+
+
+def pooled_query(sql, params=()):
+    with db.connection() as c:
+        return c.execute(sql, params).fetchall()
+
+
+def run(query, n_users, reruns):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(reruns):
+        username = f"player{random.randrange(n_users)}"
+        for sql, per_user in RERUN_QUERIES:
+            t0 = time.perf_counter()
+            query(sql, (username,) if per_user else ())
+            latencies.append(time.perf_counter() - t0)
+    return time.perf_counter() - start, latencies
+
+
+def connect_rate(path, n=2000):
+    start = time.perf_counter()
+    for _ in range(n):
+        sqlite3.connect(path).close()
+    legacy = n / (time.perf_counter() - start)
+    start = time.perf_counter()
+    pool = db.get_pool()
+    for _ in range(n):
+        pool.release(pool.acquire())
+    pooled = n / (time.perf_counter() - start)
+    return legacy, pooled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pooled vs connect-per-call SQLite benchmark")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--bets", type=int, default=20000)
+    parser.add_argument("--reruns", type=int, default=2000)
+    args = parser.parse_args()
+
+    path = temp_database()
+    seed(args.users, args.bets)
+
+    legacy_rate, pooled_rate = connect_rate(path)
+    legacy_total, legacy_lat = run(lambda sql, p: legacy_query(path, sql, p), args.users, args.reruns)
+    connects_before = db.get_pool().connects
+    pooled_total, pooled_lat = run(pooled_query, args.users, args.reruns)
+
+    for label, total, lat, connects in (
+        ("connect-per-call", legacy_total, legacy_lat, len(legacy_lat)),
+        ("pooled", pooled_total, pooled_lat, db.get_pool().connects - connects_before),
+    ):
+        p50, p99 = percentiles(lat)
+        report(label, [
+            ("reruns/sec", f"{args.reruns / total:,.0f}"),
+            ("connects made", f"{connects:,}"),
+            ("query p50", f"{p50:.3f} ms"),
+            ("query p99", f"{p99:.3f} ms"),
+        ])
+    report("connection acquire", [
+        ("sqlite3.connect()/sec", f"{legacy_rate:,.0f}"),
+        ("pool acquire/sec", f"{pooled_rate:,.0f}"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
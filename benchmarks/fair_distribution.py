@@ -0,0 +1,83 @@
+# Statistical checks for fair.py over a freshly built hash chain:
+#  * P(crash >= m) against the theoretical (1 - edge) / m at several targets
+#  * return-to-player of a fixed cash-out strategy against 1 - edge
+#  * link integrity of a sample of consecutive entries
+# Exits non-zero if any check is off by more than --z standard errors.
+#
+#   python -m benchmarks.fair_distribution [--draws 10000000] [--edge 0.01]
+import sys
+import math
+import time
+import random
+import hashlib
+import argparse
+
+import numpy as np
+
+import fair
+from benchmarks.common import report
+
+TARGETS = (1.01, 1.5, 2.0, 3.0, 5.0, 10.0, 100.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crash point distribution checks")
+    parser.add_argument("--draws", type=int, default=10_000_000)
+    parser.add_argument("--edge", type=float, default=fair.HOUSE_EDGE)
+    parser.add_argument("--z", type=float, default=4.0, help="failure threshold in standard errors")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    chain, commitment = fair.build_chain(args.draws)
+    build_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    points = fair.crash_points(chain, args.edge)
+    points_time = time.perf_counter() - t0
+    n = len(points)
+
+    failures = []
+    rows = [
+        ("chain build", f"{build_time:.2f} s ({n / build_time:,.0f} hashes/s)"),
+        ("crash points", f"{points_time:.2f} s"),
+    ]
+
+    arr = np.asarray(points)
+    count_at_least = lambda m: int((arr >= m).sum())
+
+    for m in TARGETS:
+        # crash points are floored to cents, so "reaches m" is exact at 2 decimals
+        expected = min(1.0, (1 - args.edge) / m)
+        observed = count_at_least(m) / n
+        se = math.sqrt(expected * (1 - expected) / n) or 1e-12
+        z = (observed - expected) / se
+        rows.append((f"P(crash >= {m:g})", f"{observed:.6f} vs {expected:.6f} (z={z:+.2f})"))
+        if abs(z) > args.z:
+            failures.append(f"P(crash >= {m:g})")
+
+    # Cashing out at 2x every round should return ~(1 - edge) per unit staked
+    target = 2.0
+    p_win = count_at_least(target) / n
+    rtp = p_win * target
+    se = target * math.sqrt(p_win * (1 - p_win) / n)
+    z = (rtp - (1 - args.edge)) / se
+    rows.append((f"RTP cashing out at {target:g}x", f"{rtp:.5f} vs {1 - args.edge:.5f} (z={z:+.2f})"))
+    if abs(z) > args.z:
+        failures.append("RTP")
+
+    # Each served hash must be the sha256 preimage of the one served before it
+    starts = random.sample(range(1, n), min(10000, n - 1))
+    broken = sum(1 for i in starts if hashlib.sha256(chain[i]).digest() != chain[i - 1])
+    broken += hashlib.sha256(chain[0]).hexdigest() != commitment
+    rows.append(("broken links (sampled)", str(broken)))
+    if broken:
+        failures.append("chain links")
+
+    report(f"{n:,} crash points, house edge {args.edge:.2%}", rows)
+    if failures:
+        print(f"\nFAILED: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nall checks passed")
+
+
+if __name__ == "__main__":
+    main()
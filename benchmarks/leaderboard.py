@@ -0,0 +1,81 @@
+# N+1 leaderboard (get_all_users + get_total_bets per user) vs the single
+# leaderboard query and indexed rank lookup, at several user counts.
+#
+#   python -m benchmarks.leaderboard [--sizes 1000 10000 100000] [--bets-per-user 5]
+import time
+import random
+import argparse
+
+import db
+from benchmarks.common import temp_database, percentiles, report
+
+# The legacy loop is O(users x bets); time this many get_total_bets calls and extrapolate
+LEGACY_SAMPLE = 200
+
+
+def seed(n_users, bets_per_user):
+    with db.transaction() as c:
+        c.execute("DELETE FROM bets")
+        c.execute("DELETE FROM users WHERE is_admin = 0")
+        c.executemany(
+            "INSERT INTO users (username, password, balance, rounds_played) VALUES (?, ?, ?, ?)",
+            [(f"player{i}", "x", round(random.uniform(0, 50000), 2), bets_per_user) for i in range(n_users)],
+        )
+        c.executemany(
+            "INSERT INTO bets (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier) VALUES (?, ?, ?, ?, ?)",
+            [(f"player{i}", 100.0, 1.5, 150.0, 2.0) for i in range(n_users) for _ in range(bets_per_user)],
+        )
+
+
+def legacy_count(c, username):
+    return c.execute("SELECT COUNT(*) FROM bets WHERE username=?", (username,)).fetchone()[0]
+
+
+def legacy_leaderboard(n_users):
+    # get_all_users() once, then one full COUNT(*) per user; a sample is timed and scaled up
+    start = time.perf_counter()
+    users = db.get_all_users()
+    with db.connection() as c:
+        for user in users[:LEGACY_SAMPLE]:
+            legacy_count(c, user[1])
+    elapsed = time.perf_counter() - start
+    return elapsed * max(1.0, len(users) / LEGACY_SAMPLE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboard query benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--bets-per-user", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    temp_database()
+    for n_users in args.sizes:
+        seed(n_users, args.bets_per_user)
+
+        legacy = legacy_leaderboard(n_users)
+
+        page_times = []
+        for _ in range(50):
+            t0 = time.perf_counter()
+            db.get_leaderboard.uncached(limit=100, offset=random.randrange(0, max(1, n_users - 100)))
+            page_times.append(time.perf_counter() - t0)
+
+        rank_times = []
+        for _ in range(args.lookups):
+            username = f"player{random.randrange(n_users)}"
+            t0 = time.perf_counter()
+            db.get_user_rank.uncached(username)
+            rank_times.append(time.perf_counter() - t0)
+
+        page_p50, page_p99 = percentiles(page_times)
+        rank_p50, rank_p99 = percentiles(rank_times)
+        report(f"{n_users:,} users", [
+            ("N+1 leaderboard (est.)", f"{legacy * 1000:,.1f} ms"),
+            ("top-100 page p50/p99", f"{page_p50:.3f} / {page_p99:.3f} ms"),
+            ("rank lookup p50/p99", f"{rank_p50:.3f} / {rank_p99:.3f} ms"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# Load test: N simulated players, each a thread doing what a browser session
+# makes ctimes.py do. A player logs in, then repeatedly reruns the Play Game
+# view (sidebar, balance header), places a bet, polls the round like the 0.1 s
+# fragment, cashes out, and after the bet settles sometimes looks at one of
+# the other views (My Bets, Crash History, Leaderboard).
+#
+# Reports per-rerun latency percentiles, SQL statements per rerun (from the
+# same per-rerun profiler the app uses, see profiling.py), the slowest db
+# helpers and settled bets/sec.
+#
+#   python -m benchmarks.load [--players 50] [--seconds 30] [--mode shared|solo] [--db seeded.db]
+#
+# --db copies a database made by benchmarks.seed_data (10k users / 10M bets),
+# so the hot paths are measured at production size. Without it a small
+# database is generated. --apptest also times real script reruns through
+# Streamlit's AppTest.
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+
+import db
+import auth
+import fair
+import engine
+import profiling
+from benchmarks.common import report
+from benchmarks.seed_data import seed
+
+# Round clock speed-up, so a solo 7x round takes seconds instead of half a minute
+TIME_SCALE = 10.0
+
+# Shared-round timings under load (seconds)
+BETTING_SECONDS = 1.0
+COOLDOWN_SECONDS = 0.5
+
+# How often a session's flight fragment refreshes
+REFRESH_SECONDS = 0.1
+
+MY_BETS_PAGE_SIZE = 50
+LEADERBOARD_PAGE_SIZE = 100
+
+
+# Chance that a player opens another view after a bet settles
+BROWSE_PROBABILITY = 0.3
+
+
+def full_rerun(username, view="play"):
+    # The queries a logged-in, non-admin rerun of ctimes.py makes, in order.
+    # The user context is read once and shared by the sidebar, balance header
+    # and views; only the selected view's queries run (radio navigation).
+    me = db.get_user_context(username)
+    if view == "my_bets":
+        if me.bets:
+            db.get_bets_page(username, limit=MY_BETS_PAGE_SIZE)
+    elif view == "crash_history":
+        # The figures are cached per newest round id, not rebuilt per rerun
+        _, last_round_id = db.get_round_id_range()
+        if last_round_id:
+            fair.get_commitments()
+            fair.verify_round(last_round_id)
+    elif view == "leaderboard":
+        if db.get_leaderboard_size():
+            db.get_leaderboard(limit=LEADERBOARD_PAGE_SIZE, offset=0)
+    return me
+
+
+class Player(threading.Thread):
+
+    def __init__(self, username, scheduler, mode, stop):
+        super().__init__(daemon=True)
+        self.username = username
+        self.scheduler = scheduler
+        self.mode = mode
+        self.stop = stop
+        self.rerun_ms = []
+        self.statements = []
+        self.bets = 0
+        self.refreshes = 0
+
+    def rerun(self, view="play"):
+        profiling.begin_rerun(label=self.username)
+        user = full_rerun(self.username, view)
+        profile = profiling.end_rerun()
+        self.rerun_ms.append(profile.total_ms)
+        self.statements.append(profile.statements)
+        return user
+
+    def refresh(self):
+        self.refreshes += 1
+        time.sleep(REFRESH_SECONDS)
+
+    def play_shared(self, bet, target):
+        round_no, _ = self.scheduler.place_bet(self.username, bet, None)
+        if round_no is None:
+            time.sleep(REFRESH_SECONDS)
+            return
+        cashed = False
+        while not self.stop.is_set():
+            snap = self.scheduler.snapshot(self.username)
+            if not cashed and snap["phase"] == "flight" and snap["round_no"] == round_no and snap["multiplier"] >= target:
+                cashed = self.scheduler.cash_out(self.username) is not None
+            if self.scheduler.result_for(self.username, round_no) is not None:
+                self.bets += 1
+                return
+            self.refresh()
+
+    def play_solo(self, bet, target, balance):
+        # Debit first, so a refused bet never uses up a chain entry
+        if not db.place_bet(self.username, bet):
+            return
+        chain_idx, _, _, u = fair.next_draw()
+        crash, speed = engine.draw_crash(balance, u)
+        current = engine.new_round(self.username, bet, crash, speed * TIME_SCALE, target)
+        while True:
+            status, multiplier = engine.round_status(current)
+            if status != "flying":
+                break
+            self.refresh()
+        win = bet * multiplier if status == "auto_cashout" else 0.0
+        db.record_round(crash, [(self.username, bet, multiplier, win, crash)], mode="solo",
+                        started_at=engine.utc_timestamp(current["started_at"]), chain_idx=chain_idx)
+        self.bets += 1
+
+    def run(self):
+        rng = random.Random(self.username)
+        while True:
+            try:
+                db.verify_user(self.username, "secret")
+                break
+            except auth.HashingBusy:
+                # Everyone logs in at once; back off like a user clicking again
+                time.sleep(rng.uniform(0.1, 0.5))
+        db.update_last_login(self.username)
+        db.log_event("login", self.username)
+        while not self.stop.is_set():
+            me = self.rerun()
+            if me is None or me.balance < 10:
+                break
+            bet = float(rng.choice((10, 50, 100)))
+            target = round(rng.uniform(1.2, 3.0), 2)
+            if self.mode == "shared":
+                self.play_shared(bet, target)
+            else:
+                self.play_solo(bet, target, me.balance)
+            db.log_event("bet", self.username, f"{self.mode}:{bet}")
+            if rng.random() < BROWSE_PROBABILITY:
+                self.rerun(rng.choice(("my_bets", "crash_history", "leaderboard")))
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def apptest_reruns(reruns, username):
+    # Full-script reruns through Streamlit's headless runner
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("ctimes.py", default_timeout=30)
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = username
+    at.run()
+    samples = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crash game load test")
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--mode", choices=("shared", "solo"), default="shared")
+    parser.add_argument("--db", help="seeded SQLite file to copy (see benchmarks.seed_data)")
+    parser.add_argument("--users", type=int, default=10000, help="users to generate without --db")
+    parser.add_argument("--bets", type=int, default=200000, help="bets to generate without --db")
+    parser.add_argument("--apptest", type=int, default=0, metavar="N", help="also time N AppTest reruns")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="crash_bench_"), "load.db")
+    if args.db:
+        shutil.copyfile(args.db, path)
+    db.configure(path)
+    db.init_db()
+    if not args.db:
+        seed(args.users, args.bets)
+    fair.ensure_chain(length=100000)
+    with db.transaction() as c:
+        # Enough balance for the whole run
+        c.execute("UPDATE users SET balance = 1e9 WHERE username IN (%s)" % ",".join("?" * args.players),
+                  [f"player{i}" for i in range(args.players)])
+
+    scheduler = None
+    if args.mode == "shared":
+        scheduler = engine.RoundScheduler(
+            db.place_bet, db.record_round, draw=fair.next_crash, reserve=db.reserve_round_id,
+            speed=engine.SHARED_SPEED * TIME_SCALE, betting_seconds=BETTING_SECONDS, cooldown_seconds=COOLDOWN_SECONDS,
+        ).start()
+
+    stop = threading.Event()
+    players = [Player(f"player{i}", scheduler, args.mode, stop) for i in range(args.players)]
+    start = time.perf_counter()
+    for p in players:
+        p.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for p in players:
+        p.join()
+    elapsed = time.perf_counter() - start
+    if scheduler is not None:
+        scheduler.stop()
+
+    rerun_ms = sorted(ms for p in players for ms in p.rerun_ms)
+    statements = sorted(n for p in players for n in p.statements)
+    bets = sum(p.bets for p in players)
+    report(f"{args.players} players, {args.mode} rounds, {elapsed:.0f} s", [
+        ("reruns", f"{len(rerun_ms):,} ({len(rerun_ms) / elapsed:,.1f}/sec)"),
+        ("rerun p50 / p95 / p99", " / ".join(f"{percentile(rerun_ms, q):.2f}" for q in (0.5, 0.95, 0.99)) + " ms"),
+        ("rerun max", f"{rerun_ms[-1] if rerun_ms else 0:.2f} ms"),
+        ("statements per rerun", f"{sum(statements) / max(1, len(statements)):.1f} mean, {percentile(statements, 0.99)} p99"),
+        ("fragment refreshes", f"{sum(p.refreshes for p in players):,}"),
+        ("bets settled", f"{bets:,} ({bets / elapsed:,.1f} bets/sec)"),
+    ])
+    report("slowest db helpers (calls, statements, mean ms)", [
+        (name, f"{calls:,}, {statements:,}, {mean_ms:.3f}")
+        for name, calls, statements, _, mean_ms, _ in profiling.registry.slowest_queries(8)
+    ])
+
+    if args.apptest:
+        samples = sorted(apptest_reruns(args.apptest, "player0"))
+        report("AppTest reruns", [
+            ("reruns", f"{len(samples):,}"),
+            ("p50 / p99", f"{percentile(samples, 0.5):.1f} / {percentile(samples, 0.99):.1f} ms"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Password hashing cost: logins/sec at each hash setting (the old unsalted
+# SHA-256, PBKDF2 and scrypt at a few costs), with a burst of logins going
+# through auth's bounded hashing pool. While the burst runs, another thread
+# times db.get_user to show how much the hashing slows everyone else's reruns.
+#
+#   python -m benchmarks.password_hashing [--logins 40] [--workers 4]
+import time
+import hashlib
+import argparse
+import threading
+
+import db
+import auth
+from benchmarks.common import temp_database, percentiles, timed, report
+
+SETTINGS = (
+    ("sha256 (legacy)", None, None),
+    ("pbkdf2_sha256 100k", "pbkdf2_sha256", 100000),
+    ("pbkdf2_sha256 600k", "pbkdf2_sha256", 600000),
+    ("scrypt n=2^14", "scrypt", 2 ** 14),
+    ("scrypt n=2^15", "scrypt", 2 ** 15),
+)
+
+
+def configure(scheme, cost):
+    if scheme == "pbkdf2_sha256":
+        auth.PBKDF2_ITERATIONS = cost
+    elif scheme == "scrypt":
+        auth.SCRYPT_N = cost
+    if scheme:
+        auth.PASSWORD_SCHEME = scheme
+
+
+def stored_hash(scheme):
+    if scheme is None:
+        return hashlib.sha256(b"secret").hexdigest()
+    return auth.make_hash("secret", scheme)
+
+
+def burst(pool, stored, logins):
+    # `logins` concurrent verifications; returns (elapsed seconds, rejected)
+    rejected = []
+
+    def login():
+        try:
+            assert pool.run(auth.check_hash, "secret", stored)
+        except auth.HashingBusy:
+            rejected.append(1)
+
+    threads = [threading.Thread(target=login) for _ in range(logins)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, len(rejected)
+
+
+def reads_during(fn):
+    # get_user latencies sampled while fn() runs
+    samples = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            db.get_user("admin")
+            samples.append(time.perf_counter() - t0)
+            time.sleep(0.001)
+
+    t = threading.Thread(target=reader)
+    t.start()
+    try:
+        result = fn()
+    finally:
+        done.set()
+        t.join()
+    return result, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password hashing throughput")
+    parser.add_argument("--logins", type=int, default=40, help="concurrent logins per burst")
+    parser.add_argument("--workers", type=int, default=auth.HASH_WORKERS)
+    args = parser.parse_args()
+
+    temp_database()
+    _, idle = reads_during(lambda: time.sleep(0.5))
+    rows = [("get_user idle p50 / p99", "%.3f / %.3f ms" % percentiles(idle))]
+    for label, scheme, cost in SETTINGS:
+        configure(scheme, cost)
+        stored = stored_hash(scheme)
+        single, _ = timed(auth.check_hash, "secret", stored)
+        # Queue large enough for the whole burst: this measures throughput, not rejection
+        pool = auth.HashingPool(workers=args.workers, queue_size=args.logins)
+        (elapsed, rejected), samples = reads_during(lambda: burst(pool, stored, args.logins))
+        rows.append((label, "%.1f logins/sec, %.1f ms per hash, get_user p50 / p99 %.3f / %.3f ms" % (
+            (args.logins - rejected) / elapsed, single * 1000, *percentiles(samples),
+        )))
+    report(f"{args.logins} concurrent logins, {args.workers} hashing workers", rows)
+
+    # Default-sized queue: the logins beyond workers + queue are turned away at once
+    configure("scrypt", 2 ** 14)
+    stored = stored_hash("scrypt")
+    pool = auth.HashingPool(workers=args.workers, queue_size=auth.HASH_QUEUE)
+    elapsed, rejected = burst(pool, stored, args.logins * 4)
+    report(f"{args.logins * 4} logins against a {auth.HASH_QUEUE}-deep queue", [
+        ("accepted", f"{args.logins * 4 - rejected:,}"),
+        ("rejected (HashingBusy)", f"{rejected:,}"),
+        ("time", f"{elapsed:.2f} s"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Concurrent sessions reading the leaderboard and crash history while a shared
+# round settles every --settle-every seconds, with and without the read cache.
+#
+#   python -m benchmarks.read_cache [--sessions 50] [--seconds 5] [--users 10000]
+import time
+import random
+import argparse
+import threading
+
+import db
+from cache import read_cache
+from benchmarks.common import temp_database, percentiles, report
+
+# Fragment refresh interval of one session
+REFRESH_SECONDS = 0.1
+
+
+def session_reads(use_cache):
+    if use_cache:
+        db.get_leaderboard(limit=100)
+        db.get_leaderboard_size()
+        db.get_rounds(limit=50)
+    else:
+        db.get_leaderboard.uncached(limit=100)
+        db.get_leaderboard_size.uncached()
+        db.get_rounds.uncached(limit=50)
+
+
+def run(sessions, seconds, settle_every, n_users, use_cache):
+    stop = threading.Event()
+    latencies = []
+    lock = threading.Lock()
+
+    def session():
+        local = []
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            session_reads(use_cache)
+            local.append(time.perf_counter() - t0)
+            time.sleep(REFRESH_SECONDS)
+        with lock:
+            latencies.extend(local)
+
+    def settler():
+        while not stop.wait(settle_every):
+            players = random.sample(range(n_users), 20)
+            db.record_round(2.0, [(f"player{i}", 100.0, 1.5, 150.0, 2.0) for i in players])
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)] + [threading.Thread(target=settler)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read cache benchmark")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--settle-every", type=float, default=1.0)
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+
+    temp_database()
+    with db.transaction() as c:
+        c.executemany(
+            "INSERT INTO users (username, password, balance) VALUES (?, ?, ?)",
+            [(f"player{i}", "x", random.uniform(0, 50000)) for i in range(args.users)],
+        )
+
+    for use_cache in (False, True):
+        before = read_cache.stats()
+        latencies = run(args.sessions, args.seconds, args.settle_every, args.users, use_cache)
+        after = read_cache.stats()
+        p50, p99 = percentiles(latencies)
+        rows = [("refreshes", f"{len(latencies):,}"), ("read p50 / p99", f"{p50:.3f} / {p99:.3f} ms")]
+        if use_cache:
+            hits = after["hits"] - before["hits"]
+            misses = after["misses"] - before["misses"]
+            rows.append(("cache hits / misses", f"{hits:,} / {misses:,} ({hits / max(1, hits + misses):.1%} hit rate)"))
+        report(f"{args.sessions} sessions, {'cached' if use_cache else 'uncached'}", rows)
+
+
+if __name__ == "__main__":
+    main()
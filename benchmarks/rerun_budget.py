@@ -0,0 +1,137 @@
+# Per-rerun cost before the game tabs render: the baseline app's path
+# (a94235f: init_db and a connect-per-call N+1 rank on every rerun) against
+# today's (bootstrap once per process, one user context read).
+#
+# The baseline path is replayed with its own SQL on a database at today's
+# schema, whose bets indexes make its per-user COUNTs cheaper than they were,
+# so the baseline numbers are a lower bound.
+#
+#   python -m benchmarks.rerun_budget [--reruns 2000] [--users 200] [--apptest]
+import time
+import hashlib
+import sqlite3
+import argparse
+
+import db
+from benchmarks.common import temp_database, percentiles, report
+
+
+def baseline_pre_tab(path, username):
+    # What a logged-in rerun of a94235f ran before st.tabs, each helper on
+    # its own connection as it was
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            balance REAL DEFAULT 10000.0,
+            rounds_played INTEGER DEFAULT 0,
+            is_admin INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            last_login TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS bets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            bet_amount REAL,
+            cashout_multiplier REAL,
+            win_amount REAL,
+            crash_multiplier REAL,
+            timestamp TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('''
+        INSERT OR IGNORE INTO users (username, password, is_admin, balance)
+        VALUES (?, ?, 1, 100000)
+    ''', ("admin", hashlib.sha256("admin123".encode()).hexdigest()))
+    conn.commit()
+    conn.close()
+
+    def query(sql, params=()):
+        conn = sqlite3.connect(path)
+        rows = conn.execute(sql, params).fetchall()
+        conn.close()
+        return rows
+
+    # Sidebar: the user, their bet count, and a rank from every user's bet count
+    query('SELECT * FROM users WHERE username=?', (username,))
+    query('SELECT COUNT(*) FROM bets WHERE username=?', (username,))
+    users = query('SELECT id, username, balance, rounds_played, is_admin, created_at, last_login '
+                  'FROM users ORDER BY balance DESC')
+    for user in users:
+        if not user[4]:
+            query('SELECT COUNT(*) FROM bets WHERE username=?', (user[1],))
+    # Balance header
+    query('SELECT * FROM users WHERE username=?', (username,))
+
+
+def current_pre_tab(username):
+    # The user context shared by the sidebar (balance, rank) and the balance header
+    db.get_user_context(username)
+
+
+def measure(reruns, run):
+    samples = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def apptest_reruns(reruns, username):
+    # Full-script reruns through Streamlit's headless test runner
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("ctimes.py", default_timeout=30)
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = username
+    at.run()
+    samples = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-tab rerun cost benchmark")
+    parser.add_argument("--reruns", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200, help="players ranked by the baseline's N+1 loop")
+    parser.add_argument("--bets", type=int, default=20, help="bets per player")
+    parser.add_argument("--apptest", action="store_true", help="also time full reruns with streamlit AppTest")
+    args = parser.parse_args()
+
+    path = temp_database()
+    users = [f"player{i}" for i in range(args.users)]
+    with db.transaction() as c:
+        c.executemany("INSERT INTO users (username, password) VALUES (?, ?)", [(u, "x") for u in users])
+        c.executemany(
+            "INSERT INTO bets (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier) VALUES (?, ?, ?, ?, ?)",
+            [(u, 100.0, 2.0, 200.0, 2.5) for u in users for _ in range(args.bets)],
+        )
+    db.rebuild_stats()
+    username = users[0]
+
+    runs = (
+        ("baseline a94235f: init_db + N+1 rank every rerun", lambda: baseline_pre_tab(path, username)),
+        ("bootstrap once, user context (read cache cold)",
+         lambda: (db.invalidate("users"), current_pre_tab(username))),
+        ("bootstrap once, user context (read cache warm)", lambda: current_pre_tab(username)),
+    )
+    for label, run in runs:
+        p50, p99 = percentiles(measure(args.reruns, run))
+        report(f"{label}, {args.users:,} players", [("pre-tab p50", f"{p50:.3f} ms"), ("pre-tab p99", f"{p99:.3f} ms")])
+
+    if args.apptest:
+        p50, p99 = percentiles(apptest_reruns(min(args.reruns, 200), username))
+        report("full AppTest rerun", [("p50", f"{p50:.1f} ms"), ("p99", f"{p99:.1f} ms")])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# How many concurrent rounds one core can keep refreshed with the round engine.
+# Each refresh is what a flight fragment does: work out the round's status from
+# server time and, when it ends, settle it.
+#
+#   python -m benchmarks.round_engine [--rounds 10000] [--seconds 5] [--refresh 0.1]
+import time
+import random
+import argparse
+
+import db
+import engine
+from benchmarks.common import temp_database, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round engine load test")
+    parser.add_argument("--rounds", type=int, default=10000, help="concurrent rounds in flight")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--refresh", type=float, default=0.1, help="fragment refresh interval per round")
+    args = parser.parse_args()
+
+    temp_database()
+    with db.transaction() as c:
+        c.executemany(
+            "INSERT INTO users (username, password, balance) VALUES (?, ?, ?)",
+            [(f"player{i}", "x", 10000.0) for i in range(args.rounds)],
+        )
+
+    def start(i, now):
+        crash, speed = engine.draw_crash(random.uniform(0, 50000))
+        auto = random.choice([None, 1.5, 2.0, 3.0])
+        return engine.new_round(f"player{i}", 100.0, crash, speed, auto, now=now)
+
+    now = time.time()
+    rounds = [start(i, now) for i in range(args.rounds)]
+    refreshes = settled = 0
+    busy = 0.0
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        now = time.time()
+        for i, current in enumerate(rounds):
+            status, multiplier = engine.round_status(current, now)
+            refreshes += 1
+            if status != "flying":
+                win = current["bet_amount"] * multiplier if status == "auto_cashout" else 0.0
+                db.settle_bet(current["username"], current["bet_amount"], multiplier, win, current["crash_multiplier"])
+                settled += 1
+                rounds[i] = start(i, now)
+        busy += time.perf_counter() - t0
+
+    per_second = refreshes / busy
+    report(f"{args.rounds:,} concurrent rounds", [
+        ("refreshes/sec (one core)", f"{per_second:,.0f}"),
+        ("rounds settled", f"{settled:,}"),
+        ("settlements/sec", f"{settled / busy:,.0f}"),
+        (f"rounds sustainable @ {args.refresh}s refresh", f"{per_second * args.refresh:,.0f}"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
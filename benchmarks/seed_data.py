@@ -0,0 +1,104 @@
+# Synthetic data for load tests: N users and M settled bets spread over the
+# last D days, grouped into rounds like real play, with every counter and
+# rollup rebuilt afterwards. The default is the 10k users / 10M bets size the
+# hot paths are tuned for (about 1.4 GB, a few minutes); use smaller numbers
+# for a quick run.
+#
+#   python -m benchmarks.seed_data seeded.db [--users 10000] [--bets 10000000] [--days 90]
+#
+# Load tests then copy the file instead of regenerating it:
+#   python -m benchmarks.load --db seeded.db
+import time
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import db
+import engine
+from benchmarks.common import report
+
+# Bets written per transaction
+CHUNK = 100000
+
+# Share of every bet the house keeps, as in fair.py
+HOUSE_EDGE = 0.01
+
+
+def seed(n_users, n_bets, days=90, players_per_round=10, rng_seed=1):
+    # Fill the configured database; returns (users, bets, rounds) written
+    rng = random.Random(rng_seed)
+    users = [f"player{i}" for i in range(n_users)]
+    # One salted hash shared by every user: hashing 10k passwords would take minutes
+    password = db.hash_password("secret")
+    with db.transaction() as c:
+        c.executemany(
+            "INSERT INTO users (username, password, balance) VALUES (?, ?, ?)",
+            [(u, password, round(rng.uniform(0, 50000), 2)) for u in users],
+        )
+
+    n_rounds = (n_bets + players_per_round - 1) // players_per_round
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    step = timedelta(days=days) / max(1, n_rounds)
+    with db.connection() as c:
+        first_round = c.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM rounds").fetchone()[0]
+
+    written = 0
+    round_id = first_round
+    while written < n_bets:
+        rounds, bets = [], []
+        while len(bets) < CHUNK and written + len(bets) < n_bets:
+            u = rng.random()
+            crash = max(1.0, int(100 * (1 - HOUSE_EDGE) / (1 - u)) / 100)
+            when = (start + step * (round_id - first_round)).strftime("%Y-%m-%d %H:%M:%S")
+            players = min(players_per_round, n_bets - written - len(bets))
+            total_bet = total_won = 0.0
+            for username in rng.sample(users, min(players, n_users)):
+                bet = float(rng.choice((10, 50, 100, 500, 1000)))
+                target = round(rng.uniform(1.1, 3.0), 2)
+                win = bet * target if engine.target_reached(target, crash) else 0.0
+                bets.append((username, bet, target if win else crash, win, crash, when, round_id))
+                total_bet += bet
+                total_won += win
+            rounds.append((round_id, "shared", crash, players, total_bet, total_won, when, when))
+            round_id += 1
+        with db.transaction() as c:
+            c.executemany('''
+                INSERT INTO rounds (id, mode, crash_multiplier, players, total_bet, total_won, started_at, crashed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rounds)
+            c.executemany('''
+                INSERT INTO bets (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, timestamp, round_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', bets)
+            db.get_backend().sync_id_sequence(c, "rounds")
+        written += len(bets)
+
+    # Counters, global_stats and daily_stats in one pass over the ledger
+    db.rebuild_stats()
+    return n_users, written, round_id - first_round
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic crash game data generator")
+    parser.add_argument("target", help="database to fill (a new SQLite file or a backend URL)")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--bets", type=int, default=10000000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--players-per-round", type=int, default=10)
+    args = parser.parse_args()
+
+    db.configure(args.target)
+    db.init_db()
+    t0 = time.perf_counter()
+    users, bets, rounds = seed(args.users, args.bets, args.days, args.players_per_round)
+    elapsed = time.perf_counter() - t0
+    report(f"seeded {db.get_backend().describe()}", [
+        ("users", f"{users:,}"),
+        ("bets", f"{bets:,}"),
+        ("rounds", f"{rounds:,}"),
+        ("time", f"{elapsed:,.1f} s ({bets / elapsed:,.0f} bets/sec)"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
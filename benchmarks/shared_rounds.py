@@ -0,0 +1,58 @@
+# One shared round with N players: bet placement, snapshot reads and the
+# single batched settlement, driven with a simulated clock.
+#
+#   python -m benchmarks.shared_rounds [--players 100 1000 5000]
+import time
+import random
+import argparse
+
+import db
+import engine
+from benchmarks.common import temp_database, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared round scheduler benchmark")
+    parser.add_argument("--players", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    temp_database()
+    with db.transaction() as c:
+        c.executemany(
+            "INSERT INTO users (username, password, balance) VALUES (?, ?, ?)",
+            [(f"player{i}", "x", 1e9) for i in range(max(args.players))],
+        )
+
+    for n_players in args.players:
+        clock = time.time()
+        scheduler = engine.RoundScheduler(db.place_bet, db.record_round, draw=lambda: (3.0, None),
+                                          reserve=db.reserve_round_id)
+        scheduler._open_betting(clock, *scheduler._next_round())
+
+        t0 = time.perf_counter()
+        for i in range(n_players):
+            scheduler.place_bet(f"player{i}", 100.0, random.choice([None, 1.5, 2.5, 4.0]))
+        place_time = time.perf_counter() - t0
+
+        scheduler.tick(scheduler.betting_ends)
+        t0 = time.perf_counter()
+        for i in range(n_players):
+            # every player's fragment refresh during one 0.1 s frame
+            scheduler.snapshot(f"player{i}", scheduler.flight_started + 1.0)
+        snapshot_time = time.perf_counter() - t0
+        for i in range(0, n_players, 3):
+            scheduler.cash_out(f"player{i}", scheduler.flight_started + 1.5)
+
+        t0 = time.perf_counter()
+        scheduler.tick(scheduler.crashes_at)
+        settle_time = time.perf_counter() - t0
+
+        report(f"{n_players:,} players in one round", [
+            ("bet placement", f"{place_time / n_players * 1e6:,.0f} us/bet"),
+            ("snapshot per refresh", f"{snapshot_time / n_players * 1e6:,.0f} us"),
+            ("batched settlement", f"{settle_time * 1000:,.1f} ms (1 commit)"),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Monte Carlo simulator: rounds/sec of the vectorised solo
+# simulation for 1..N worker processes, against a plain Python loop over
+# engine.draw_crash. Checks that both agree on RTP and win rate.
+#
+#   python -m benchmarks.simulator [--sessions 10000] [--rounds 1000] [--loop-rounds 300000]
+import os
+import random
+import argparse
+
+import engine
+import simulate
+from benchmarks.common import timed, report
+
+BET = 100.0
+BALANCE = 20000.0
+TARGET = 2.0
+
+
+def python_loop(sessions, rounds, seed=0):
+    # The same sessions one round at a time: (rounds played, RTP, win rate)
+    rng = random.Random(seed)
+    played = wins = 0
+    for _ in range(sessions):
+        balance = BALANCE
+        for _ in range(rounds):
+            if balance < BET:
+                break
+            crash, _ = engine.draw_crash(balance, rng.random())
+            played += 1
+            balance -= BET
+            if engine.target_reached(TARGET, crash):
+                wins += 1
+                balance += BET * TARGET
+    return played, wins * TARGET / played, wins / played
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo simulator benchmark")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--cells", type=int, default=4, help="grid cells (auto cash-out targets)")
+    parser.add_argument("--loop-rounds", type=int, default=300000, help="rounds for the plain Python loop")
+    args = parser.parse_args()
+
+    loop_sessions = max(1, args.loop_rounds // args.rounds)
+    loop_seconds, (loop_played, loop_rtp, loop_win_rate) = timed(python_loop, loop_sessions, args.rounds)
+    rows = [("python loop", f"{loop_played:,} rounds at {loop_played / loop_seconds:,.0f} rounds/sec, "
+                            f"RTP {loop_rtp:.2%}, win rate {loop_win_rate:.1%}")]
+
+    targets = [TARGET + i for i in range(args.cells)]
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        seconds, cells = timed(simulate.simulate, (BET,), (BALANCE,), targets, "solo",
+                               args.sessions, args.rounds, workers=workers, seed=1)
+        played = sum(c["rounds"] for c in cells)
+        rows.append((f"numpy, {workers} worker(s)", f"{played:,} rounds at {played / seconds:,.0f} rounds/sec "
+                                                   f"({played / seconds / (loop_played / loop_seconds):,.0f}x)"))
+    same = cells[0]
+    rows.append(("numpy at target 2x", f"RTP {same['rtp']:.2%}, win rate {same['win_rate']:.1%}"))
+    report(f"solo mode, bet {BET:,.0f}, balance {BALANCE:,.0f}, {os.cpu_count()} core(s)", rows)
+
+
+if __name__ == "__main__":
+    main()
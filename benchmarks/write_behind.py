@@ -0,0 +1,87 @@
+# Concurrent writers logging logins, events and ledger rows, synchronously
+# (one transaction each) and through the write-behind queue.
+#
+#   python -m benchmarks.write_behind [--writers 20] [--writes 500] [--users 1000]
+import time
+import random
+import argparse
+import threading
+
+import db
+from writer import WriteBehind
+from benchmarks.common import temp_database, percentiles, report
+
+
+def one_write(i, username):
+    if i % 3 == 0:
+        db.update_last_login(username)
+    elif i % 3 == 1:
+        db.log_event("bet", username, "bench")
+    else:
+        db.add_bet(username, 10.0, 1.5, 15.0, 2.0)
+
+
+def run(writers, writes, n_users):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for i in range(writes):
+            username = f"player{random.randrange(n_users)}"
+            t0 = time.perf_counter()
+            one_write(i, username)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write-behind queue benchmark")
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    temp_database()
+    with db.transaction() as c:
+        c.executemany(
+            "INSERT INTO users (username, password, balance) VALUES (?, ?, ?)",
+            [(f"player{i}", "x", 1000.0) for i in range(args.users)],
+        )
+
+    for queued in (False, True):
+        writer = WriteBehind().start() if queued else None
+        elapsed, latencies = run(args.writers, args.writes, args.users)
+        if writer is not None:
+            writer.stop()
+            stats = writer.metrics()
+        p50, p99 = percentiles(latencies)
+        total = len(latencies)
+        rows = [
+            ("writes", f"{total:,}"),
+            ("writes/sec", f"{total / elapsed:,.0f}"),
+            ("call p50 / p99", f"{p50:.3f} / {p99:.3f} ms"),
+        ]
+        if writer is not None:
+            rows.append(("flushes", f"{stats['flushes']:,} ({stats['flushed'] / max(1, stats['flushes']):.0f} rows each)"))
+            rows.append(("flush latency max", f"{stats['max_flush_ms']:.1f} ms"))
+            rows.append(("fell back to sync", f"{stats['rejected']:,}"))
+        report(f"{args.writers} writers, {'write-behind' if queued else 'synchronous'}", rows)
+
+    with db.connection() as c:
+        bets = c.execute("SELECT COUNT(*) FROM bets").fetchone()[0]
+        counted = c.execute("SELECT SUM(rounds_played) FROM users").fetchone()[0]
+    report("consistency", [("bets rows / rounds_played sum", f"{bets:,} / {counted:,}")])
+
+
+if __name__ == "__main__":
+    main()
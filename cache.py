@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+import functools
+from collections import OrderedDict
+
+# --- Read Cache ---
+# Process-wide read-through cache for hot read-only queries. Every session shares
+# one result per key until a write invalidates the key's tag, or the TTL expires
+# as a fallback for writes that bypass the db helpers.
+#
+# Invalidating a tag only bumps its generation: entries stored under an older
+# generation are dropped when they are next read, or pushed out by the size
+# cap (least recently used first), so a write never walks the whole cache.
+
+# Seconds a cached result may be served without an invalidation
+READ_CACHE_TTL = float(os.environ.get("CRASH_GAME_READ_CACHE_TTL", "5.0"))
+
+# Entries kept before the least recently used are evicted
+READ_CACHE_SIZE = int(os.environ.get("CRASH_GAME_READ_CACHE_SIZE", "10000"))
+
+
+class ReadCache:
+
+    def __init__(self, ttl=READ_CACHE_TTL, size=READ_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, tag generation, value), least recently used first
+        self._generations = {}  # tag -> bumped on every invalidation
+        self._loading = {}  # key -> lock held while one caller runs the query
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _lookup(self, key, generation, now):
+        # The live entry for key (marked most recently used), else None; a
+        # stale one is dropped. Caller holds self._lock.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] > now and entry[1] == generation:
+            self._entries.move_to_end(key)
+            return entry
+        del self._entries[key]
+        return None
+
+    def get(self, tag, key, load, ttl=None):
+        key = (tag, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lookup(key, self._generations.get(tag, 0), now)
+            if entry is not None:
+                self.hits += 1
+                return entry[2]
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        # Only one caller per key runs the query; the rest wait and reuse its result
+        with loading:
+            with self._lock:
+                generation = self._generations.get(tag, 0)
+                entry = self._lookup(key, generation, time.monotonic())
+                if entry is not None:
+                    self.hits += 1
+                    return entry[2]
+                self.misses += 1
+            value = load()
+            with self._lock:
+                # Don't store a result that an invalidation raced past
+                if self._generations.get(tag, 0) == generation:
+                    self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), generation, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.size:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+                self._loading.pop(key, None)
+            return value
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+read_cache = ReadCache()
+
+
+def cached(tag, ttl=None):
+    # Decorator: cache a read helper's result under `tag`, keyed by its arguments.
+    # Cached values are shared between sessions, so callers must not mutate them.
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            return read_cache.get(tag, key, lambda: fn(*args, **kwargs), ttl)
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+
+def invalidate(*tags):
+    read_cache.invalidate(*tags)
@@ -1,284 +1,187 @@
 import streamlit as st
-import sqlite3
-import random
-import time
+import os
 import pandas as pd
 import plotly.graph_objects as go
-import hashlib
 from datetime import datetime
 
+import db
+import auth
+import fair
+import backup
+import analytics
+import profiling
+import simulate
+import history
+from assets import PAGE_ASSETS
+from cache import read_cache
+from writer import WriteBehind, WRITE_BEHIND_ENABLED
+from engine import CRASH_TIERS, draw_crash, new_round, round_status, cash_out, utc_timestamp, RoundScheduler
+from db import (
+    init_db, add_user, verify_user, get_user_context, update_user_password, update_last_login, log_event,
+    get_all_users, delete_user, update_user_balance, apply_user_changes,
+    place_bet, update_balance, reserve_round_id, record_round, get_round_id_range, get_bets_page,
+    get_game_stats, rebuild_stats, get_bet_volume, get_leaderboard, get_leaderboard_size,
+)
+
+# Rows shown per page on the Leaderboard view
+LEADERBOARD_PAGE_SIZE = 100
+
+# Rows shown per page on the My Bets view
+MY_BETS_PAGE_SIZE = 50
+
+# Admin Bet History chart ranges (days back, None for all time)
+VOLUME_RANGES = {"7d": 7, "30d": 30, "All": None}
+
+# Crash History timeline ranges (latest rounds, None for every round)
+CRASH_HISTORY_RANGES = {"100": 100, "10k": 10000, "1M": 1000000, "All": None}
+
+# Wall time a rerun may spend before it starts rendering the game view
+RERUN_BUDGET_MS = 50.0
+
+# Views picked with radio navigation. Unlike st.tabs, only the selected view's
+# code (and queries) runs on a rerun.
+GAME_VIEWS = ("🎮 Play Game", "📋 My Bets", "💵 Crash History", "🏆 Leaderboard")
+ADMIN_VIEWS = ("User Management", "Game Statistics", "System Settings", "Profiling", "Simulator")
+
+# How often the in-flight multiplier refreshes while a round is running
+FLIGHT_REFRESH_SECONDS = 0.1
+
+# "shared": everyone plays the same process-wide rounds.
+# "solo": every player runs a private round with balance-tiered crash points.
+GAME_MODE = os.environ.get("CRASH_GAME_MODE", "shared")
+
+# Request header carrying the client address, set by the reverse proxy in
+# front of the app; failed logins are also rate limited per address
+CLIENT_IP_HEADER = os.environ.get("CRASH_GAME_CLIENT_IP_HEADER", "X-Forwarded-For")
+
+# Profile this rerun: sections below, db helper calls and statements (see profiling.py)
+rerun_profile = profiling.begin_rerun()
+profiling.section("startup")
+
 # Set up the Streamlit page (must be the first command)
 st.set_page_config(layout="wide")  # Use the full width of the screen
 
-# Hide Streamlit menu, footer, and prevent code inspection
-st.markdown("""
-    <style>
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    .stDeployButton {display: none !important;}  /* Hide GitHub button */
-    </style>
-
-    <script>
-    document.addEventListener('contextmenu', event => event.preventDefault());
-    document.onkeydown = function(e) {
-        if (e.ctrlKey && (e.keyCode === 85 || e.keyCode === 83)) {
-            return false;  // Disable "Ctrl + U" (View Source) & "Ctrl + S" (Save As)
-        }
-        if (e.keyCode == 123) {
-            return false;  // Disable "F12" (DevTools)
-        }
-    };
-    </script>
-    """, unsafe_allow_html=True)
+# Static CSS/JS lives in assets.py so it is built once per process
+st.markdown(PAGE_ASSETS, unsafe_allow_html=True)
 
-# Custom CSS for better styling
-st.markdown(
-    """
-    <style>
-    /* General Styling */
-    body {
-        font-family: 'Arial', sans-serif;
-        background-color: #f5f5f5;
-    }
-    @keyframes slide {
-        0% { transform: translateX(0%); }
-        100% { transform: translateX(-100%); }
-    }
-    /* Popup CSS */
-    .popup {
-        position: fixed;
-        top: 20px;
-        right: 20px;
-        background-color: #4CAF50;
-        color: white;
-        padding: 15px;
-        border-radius: 5px;
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-        z-index: 1000;
-        animation: fadeInOut 3s ease-in-out;
-    }
-    @keyframes fadeInOut {
-        0% { opacity: 0; }
-        10% { opacity: 1; }
-        90% { opacity: 1; }
-        100% { opacity: 0; }
-    }
-    .admin-button {
-        background-color: #dc3545 !important;
-        color: white !important;
-        border: none !important;
-    }
-    .user-button {
-        background-color: #28a745 !important;
-        color: white !important;
-        border: none !important;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+# --- Initialize Database ---
+# cache_resource runs the migrations and default-admin seed once per server
+# process instead of on every rerun of every session
+@st.cache_resource(show_spinner=False)
+def bootstrap():
+    init_db()
+    fair.ensure_chain()
+    return db.get_pool()
 
-# --- Password Hashing ---
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
 
-# --- Database Functions ---
-def init_db():
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    
-    # Users table with password and admin flag
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            password TEXT,
-            balance REAL DEFAULT 10000.0,
-            rounds_played INTEGER DEFAULT 0,
-            is_admin INTEGER DEFAULT 0,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            last_login TEXT
-        )
-    ''')
-    
-    # Bets table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS bets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            bet_amount REAL,
-            cashout_multiplier REAL,
-            win_amount REAL,
-            crash_multiplier REAL,
-            timestamp TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create default admin if not exists
-    admin_password = hash_password("admin123")
-    c.execute('''
-        INSERT OR IGNORE INTO users (username, password, is_admin, balance) 
-        VALUES (?, ?, 1, 100000)
-    ''', ("admin", admin_password))
-    
-    conn.commit()
-    conn.close()
-
-def add_user(username, password, is_admin=False):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    hashed_password = hash_password(password)
-    try:
-        c.execute('''
-            INSERT INTO users (username, password, is_admin) 
-            VALUES (?, ?, ?)
-        ''', (username, hashed_password, 1 if is_admin else 0))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False  # Username already exists
-    except Exception as e:
-        print(f"An error occurred: {e}")  # Optional: log the error
-        return False
-    finally:
-        conn.close()  # Ensure the connection is closed
-
-def verify_user(username, password):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    hashed_password = hash_password(password)
-    c.execute('''
-        SELECT * FROM users 
-        WHERE username=? AND password=?
-    ''', (username, hashed_password))
-    user = c.fetchone()
-    conn.close()
-    return user
-
-def get_user(username):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE username=?', (username,))
-    user = c.fetchone()
-    conn.close()
-    return user
-
-def update_user_password(username, new_password):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    hashed_password = hash_password(new_password)
-    c.execute('''
-        UPDATE users 
-        SET password = ? 
-        WHERE username=?
-    ''', (hashed_password, username))
-    conn.commit()
-    conn.close()
-
-def update_balance(username, amount):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    c.execute('''
-        UPDATE users 
-        SET balance = balance + ? 
-        WHERE username=?
-    ''', (amount, username))
-    conn.commit()
-    conn.close()
-
-def add_bet(username, bet_amount, cashout_multiplier, win_amount, crash_multiplier):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO bets (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier) 
-        VALUES (?, ?, ?, ?, ?)
-    ''', (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier))
-    conn.commit()
-    conn.close()
-
-def get_bets(limit=50, username=None):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    if username:
-        c.execute('''
-            SELECT username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, timestamp 
-            FROM bets 
-            WHERE username=? 
-            ORDER BY id DESC 
-            LIMIT ?
-        ''', (username, limit))
-    else:
-        c.execute('''
-            SELECT username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, timestamp 
-            FROM bets 
-            ORDER BY id DESC 
-            LIMIT ?
-        ''', (limit,))
-    bets = c.fetchall()
-    conn.close()
-    return bets
-
-def get_all_users():
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT id, username, balance, rounds_played, is_admin, created_at, last_login 
-        FROM users 
-        ORDER BY balance DESC
-    ''')
-    users = c.fetchall()
-    conn.close()
-    return users
-
-def delete_user(username):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM users WHERE username=?', (username,))
-    c.execute('DELETE FROM bets WHERE username=?', (username,))
-    conn.commit()
-    conn.close()
-
-def update_user_balance(username, new_balance):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    c.execute('''
-        UPDATE users 
-        SET balance = ? 
-        WHERE username=?
-    ''', (new_balance, username))
-    conn.commit()
-    conn.close()
-
-def update_last_login(username):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    c.execute('''
-        UPDATE users 
-        SET last_login = ? 
-        WHERE username=?
-    ''', (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), username))
-    conn.commit()
-    conn.close()
-
-def get_rounds_played(username):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    c.execute('SELECT COUNT(*) FROM bets WHERE username=?', (username,))
-    rounds_played = c.fetchone()[0]
-    conn.close()
-    return rounds_played
-
-def get_total_bets(username):
-    conn = sqlite3.connect('crash_game_secure.db')
-    c = conn.cursor()
-    c.execute('SELECT COUNT(*) FROM bets WHERE username=?', (username,))
-    total_bets = c.fetchone()[0]  # Return the count of bets
-    conn.close()
-    return total_bets
+bootstrap()
+
+
+# One write-behind thread per server process batches last_login and event writes
+@st.cache_resource(show_spinner=False)
+def get_writer():
+    return WriteBehind().start() if WRITE_BEHIND_ENABLED else None
+
+
+writer = get_writer()
+
+
+# Scheduled snapshots every CRASH_GAME_BACKUP_INTERVAL seconds (off by default)
+@st.cache_resource(show_spinner=False)
+def get_backup_scheduler():
+    return backup.BackupScheduler().start() if backup.BACKUP_INTERVAL > 0 else None
+
+
+backup_scheduler = get_backup_scheduler()
+
+
+# Columnar analytics snapshots for Game Statistics, refreshed every
+# CRASH_GAME_ANALYTICS_INTERVAL seconds (needs pyarrow)
+@st.cache_resource(show_spinner=False)
+def get_snapshot_exporter():
+    if analytics.available() and analytics.EXPORT_INTERVAL > 0:
+        return analytics.SnapshotExporter().start()
+    return None
+
+
+snapshot_exporter = get_snapshot_exporter()
+
+
+# One ticker thread per server process drives every shared round
+@st.cache_resource(show_spinner=False)
+def get_scheduler():
+    return RoundScheduler(debit=place_bet, settle=record_round, draw=fair.next_crash, reserve=reserve_round_id).start()
+
+# --- Admin Helpers ---
+# Full-history numbers for Game Statistics, from the analytics snapshot rather
+# than the live database. The arguments only key the cache: each export makes
+# a new summary, every other rerun reuses it.
+@st.cache_data(max_entries=2, show_spinner=False)
+def full_history_summary(exported_at, bets_hwm):
+    bets = analytics.to_pandas(analytics.with_month(
+        analytics.load_bets(("bet_amount", "win_amount", "cashout_multiplier", "timestamp"))
+    ))
+    monthly = bets.groupby("month", observed=True).agg(
+        bets=("bet_amount", "size"), wagered=("bet_amount", "sum"), won=("win_amount", "sum"),
+    )
+    monthly["profit"] = monthly["wagered"] - monthly["won"]
+    wins = bets["win_amount"] > 0
+    # Winning cash-outs in 0.1x buckets, everything from 10x up in the last one
+    cashouts = (bets.loc[wins, "cashout_multiplier"].clip(upper=10.0) * 10).round().div(10).value_counts().sort_index()
+
+    users = analytics.to_pandas(analytics.load_users(("username", "is_admin", "rounds_played", "total_wagered", "total_won")))
+    users = users[users["is_admin"] == 0].assign(profit=lambda u: u["total_won"] - u["total_wagered"])
+    top = users.nlargest(10, "profit")[["username", "rounds_played", "total_wagered", "profit"]]
+    return monthly.reset_index(), cashouts, float(wins.mean()) if len(bets) else 0.0, top
+
+
+def diff_user_edits(original_df, edited_df):
+    # Changed cells of the admin user editor, matched by ID so sorting the
+    # editor can't pair a row with the wrong user. One row per changed field.
+    merged = original_df[["ID", "Username", "Is Admin", "Balance"]].merge(
+        edited_df[["ID", "Is Admin", "Balance"]], on="ID", suffixes=("", " New")
+    )
+    admin_changed = merged["Is Admin"].astype(bool) != merged["Is Admin New"].astype(bool)
+    balance_changed = merged["Balance New"].notna() & (merged["Balance"] != merged["Balance New"])
+    frames = [
+        merged.loc[admin_changed, ["ID", "Username", "Is Admin", "Is Admin New"]]
+        .set_axis(["ID", "Username", "Old", "New"], axis=1).assign(Field="Is Admin"),
+        merged.loc[balance_changed, ["ID", "Username", "Balance", "Balance New"]]
+        .set_axis(["ID", "Username", "Old", "New"], axis=1).assign(Field="Balance"),
+    ]
+    return pd.concat(frames, ignore_index=True)[["ID", "Username", "Field", "Old", "New"]]
+
+
+# --- Crash History Figures ---
+# Plotly payloads for the Crash History view, shared by every session. The
+# newest round id only keys the cache, so a figure is rebuilt once per new
+# round rather than on every rerun; the points come downsampled from
+# history.py, so the browser gets at most history.MAX_POINTS of them.
+@st.cache_data(max_entries=8, show_spinner=False)
+def crash_timeline_figure(last_round_id, rounds):
+    x, y = history.crash_series(rounds)
+    fig = go.Figure(go.Scattergl(x=x, y=y, mode="lines+markers" if len(x) <= 200 else "lines",
+                                 hovertemplate="Round #%{x:.0f}<br>%{y:.2f}x<extra></extra>"))
+    fig.update_layout(
+        xaxis_title="Round",
+        yaxis_title="Crash Multiplier (x)",
+        yaxis_type="log",
+        title="Crash Multiplier over " + (f"Last {rounds:,} Rounds" if rounds else "All Rounds")
+              + (f" ({len(x):,} points shown)" if rounds is None or rounds > len(x) else ""),
+        height=400,
+    )
+    return fig.to_dict()
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def crash_distribution_figure(last_round_id):
+    summary = history.crash_summary()
+    labels, counts = zip(*summary["histogram"])
+    fig = go.Figure(go.Bar(x=labels, y=counts, hovertemplate="%{x}: %{y:,} rounds<extra></extra>"))
+    fig.update_layout(xaxis_title="Crash Multiplier", yaxis_title="Rounds",
+                      title=f"Crash Points of All {summary['rounds']:,} Rounds", height=350)
+    return summary, fig.to_dict()
 
-# --- Initialize Database ---
-init_db()
 
 # --- Session State Setup ---
 if 'logged_in' not in st.session_state:
@@ -287,18 +190,16 @@ if 'username' not in st.session_state:
     st.session_state.username = ""
 if 'is_admin' not in st.session_state:
     st.session_state.is_admin = False
-if 'playing' not in st.session_state:
-    st.session_state.playing = False
-if 'progress' not in st.session_state:
-    st.session_state.progress = 1.0
-if 'crash_multiplier' not in st.session_state:
-    st.session_state.crash_multiplier = 0.0
-if 'bet_amount' not in st.session_state:
-    st.session_state.bet_amount = 0.0
-if 'start_time' not in st.session_state:
-    st.session_state.start_time = 0.0
-if 'auto_cashout' not in st.session_state:
-    st.session_state.auto_cashout = None
+if 'round' not in st.session_state:
+    st.session_state.round = None  # Active round dict from engine.new_round, None when idle
+if 'last_result' not in st.session_state:
+    st.session_state.last_result = None  # (kind, message) shown above the bet form
+if 'my_bets_cursors' not in st.session_state:
+    st.session_state.my_bets_cursors = [None]  # My Bets keyset pagination stack
+if 'admin_audit' not in st.session_state:
+    st.session_state.admin_audit = None  # Changes applied by the last "Apply Changes"
+if 'shared_round_no' not in st.session_state:
+    st.session_state.shared_round_no = None  # Shared round this session has an open bet in
 if 'show_password_change' not in st.session_state:
     st.session_state.show_password_change = False
 if 'show_admin_panel' not in st.session_state:
@@ -306,9 +207,19 @@ if 'show_admin_panel' not in st.session_state:
 if 'show_user_management' not in st.session_state:
     st.session_state.show_user_management = False
 
+rerun_profile.label = st.session_state.username or None
+
 # --- Sidebar: Login ---
+profiling.section("sidebar")
 st.sidebar.title("🚀 Crash Game Authentication")
 
+def client_address():
+    # The address the nearest proxy saw (the last X-Forwarded-For entry; the
+    # ones before it come from the client), or None without the header
+    forwarded = st.context.headers.get(CLIENT_IP_HEADER, "")
+    return forwarded.rsplit(",", 1)[-1].strip() or None
+
+
 if not st.session_state.logged_in:
     login_tab, register_tab = st.sidebar.tabs(["Login", "Register"])
     
@@ -317,14 +228,29 @@ if not st.session_state.logged_in:
         password_input = st.text_input("Password", type="password")
         
         if st.button("Login"):
-            user = verify_user(username_input, password_input)
-            if user:
-                st.session_state.username = user[1]
-                st.session_state.logged_in = True
-                st.session_state.is_admin = bool(user[5])
-                update_last_login(st.session_state.username)
-                st.sidebar.success(f"Welcome back, {st.session_state.username}!")
-            st.rerun()
+            # Too many recent failures for this username or address: refuse without hashing
+            client = client_address()
+            retry_after = auth.login_limiter.retry_after(username_input, client)
+            if retry_after:
+                st.error(f"Too many failed attempts. Try again in {retry_after:.0f} seconds.")
+            else:
+                try:
+                    with st.spinner("Checking password..."):
+                        user = verify_user(username_input, password_input)
+                except auth.HashingBusy as e:
+                    st.error(str(e))
+                else:
+                    if user:
+                        auth.login_limiter.succeeded(username_input)
+                        st.session_state.username = user[1]
+                        st.session_state.logged_in = True
+                        st.session_state.is_admin = bool(user[5])
+                        update_last_login(st.session_state.username)
+                        log_event("login", st.session_state.username)
+                        st.sidebar.success(f"Welcome back, {st.session_state.username}!")
+                    else:
+                        auth.login_limiter.failed(username_input, client)
+                    st.rerun()
     
     with register_tab:
         new_username = st.text_input("Choose Username")
@@ -339,78 +265,74 @@ if not st.session_state.logged_in:
             elif len(new_username) < 3:
                 st.error("Username must be at least 3 characters")
             else:
-                if add_user(new_username, new_password):
-                    st.success("Account created successfully! Please login.")
+                try:
+                    created = add_user(new_username, new_password)
+                except auth.HashingBusy as e:
+                    st.error(str(e))
                 else:
-                    st.error("Username already exists")
+                    if created:
+                        st.success("Account created successfully! Please login.")
+                    else:
+                        st.error("Username already exists")
 
 else:
-    # Display logged-in user info
-    user = get_user(st.session_state.username)
-    if user:  # Check if user exists
-        user_balance = user[3]
-        total_bets = get_total_bets(st.session_state.username)  # Get total number of bets for the user
+    # Everything this rerun shows about the user, read once (see db.UserContext)
+    me = get_user_context(st.session_state.username)
+    if me is None:
+        # Deleted or renamed while logged in: nothing below can render without the user
+        st.error("User not found. Please log in again.")
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+        st.stop()
 
-        st.sidebar.markdown(f"<h2 style='color: #007bff;'>👤 {st.session_state.username}</h2>", unsafe_allow_html=True)
-        
-        if st.session_state.is_admin:
-            st.sidebar.markdown("<h3 style='color: #dc3545;'>ADMIN ACCOUNT</h3>", unsafe_allow_html=True)
-        else:
-            st.sidebar.markdown(f"<h4>Balance: ₹{user_balance:.2f}</h4>", unsafe_allow_html=True)
-
-            # Calculate and display the user's rank
-            users = get_all_users()  # Get all users to determine rank
-            leaderboard_data = []
-            for user in users:
-                if not user[4]:  # Check if the user is not an admin
-                    total_bets_user = get_total_bets(user[1])  # Get total number of bets for the user
-                    leaderboard_data.append({
-                        "Username": user[1],
-                        "Total Bets": total_bets_user,
-                    })
-
-            # Assign ranks starting from 1
-            for rank, user in enumerate(leaderboard_data, start=1):
-                user["Rank"] = rank
-
-            # Find the user's rank
-            user_rank = next((u["Rank"] for u in leaderboard_data if u["Username"] == st.session_state.username), None)
-
-            # Display the user's rank below the balance
-            if user_rank is not None:
-                st.sidebar.markdown(f"<h4>Rank: {user_rank}</h4>", unsafe_allow_html=True)
-
-        # Password change section
-        if st.sidebar.button("Change Password"):
-            st.session_state.show_password_change = not st.session_state.show_password_change
-        
-        if st.session_state.show_password_change:
-            with st.sidebar.form("password_change_form"):
-                current_password = st.text_input("Current Password", type="password")
-                new_password = st.text_input("New Password", type="password")
-                confirm_new_password = st.text_input("Confirm New Password", type="password")
-                
-                if st.form_submit_button("Update Password"):
-                    if new_password != confirm_new_password:
-                        st.error("New passwords don't match!")
-                    elif len(new_password) < 6:
-                        st.error("Password must be at least 6 characters")
-                    else:
-                        # Verify current password first
-                        if verify_user(st.session_state.username, current_password):
+    st.sidebar.markdown(f"<h2 style='color: #007bff;'>👤 {st.session_state.username}</h2>", unsafe_allow_html=True)
+    
+    if st.session_state.is_admin:
+        st.sidebar.markdown("<h3 style='color: #dc3545;'>ADMIN ACCOUNT</h3>", unsafe_allow_html=True)
+    else:
+        st.sidebar.markdown(f"<h4>Balance: ₹{me.balance:.2f}</h4>", unsafe_allow_html=True)
+
+        # Display the user's rank below the balance
+        if me.rank is not None:
+            st.sidebar.markdown(f"<h4>Rank: {me.rank}</h4>", unsafe_allow_html=True)
+
+    # Password change section
+    if st.sidebar.button("Change Password"):
+        st.session_state.show_password_change = not st.session_state.show_password_change
+    
+    if st.session_state.show_password_change:
+        with st.sidebar.form("password_change_form"):
+            current_password = st.text_input("Current Password", type="password")
+            new_password = st.text_input("New Password", type="password")
+            confirm_new_password = st.text_input("Confirm New Password", type="password")
+            
+            if st.form_submit_button("Update Password"):
+                if new_password != confirm_new_password:
+                    st.error("New passwords don't match!")
+                elif len(new_password) < 6:
+                    st.error("Password must be at least 6 characters")
+                else:
+                    # Verify current password first
+                    try:
+                        verified = verify_user(st.session_state.username, current_password)
+                        if verified:
                             update_user_password(st.session_state.username, new_password)
+                    except auth.HashingBusy as e:
+                        st.error(str(e))
+                    else:
+                        if verified:
                             st.success("Password updated successfully!")
                             st.session_state.show_password_change = False
                             st.rerun()
                         else:
                             st.error("Current password is incorrect")
-        
-        # Admin panel toggle
-        if st.session_state.is_admin:
-            if st.sidebar.button("Admin Panel", key="admin_panel_toggle"):
-                st.session_state.show_admin_panel = not st.session_state.show_admin_panel
-        
-        # Logout button
+    
+    # Admin panel toggle
+    if st.session_state.is_admin:
+        if st.sidebar.button("Admin Panel", key="admin_panel_toggle"):
+            st.session_state.show_admin_panel = not st.session_state.show_admin_panel
+    
+    # Logout button
     if st.sidebar.button("Logout"):
         for key in list(st.session_state.keys()):
             del st.session_state[key]
@@ -423,9 +345,10 @@ if st.session_state.logged_in:
     if st.session_state.is_admin and st.session_state.show_admin_panel:
         st.title("🛠️ Admin Panel")
         
-        admin_tabs = st.tabs(["User Management", "Game Statistics", "System Settings"])
+        admin_view = st.radio("Admin view", ADMIN_VIEWS, horizontal=True, key="admin_view", label_visibility="collapsed")
         
-        with admin_tabs[0]:
+        if admin_view == "User Management":
+            profiling.section("admin: User Management")
             st.subheader("User Accounts Management")
             
             # Create new user (admin only)
@@ -440,12 +363,17 @@ if st.session_state.logged_in:
                         initial_balance = 0.0
                     
                     if st.form_submit_button("Create User"):
-                        if add_user(new_username, new_password, is_admin):
-                            if not is_admin:
-                                update_user_balance(new_username, initial_balance)
-                            st.success(f"User {new_username} created successfully!")
+                        try:
+                            created = add_user(new_username, new_password, is_admin)
+                        except auth.HashingBusy as e:
+                            st.error(str(e))
                         else:
-                            st.error("Username already exists")
+                            if created:
+                                if not is_admin:
+                                    update_user_balance(new_username, initial_balance)
+                                st.success(f"User {new_username} created successfully!")
+                            else:
+                                st.error("Username already exists")
             
             # User list with management options
             st.subheader("All Users")
@@ -464,36 +392,27 @@ if st.session_state.logged_in:
                 disabled=["ID", "Username", "Rounds", "Created At", "Last Login"]
             )
             
-            # Apply changes button
+            # Apply changes button: diff the whole editor against the original by ID
             if st.button("Apply Changes"):
-                for index, row in edited_df.iterrows():
-                    # Update admin status and balance
-                    original_user = users[index]
-                    changes_made = False
-                    
-                    # Check if admin status changed
-                    if bool(row["Is Admin"]) != bool(original_user[4]):
-                        conn = sqlite3.connect('crash_game_secure.db')
-                        c = conn.cursor()
-                        c.execute('''
-                            UPDATE users 
-                            SET is_admin = ? 
-                            WHERE id = ?
-                        ''', (int(row["Is Admin"]), row["ID"]))
-                        conn.commit()
-                        conn.close()
-                        changes_made = True
-                    
-                    # Check if balance changed
-                    if float(row["Balance"]) != float(original_user[2]):
-                        update_user_balance(row["Username"], row["Balance"])
-                        changes_made = True
-                    
-                if changes_made:
-                    st.success("Changes saved successfully!")
-                    st.rerun()
-                else:
+                changes = diff_user_edits(users_df, edited_df)
+                if changes.empty:
                     st.info("No changes detected")
+                else:
+                    admin_changes = changes[changes["Field"] == "Is Admin"]
+                    balance_changes = changes[changes["Field"] == "Balance"]
+                    # tolist() hands sqlite3 plain Python scalars instead of numpy ones
+                    apply_user_changes(
+                        admin_updates=list(zip(admin_changes["New"].astype(bool).tolist(), admin_changes["ID"].astype(int).tolist())),
+                        balance_updates=list(zip(balance_changes["New"].astype(float).tolist(), balance_changes["ID"].astype(int).tolist())),
+                    )
+                    st.session_state.admin_audit = changes
+                    st.rerun()
+
+            # Audit summary of the last applied edit
+            if st.session_state.admin_audit is not None:
+                audit = st.session_state.admin_audit
+                st.success(f"Saved {len(audit)} change(s) across {audit['ID'].nunique()} user(s)")
+                st.dataframe(audit.astype({"Old": str, "New": str}), hide_index=True, use_container_width=True)
             
             # User deletion
             with st.expander("Delete User", expanded=False):
@@ -508,217 +427,514 @@ if st.session_state.logged_in:
                     st.success(f"User {user_to_delete} deleted successfully!")
                     st.rerun()
         
-        with admin_tabs[1]:
+        if admin_view == "Game Statistics":
+            profiling.section("admin: Game Statistics")
             st.subheader("Game Statistics")
             
-            # Total users
-            conn = sqlite3.connect('crash_game_secure.db')
-            c = conn.cursor()
-            c.execute('SELECT COUNT(*) FROM users')
-            total_users = c.fetchone()[0]
-            
-            c.execute('SELECT COUNT(*) FROM users WHERE is_admin = 1')
-            total_admins = c.fetchone()[0]
-            
-            c.execute('SELECT SUM(balance) FROM users')
-            total_balance = c.fetchone()[0] or 0
-            
-            c.execute('SELECT COUNT(*) FROM bets')
-            total_bets = c.fetchone()[0]
-            
-            conn.close()
+            # Totals are read from the maintained global_stats row
+            stats = get_game_stats()
             
             # Display stats in columns
             col1, col2, col3, col4 = st.columns(4)
-            col1.metric("Total Users", total_users)
-            col2.metric("Administrators", total_admins)
-            col3.metric("Total Balance", f"₹{total_balance:,.2f}")
-            col4.metric("Total Bets Placed", total_bets)
+            col1.metric("Total Users", stats["total_users"])
+            col2.metric("Administrators", stats["total_admins"])
+            col3.metric("Total Balance", f"₹{stats['total_balance']:,.2f}")
+            col4.metric("Total Bets Placed", stats["total_bets"])
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Rounds Played", stats["total_rounds"])
+            col2.metric("Total Wagered", f"₹{stats['total_wagered']:,.2f}")
+            col3.metric("Total Paid Out", f"₹{stats['total_won']:,.2f}")
+            col4.metric("House Profit", f"₹{stats['total_wagered'] - stats['total_won']:,.2f}")
+
+            if st.button("Rebuild Statistics", help="Recompute every aggregate from the bets ledger"):
+                rebuild_stats()
+                st.success("Statistics rebuilt from the ledger")
+                st.rerun()
             
-            # Bet history chart
+            # Bet history chart, aggregated in SQL / the daily rollup
             st.subheader("Bet History")
-            all_bets = get_bets(limit=1000)
-            if all_bets:
-                bet_dates = [datetime.strptime(row[5], "%Y-%m-%d %H:%M:%S").date() for row in all_bets]
-                bet_amounts = [row[1] for row in all_bets]
-                
-                # Create a DataFrame with date and bet amount
-                bets_by_date = pd.DataFrame({
-                    'Date': bet_dates,
-                    'Bet Amount': bet_amounts
-                })
-                
-                # Group by date and sum bet amounts
-                daily_bets = bets_by_date.groupby('Date').sum().reset_index()
-                
+            range_col, bucket_col = st.columns(2)
+            volume_range = range_col.radio("Range", list(VOLUME_RANGES), index=1, horizontal=True, key="volume_range")
+            volume_bucket = bucket_col.radio("Bucket", ["Hour", "Day", "Week"], index=1, horizontal=True, key="volume_bucket")
+            range_days = VOLUME_RANGES[volume_range]
+            if volume_bucket == "Hour" and range_days is None:
+                st.caption("Hourly buckets are limited to 30 days; showing the last 30 days.")
+                range_days = 30
+
+            labels, bet_counts, bet_volume = get_bet_volume(volume_bucket.lower(), range_days)
+            if labels:
                 fig = go.Figure()
                 fig.add_trace(go.Scatter(
-                    x=daily_bets['Date'],
-                    y=daily_bets['Bet Amount'],
+                    x=labels,
+                    y=bet_volume,
+                    customdata=bet_counts,
+                    hovertemplate="%{x}<br>₹%{y:,.2f} over %{customdata} bets<extra></extra>",
                     mode='lines+markers',
-                    name='Daily Bet Volume'
+                    name={"Hour": "Hourly", "Day": "Daily", "Week": "Weekly"}[volume_bucket] + " Bet Volume"
                 ))
                 
                 fig.update_layout(
-                    xaxis_title="Date",
+                    xaxis_title=volume_bucket,
                     yaxis_title="Total Bet Amount (₹)",
-                    title="Daily Betting Activity",
+                    title=f"Betting Activity per {volume_bucket} ({volume_range})",
                     height=400
                 )
                 
                 st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info("No bets in this range")
+
+            # Full history, including archived bets, from the columnar snapshot
+            st.subheader("Full History")
+            if not analytics.available():
+                st.info("Full-history analysis needs pyarrow (pip install pyarrow)")
+            else:
+                if st.button("Update Snapshot", help="Export the bets placed since the last snapshot"):
+                    with st.spinner("Exporting new bets..."):
+                        export_stats = analytics.export()
+                    st.success(f"Exported {export_stats['new_bets']:,} new bets in {export_stats['seconds']:.1f} s")
+                manifest = analytics.read_manifest()
+                if manifest["bets_rows"]:
+                    st.caption(f"Snapshot of {manifest['bets_rows']:,} bets and {manifest['users_rows']:,} users, "
+                               f"exported {manifest['exported_at']} UTC")
+                    monthly, cashouts, win_rate, top_players = full_history_summary(
+                        manifest["exported_at"], manifest["bets_hwm"]
+                    )
+
+                    fig = go.Figure()
+                    fig.add_trace(go.Bar(x=monthly["month"], y=monthly["wagered"], name="Wagered"))
+                    fig.add_trace(go.Bar(x=monthly["month"], y=monthly["profit"], name="House Profit"))
+                    fig.update_layout(barmode="group", xaxis_title="Month", yaxis_title="₹",
+                                      title="Monthly Wagered and House Profit", height=400)
+                    st.plotly_chart(fig, use_container_width=True)
+
+                    col1, col2 = st.columns(2)
+                    col1.metric("Winning Bets", f"{win_rate:.1%}")
+                    fig = go.Figure(go.Bar(x=cashouts.index, y=cashouts.values))
+                    fig.update_layout(xaxis_title="Cash-out (x, 10x and up in the last bar)", yaxis_title="Winning bets",
+                                      title="Winning Cash-outs", height=300)
+                    col1.plotly_chart(fig, use_container_width=True)
+                    col2.write("Most profitable players")
+                    col2.dataframe(
+                        top_players.rename(columns={"username": "Username", "rounds_played": "Bets",
+                                                    "total_wagered": "Wagered", "profit": "Profit"}),
+                        column_config={
+                            "Wagered": st.column_config.NumberColumn(format="₹%.2f"),
+                            "Profit": st.column_config.NumberColumn(format="₹%.2f"),
+                        },
+                        hide_index=True, use_container_width=True,
+                    )
+                else:
+                    st.info("No snapshot yet")
         
-        with admin_tabs[2]:
+        if admin_view == "System Settings":
+            profiling.section("admin: System Settings")
             st.subheader("System Settings")
             
             # Database management
             with st.expander("Database Operations"):
                 if st.button("Export Database Backup"):
-                    # In a real app, you would implement proper backup functionality
-                    st.warning("Backup functionality would be implemented in production")
+                    # Online backup: live bets keep committing while it copies
+                    try:
+                        with st.spinner("Backing up database..."):
+                            stats = backup.backup()
+                    except RuntimeError as e:
+                        st.error(str(e))
+                    else:
+                        st.success(f"Saved {os.path.basename(stats['path'])}")
+                        col1, col2, col3, col4 = st.columns(4)
+                        col1.metric("Database Size", f"{stats['db_bytes'] / 1e6:,.1f} MB")
+                        col2.metric("Backup Size", f"{stats['file_bytes'] / 1e6:,.1f} MB")
+                        col3.metric("Throughput", f"{stats['mb_per_sec']:,.1f} MB/s")
+                        col4.metric("Max Writer Stall", f"{stats['max_writer_stall_ms']:.1f} ms")
+
+                # Snapshots on disk, newest first
+                snapshots = backup.list_snapshots()
+                if snapshots:
+                    snapshot = st.selectbox(
+                        "Snapshots",
+                        snapshots,
+                        format_func=lambda s: f"{s[0]} ({s[1] / 1e6:,.1f} MB)",
+                    )
+                    # The snapshot is only read into memory for the download when asked
+                    # to, not on every rerun of this view; clicking Download drops it again
+                    if st.button("Prepare Download", help="Load the selected snapshot for downloading"):
+                        st.session_state.backup_download = snapshot[0]
+                    if st.session_state.get("backup_download") == snapshot[0]:
+                        with open(os.path.join(backup.BACKUP_DIR, snapshot[0]), "rb") as f:
+                            st.download_button("Download Snapshot", f.read(), file_name=snapshot[0],
+                                               mime="application/octet-stream",
+                                               on_click=lambda: st.session_state.pop("backup_download", None))
+                if backup_scheduler is not None:
+                    st.caption(f"Scheduled every {backup.BACKUP_INTERVAL / 3600:g} h, keeping the newest "
+                               f"{backup.BACKUP_KEEP}: {backup_scheduler.runs} taken, {backup_scheduler.failures} failed")
                 
+                # Ledger archive: old bets move to monthly tables, totals are unchanged
+                if st.button(f"Archive Bets Older Than {db.ARCHIVE_AFTER_DAYS} Days"):
+                    with st.spinner("Archiving bets..."):
+                        moved = db.archive_bets()
+                    st.success(f"Archived {moved:,} bets")
+                partitions = db.get_archive_partitions()
+                if partitions:
+                    st.dataframe(
+                        pd.DataFrame(partitions, columns=["Table", "Month", "Bets", "First ID", "Last ID", "Last Archived"]),
+                        hide_index=True, use_container_width=True,
+                    )
+
                 if st.button("Reset Demo Data"):
                     st.warning("This would reset all data in a real implementation")
                     st.info("Demo only - no action taken")
             
             # System information
             st.subheader("System Information")
-            st.write(f"Database file: crash_game_secure.db")
+            st.write(f"Database: {db.get_backend().describe()}")
             st.write(f"Current time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+            # Shared read cache in front of the leaderboard / user list / crash history
+            cache_stats = read_cache.stats()
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Cache Entries", cache_stats["entries"])
+            col2.metric("Cache Hit Rate", f"{cache_stats['hit_rate']:.1%}")
+            col3.metric("Hits / Misses", f"{cache_stats['hits']:,} / {cache_stats['misses']:,}")
+            col4.metric("Invalidations / Evictions", f"{cache_stats['invalidations']:,} / {cache_stats['evictions']:,}")
+
+            # Write-behind queue for last_login / event writes
+            if writer is not None:
+                writer_stats = writer.metrics()
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Write Queue Depth", writer_stats["queue_depth"])
+                col2.metric("Rows Flushed", f"{writer_stats['flushed']:,}")
+                col3.metric("Flushes", f"{writer_stats['flushes']:,}")
+                col4.metric("Flush Latency (last / max)", f"{writer_stats['last_flush_ms']:.1f} / {writer_stats['max_flush_ms']:.1f} ms")
+                st.caption(f"Failed flushes: {writer_stats['failed']:,}, rows awaiting retry: "
+                           f"{writer_stats['retrying']:,}, rows dropped: {writer_stats['dropped']:,}")
+            else:
+                st.write("Write-behind queue: disabled (CRASH_GAME_WRITE_BEHIND=0)")
+
+        if admin_view == "Profiling":
+            profiling.section("admin: Profiling")
+            st.subheader("Rerun Profiling")
+            st.caption("Sections and db helpers of profiled reruns in this server process, slowest first.")
+            if st.checkbox("Show profiling data", key="show_profiling"):
+                recent = list(profiling.registry.recent)[-50:][::-1]
+                if recent:
+                    st.markdown("**Recent reruns and fragment refreshes**")
+                    st.dataframe(
+                        pd.DataFrame(
+                            [(p.kind, p.label, p.status, p.total_ms, p.statements, sum(q[0] for q in p.queries.values()))
+                             for p in recent],
+                            columns=["Kind", "User", "Status", "Wall (ms)", "Statements", "Helper Calls"],
+                        ),
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={"Wall (ms)": st.column_config.NumberColumn(format="%.2f")},
+                    )
+
+                    st.markdown("**Slowest sections**")
+                    st.dataframe(
+                        pd.DataFrame(profiling.registry.slowest_sections(),
+                                     columns=["Section", "Renders", "Mean (ms)", "Worst Recent (ms)"]),
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={
+                            "Mean (ms)": st.column_config.NumberColumn(format="%.2f"),
+                            "Worst Recent (ms)": st.column_config.NumberColumn(format="%.2f"),
+                        },
+                    )
+
+                    st.markdown("**Slowest db helpers**")
+                    st.dataframe(
+                        pd.DataFrame(profiling.registry.slowest_queries(),
+                                     columns=["Helper", "Calls", "Statements", "Rows", "Mean (ms)", "Total (ms)"]),
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={
+                            "Mean (ms)": st.column_config.NumberColumn(format="%.3f"),
+                            "Total (ms)": st.column_config.NumberColumn(format="%.1f"),
+                        },
+                    )
+                else:
+                    st.info("No reruns profiled yet")
+
+                st.download_button(
+                    "Download metrics (Prometheus text)",
+                    profiling.registry.prometheus_text(),
+                    file_name="crash_game_metrics.prom",
+                    mime="text/plain",
+                )
+
+        if admin_view == "Simulator":
+            profiling.section("admin: Simulator")
+            st.subheader("Crash Simulator")
+            st.caption("Monte Carlo runs of the crash-point rules over a grid of bet sizes, starting balances and "
+                       "auto cash-out targets. Try tier changes here before editing engine.CRASH_TIERS.")
+            with st.form("simulator_form"):
+                sim_mode = st.radio("Crash points", simulate.MODES, horizontal=True,
+                                    format_func={"solo": "Solo (balance tiers)", "shared": "Shared (provably fair)"}.get)
+                col1, col2, col3 = st.columns(3)
+                bets_text = col1.text_input("Bet sizes", ", ".join(f"{x:g}" for x in simulate.DEFAULT_BETS))
+                balances_text = col2.text_input("Starting balances", ", ".join(f"{x:g}" for x in simulate.DEFAULT_BALANCES))
+                targets_text = col3.text_input("Auto cash-out targets (x)", ", ".join(f"{x:g}" for x in simulate.DEFAULT_TARGETS))
+                col1, col2, col3 = st.columns(3)
+                sim_sessions = col1.number_input("Players per cell", min_value=100, max_value=1000000,
+                                                 value=simulate.SESSIONS, step=1000)
+                sim_rounds = col2.number_input("Rounds per player", min_value=10, max_value=100000,
+                                               value=simulate.ROUNDS, step=100)
+                sim_seed = col3.number_input("Seed", min_value=0, value=0, step=1)
+                st.write("Balance tiers for solo mode, highest first (leave the last Min Balance empty)")
+                tier_rows = st.data_editor(
+                    pd.DataFrame([(threshold, low, high, speed) for threshold, (low, high), speed in CRASH_TIERS],
+                                 columns=["Min Balance", "Crash Low", "Crash High", "Speed"]),
+                    num_rows="dynamic", hide_index=True, use_container_width=True, key="simulator_tiers",
+                )
+                run_simulation = st.form_submit_button("Run Simulation")
+
+            if run_simulation:
+                try:
+                    grid = [[float(x) for x in text.split(",") if x.strip()]
+                            for text in (bets_text, balances_text, targets_text)]
+                    tiers = [(None if pd.isna(row["Min Balance"]) else float(row["Min Balance"]),
+                              (float(row["Crash Low"]), float(row["Crash High"])), float(row["Speed"]))
+                             for _, row in tier_rows.iterrows()]
+                    simulate.check_tiers(tiers)
+                except ValueError as e:
+                    st.error(f"Invalid simulation settings: {e}")
+                else:
+                    cells = len(grid[0]) * len(grid[1]) * len(grid[2])
+                    with st.spinner(f"Simulating up to {cells * sim_sessions * sim_rounds:,} rounds "
+                                    f"on {simulate.WORKERS} worker(s)..."):
+                        start = datetime.now()
+                        results = simulate.simulate(*grid, mode=sim_mode, sessions=sim_sessions, rounds=sim_rounds,
+                                                    tiers=tiers, seed=sim_seed)
+                        elapsed = (datetime.now() - start).total_seconds()
+                    st.session_state.simulation = (sim_mode, pd.DataFrame(results), elapsed)
+
+            if st.session_state.get("simulation") is not None:
+                sim_mode, results, elapsed = st.session_state.simulation
+                total_rounds = int(results["rounds"].sum())
+                st.caption(f"{sim_mode.title()} mode: {total_rounds:,} rounds in {elapsed:.1f} s "
+                           f"({total_rounds / max(elapsed, 1e-9):,.0f} rounds/sec)")
+                table = results.assign(rtp=results["rtp"] * 100, house_edge=results["house_edge"] * 100,
+                                       win_rate=results["win_rate"] * 100, ruin_rate=results["ruin_rate"] * 100)
+                st.dataframe(
+                    table[["bet", "balance", "target", "rounds", "rtp", "house_edge", "win_rate", "payout_variance",
+                           "mean_round_seconds", "ruin_rate", "mean_final_balance", "mean_drawdown",
+                           "p95_drawdown", "max_drawdown"]].rename(columns={
+                        "bet": "Bet", "balance": "Start Balance", "target": "Target", "rounds": "Rounds",
+                        "rtp": "RTP", "house_edge": "House Edge", "win_rate": "Win Rate",
+                        "payout_variance": "Payout Variance", "mean_round_seconds": "Round (s)",
+                        "ruin_rate": "Ruined", "mean_final_balance": "Mean Final Balance",
+                        "mean_drawdown": "Mean Drawdown", "p95_drawdown": "p95 Drawdown",
+                        "max_drawdown": "Max Drawdown",
+                    }),
+                    column_config={
+                        "Bet": st.column_config.NumberColumn(format="₹%.0f"),
+                        "Start Balance": st.column_config.NumberColumn(format="₹%.0f"),
+                        "Target": st.column_config.NumberColumn(format="%.2fx"),
+                        "RTP": st.column_config.NumberColumn(format="%.2f%%"),
+                        "House Edge": st.column_config.NumberColumn(format="%.2f%%"),
+                        "Win Rate": st.column_config.NumberColumn(format="%.1f%%"),
+                        "Payout Variance": st.column_config.NumberColumn(format="%.3f"),
+                        "Round (s)": st.column_config.NumberColumn(format="%.2f"),
+                        "Ruined": st.column_config.NumberColumn(format="%.1f%%"),
+                        "Mean Final Balance": st.column_config.NumberColumn(format="₹%.0f"),
+                        "Mean Drawdown": st.column_config.NumberColumn(format="₹%.0f"),
+                        "p95 Drawdown": st.column_config.NumberColumn(format="₹%.0f"),
+                        "Max Drawdown": st.column_config.NumberColumn(format="₹%.0f"),
+                    },
+                    hide_index=True, use_container_width=True,
+                )
+
+                # RTP against the target, one line per bet size and starting balance
+                fig = go.Figure()
+                for (bet, balance), group in table.groupby(["bet", "balance"]):
+                    fig.add_trace(go.Scatter(x=group["target"], y=group["rtp"], mode="lines+markers",
+                                             name=f"₹{bet:,.0f} bet, ₹{balance:,.0f} balance"))
+                fig.add_hline(y=100, line_dash="dot")
+                fig.update_layout(xaxis_title="Auto cash-out target (x)", yaxis_title="RTP (%)",
+                                  title="Return to Player by Auto Cash-out Target", height=400)
+                st.plotly_chart(fig, use_container_width=True)
     
     # Main Game Interface (only show if admin panel is not shown or user is not admin)
     if not st.session_state.is_admin or not st.session_state.show_admin_panel:
         st.title("🚀 Crash Game")
 
-    user = get_user(st.session_state.username)
-    if user:  # Check if user exists
-        balance = user[3]
-        st.subheader(f"Balance: ₹{balance:.2f}")
-    else:
-        st.error("User not found. Please log in again.")
+    profiling.section("balance header")
+    balance = me.balance
+    st.subheader(f"Balance: ₹{balance:.2f}")
+
+    # Measure how long this rerun took to reach the game view
+    st.session_state.pre_tab_ms = rerun_profile.elapsed_ms()
+    if st.session_state.pre_tab_ms > RERUN_BUDGET_MS:
+        profiling.logger.warning("Rerun for %s took %.1f ms to reach the game view (budget %.0f ms)",
+                                 st.session_state.username, st.session_state.pre_tab_ms, RERUN_BUDGET_MS)
+
+    # --- Round in flight ---
+    def settle_round(cashout_multiplier):
+        # Settle the session's solo round and go back to the bet form with a result message
+        current = st.session_state.round
+        crash = current["crash_multiplier"]
+        if cashout_multiplier is None:
+            settlement = (current["username"], current["bet_amount"], crash, 0.0, crash)
+            st.session_state.last_result = ("error", f"💥 You lost the bet! Crash occurred at {crash:.2f}x.")
+        else:
+            win_amount = current["bet_amount"] * cashout_multiplier
+            settlement = (current["username"], current["bet_amount"], cashout_multiplier, win_amount, crash)
+            st.session_state.last_result = ("success", f"🏆 Cashed out at {cashout_multiplier:.2f}x! Won ₹{win_amount:.2f}")
+        record_round(crash, [settlement], mode="solo", started_at=utc_timestamp(current["started_at"]),
+                     chain_idx=current.get("chain_idx"))
+        st.session_state.round = None
+        st.rerun()
+
+    # Only this fragment refreshes while flying; the rest of the script is not re-run
+    @st.fragment(run_every=FLIGHT_REFRESH_SECONDS)
+    @profiling.profile_fragment("flight_view")
+    def flight_view():
+        current = st.session_state.round
+        if current is None:
+            return
+        status, multiplier = round_status(current)
+        if status == "auto_cashout":
+            settle_round(multiplier)
+        elif status == "crashed":
+            settle_round(None)
 
-    # Initialize speed_factor
-    speed_factor = 0.05  # Default to Easy speed
+        st.markdown(f"<h1 style='text-align:center;color:green;'>{multiplier:.2f}x</h1>", unsafe_allow_html=True)
+        if st.button("🏆 TAKE WIN"):
+            # The payout is whatever the server clock says now, not what was last drawn
+            settle_round(cash_out(current))
 
-    # --- Tabs for navigation ---
-    tabs = st.tabs(["🎮 Play Game", "📋 My Bets", "💵 Crash History", "🏆 Leaderboard"])
+    # Shared rounds: every session renders the same scheduler snapshot
+    @st.fragment(run_every=FLIGHT_REFRESH_SECONDS)
+    @profiling.profile_fragment("shared_round_view")
+    def shared_round_view():
+        scheduler = get_scheduler()
+        username = st.session_state.username
+        my_round = st.session_state.shared_round_no
+
+        # Our round has settled: report the outcome and rerun to refresh the balance
+        if my_round is not None:
+            result = scheduler.result_for(username, my_round)
+            if result is not None:
+                cashed_at, win_amount = result
+                if cashed_at is None:
+                    st.session_state.last_result = ("error", f"💥 You lost round #{my_round}!")
+                else:
+                    st.session_state.last_result = ("success", f"🏆 Cashed out at {cashed_at:.2f}x! Won ₹{win_amount:.2f}")
+                st.session_state.shared_round_no = None
+                st.rerun()
+
+        snap = scheduler.snapshot(username)
+        if snap["phase"] == "betting":
+            st.markdown(f"### ⏳ Round #{snap['round_no']} takes off in {snap['seconds_left']:.1f}s")
+            st.caption(f"{snap['players']} player(s) in this round")
+        elif snap["phase"] == "flight":
+            st.markdown(f"### 🎮 Round #{snap['round_no']} in flight")
+            st.markdown(f"<h1 style='text-align:center;color:green;'>{snap['multiplier']:.2f}x</h1>", unsafe_allow_html=True)
+            my_bet = snap["my_bet"] if my_round == snap["round_no"] else None
+            if my_bet is not None:
+                auto = my_bet["auto_cashout"]
+                if my_bet["cashed_at"] is not None:
+                    st.success(f"Cashed out at {my_bet['cashed_at']:.2f}x, paid when the round ends")
+                elif auto is not None and snap["multiplier"] >= auto:
+                    st.info(f"Auto cashed out at {auto:.2f}x, paid when the round ends")
+                elif st.button("🏆 TAKE WIN"):
+                    # Validated against the scheduler's clock, not the multiplier shown above
+                    if scheduler.cash_out(username) is None:
+                        st.error("Too late, the round already crashed!")
+        else:
+            st.markdown(f"<h1 style='color:red; text-align:center;'>💥 Crashed at {snap['crash_multiplier']:.2f}x!</h1>", unsafe_allow_html=True)
+            st.caption(f"Next round opens in {snap['seconds_left']:.1f}s")
+
+    # --- Navigation ---
+    # Locked to Play Game while a bet is in play, so its round view keeps refreshing
+    bet_in_play = st.session_state.round is not None or st.session_state.shared_round_no is not None
+    if bet_in_play:
+        st.session_state.game_view = GAME_VIEWS[0]
+    game_view = st.radio("View", GAME_VIEWS, horizontal=True, key="game_view",
+                         label_visibility="collapsed", disabled=bet_in_play)
+
+    # ----------------- Play Game View -----------------
+    if game_view == "🎮 Play Game":
+        profiling.section("view: Play Game")
+        if GAME_MODE == "shared":
+            shared_round_view()
+
+        if GAME_MODE == "solo" and st.session_state.round is not None:
+            st.markdown("### 🎮 Game in progress...")
+            flight_view()
+        else:
+            if st.session_state.last_result:
+                kind, message = st.session_state.last_result
+                getattr(st, kind)(message)
 
-    # ----------------- Play Game Tab -----------------
-    with tabs[0]:
-        if not st.session_state.playing:
             with st.form(key="bet_form"):
                 bet_amount = st.number_input("Enter Bet Amount", min_value=100.0, step=50.0, key="bet_amount_input")
                 auto_cashout_input = st.text_input("Auto Cashout At (x) (Optional)", key="auto_cashout_input")
-                submit = st.form_submit_button("Place Bet and Start")
+                submit = st.form_submit_button("Place Bet" if GAME_MODE == "shared" else "Place Bet and Start")
 
                 if submit:
                     if bet_amount > balance:
                         st.error("Insufficient Balance!")
                     else:
                         if auto_cashout_input.strip() == "":
-                            st.session_state.auto_cashout = None
+                            auto_cashout = None
                         else:
                             try:
-                                st.session_state.auto_cashout = float(auto_cashout_input)
-                                if st.session_state.auto_cashout < 1.0:
-                                    st.error("Auto Cashout must be at least 1.0x if set.")
-                                    st.stop()
-                            except:
+                                auto_cashout = float(auto_cashout_input)
+                            except ValueError:
                                 st.error("Invalid Auto Cashout value. Enter a number like 2.5.")
                                 st.stop()
+                            if auto_cashout < 1.0:
+                                st.error("Auto Cashout must be at least 1.0x if set.")
+                                st.stop()
 
-                        st.session_state.bet_amount = bet_amount
-                        
-                        # --- Adjust crash_multiplier based on balance ---
-                        if balance > 30000:
-                            st.session_state.crash_multiplier = round(random.uniform(1.0, 2.0), 2)  # Low chance
-                            speed_factor = 0.2  # Moderate speed
-                        elif balance > 15000:
-                            st.session_state.crash_multiplier = round(random.uniform(2.0, 4.0), 2)  # Moderate chance
-                            speed_factor = 0.1  # Faster speed
-                        else:  # High balance
-                            st.session_state.crash_multiplier = round(random.uniform(4.0, 7.0), 2)  # Higher chance
-                            speed_factor = 0.05  # Fastest speed
-                        
-                        st.session_state.progress = 1.0
-                        st.session_state.playing = True
-                        update_balance(st.session_state.username, -bet_amount)
-                        st.success("Bet Placed! Game Started 🚀")
-                        st.rerun()
-        else:
-            st.markdown("### 🎮 Game in progress...")
-            placeholder = st.empty()
-            with placeholder.container():
-                st.markdown(f"<h1 style='text-align:center;color:green;'>{st.session_state.progress:.2f}x</h1>", unsafe_allow_html=True)
-                take_win = st.button("🏆 TAKE WIN")
-
-            if take_win:
-                win_amount = st.session_state.bet_amount * st.session_state.progress
-                update_balance(st.session_state.username, win_amount)
-                add_bet(st.session_state.username, st.session_state.bet_amount, st.session_state.progress, win_amount, st.session_state.crash_multiplier)
-                
-                # Show winning message
-                placeholder.markdown(f"<h1 style='color:green; text-align:center;'>Cashed out at {st.session_state.progress:.2f}x! Won ₹{win_amount:.2f}</h1>", unsafe_allow_html=True)
-                st.session_state.playing = False
-                
-                # Wait for 2 second before resetting
-                time.sleep(2)
-                
-                # Reset game state for a new bet
-                st.session_state.progress = 1.0
-                st.session_state.crash_multiplier = round(random.uniform(1.5, 7.0), 2)
-                st.session_state.bet_amount = 0.0
-                st.rerun()  # Rerun the app to start fresh
-
-            elif st.session_state.progress >= st.session_state.crash_multiplier:
-                # Show crash message
-                placeholder.markdown(f"<h1 style='color:red; text-align:center;'>💥 Crashed at {st.session_state.crash_multiplier:.2f}x!</h1>", unsafe_allow_html=True)
-                add_bet(st.session_state.username, st.session_state.bet_amount, st.session_state.progress, 0.0, st.session_state.crash_multiplier)
-                st.error(f"You lost the bet! Crash occurred at {st.session_state.crash_multiplier:.2f}x.")
-                st.session_state.playing = False
-                
-                # Wait for 2 second before showing the new bid button
-                time.sleep(2)
-                
-                # Show button to start a new bid
-                if st.button("Start New Bid"):
-                    st.session_state.playing = False  # Reset playing state
-                    st.session_state.progress = 1.0  # Reset progress
-                    st.session_state.crash_multiplier = round(random.uniform(1.5, 7.0), 2)  # Reset crash multiplier
-                    st.session_state.bet_amount = 0.0  # Reset bet amount
-                    st.session_state.start_time = 0.0  # Reset start time
-                    st.experimental_rerun()  # Rerun the app to start fresh
-
-            elif st.session_state.auto_cashout is not None and st.session_state.progress >= st.session_state.auto_cashout:
-                # Show auto cashout message
-                placeholder.markdown(f"<h1 style='color:blue; text-align:center;'>Auto Cashed Out at {st.session_state.auto_cashout:.2f}x!</h1>", unsafe_allow_html=True)
-                win_amount = st.session_state.bet_amount * st.session_state.auto_cashout
-                update_balance(st.session_state.username, win_amount)
-                add_bet(st.session_state.username, st.session_state.bet_amount, st.session_state.auto_cashout, win_amount, st.session_state.crash_multiplier)
-                st.session_state.playing = False
-                
-                # Wait for 2 second before resetting
-                time.sleep(2)
-                
-                # Reset game state for a new bet
-                st.session_state.progress = 1.0
-                st.session_state.crash_multiplier = round(random.uniform(1.5, 7.0), 2)
-                st.session_state.bet_amount = 0.0
-                st.rerun()  # Rerun the app to start fresh
+                        if GAME_MODE == "shared":
+                            round_no, message = get_scheduler().place_bet(st.session_state.username, bet_amount, auto_cashout)
+                            if round_no is None:
+                                st.error(message)
+                                st.stop()
+                            st.session_state.shared_round_no = round_no
+                            log_event("bet", st.session_state.username, f"shared:{round_no}:{bet_amount}")
+                            st.session_state.last_result = ("success", message)
+                            st.rerun()
 
-            else:
-                st.session_state.progress += speed_factor  # Update progress based on speed factor
-                time.sleep(0.2)  # Adjust sleep time if necessary
-                st.rerun()
+                        # Debit before drawing: a refused bet must not use up (and so reveal) a chain entry
+                        if not place_bet(st.session_state.username, bet_amount):
+                            st.error("Insufficient Balance!")
+                            st.stop()
 
-        # ----------------- My Bets Tab -----------------
-    with tabs[1]:
-        bets = get_bets(limit=2000000000, username=st.session_state.username)
-        if bets:
+                        # --- Crash point and speed depend on balance (see engine.CRASH_TIERS) ---
+                        try:
+                            chain_idx, _, _, u = fair.next_draw()
+                        except Exception:
+                            update_balance(st.session_state.username, bet_amount)  # give the stake back
+                            raise
+                        crash_multiplier, speed_factor = draw_crash(balance, u)
+
+                        st.session_state.round = new_round(
+                            st.session_state.username, bet_amount, crash_multiplier, speed_factor, auto_cashout
+                        )
+                        st.session_state.round["chain_idx"] = chain_idx
+                        st.session_state.last_result = None
+                        log_event("bet", st.session_state.username, f"solo:{chain_idx}:{bet_amount}")
+                        st.rerun()
+
+    # ----------------- My Bets View -----------------
+    if game_view == "📋 My Bets":
+        profiling.section("view: My Bets")
+        total_bets, total_wagered, total_won = me.bets, me.wagered, me.won
+        if total_bets:
             st.subheader("📋 My Recent Bets")
-            bets_df = pd.DataFrame(bets, columns=["Username", "Bet (₹)", "Cashout (x)", "Win (₹)", "Crash at (x)", "Time"])
-            # Format the time column
-            bets_df["Time"] = pd.to_datetime(bets_df["Time"]).dt.strftime('%Y-%m-%d %H:%M')
+
+            # Keyset pagination: the stack holds the before_id of every page we came through
+            cursors = st.session_state.my_bets_cursors
+            bets = get_bets_page(st.session_state.username, before_id=cursors[-1], limit=MY_BETS_PAGE_SIZE)
+            bets_df = pd.DataFrame(
+                [bet[1:] for bet in bets],
+                columns=["Bet (₹)", "Cashout (x)", "Win (₹)", "Crash at (x)", "Time"],
+            )
             st.dataframe(
                 bets_df,
                 use_container_width=True,
@@ -728,11 +944,17 @@ if st.session_state.logged_in:
                     "Win (₹)": st.column_config.NumberColumn(format="₹%.2f")
                 }
             )
-            
-            # Calculate and display stats
-            total_bets = len(bets)
-            total_wagered = sum(bet[1] for bet in bets)
-            total_won = sum(bet[3] for bet in bets)
+
+            newer_col, page_col, older_col = st.columns([1, 2, 1])
+            if newer_col.button("⬅ Newer", disabled=len(cursors) == 1, key="my_bets_newer"):
+                cursors.pop()
+                st.rerun()
+            page_col.caption(f"Page {len(cursors)} of {(total_bets + MY_BETS_PAGE_SIZE - 1) // MY_BETS_PAGE_SIZE}")
+            if older_col.button("Older ➡", disabled=len(bets) < MY_BETS_PAGE_SIZE, key="my_bets_older"):
+                cursors.append(bets[-1][0])
+                st.rerun()
+
+            # Lifetime stats come from counters maintained at settlement
             net_profit = total_won - total_wagered
             
             col1, col2, col3 = st.columns(3)
@@ -742,57 +964,63 @@ if st.session_state.logged_in:
         else:
             st.info("You haven't placed any bets yet")
 
-    # ----------------- Crash History Tab -----------------
-    with tabs[2]:
-        all_bets = get_bets(limit=50)
-        if all_bets:
-            st.subheader("📈 Recent Crash History")
-            crash_multipliers = [row[4] for row in all_bets][::-1]
-            fig = go.Figure(data=go.Scatter(y=crash_multipliers, mode='lines+markers'))
-            fig.update_layout(
-                xaxis_title="Game Number",
-                yaxis_title="Crash Multiplier (x)",
-                title="Crash Multiplier over Last 50 Games",
-                height=400
-            )
-            st.plotly_chart(fig, use_container_width=True)
+    # ----------------- Crash History View -----------------
+    if game_view == "💵 Crash History":
+        profiling.section("view: Crash History")
+        _, last_round_id = get_round_id_range()
+        if last_round_id:
+            st.subheader("📈 Crash History")
+            history_range = st.radio("Rounds", list(CRASH_HISTORY_RANGES), index=0, horizontal=True, key="crash_history_range")
+            st.plotly_chart(crash_timeline_figure(last_round_id, CRASH_HISTORY_RANGES[history_range]),
+                            use_container_width=True)
 
-            # Display crash stats
-            avg_multiplier = sum(crash_multipliers) / len(crash_multipliers)
-            max_multiplier = max(crash_multipliers)
-            min_multiplier = min(crash_multipliers)
-            
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Average Multiplier", f"{avg_multiplier:.2f}x")
-            col2.metric("Highest Multiplier", f"{max_multiplier:.2f}x")
-            col3.metric("Lowest Multiplier", f"{min_multiplier:.2f}x")
+            # Every round, from the maintained crash_counts table
+            summary, distribution = crash_distribution_figure(last_round_id)
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Average Multiplier", f"{summary['mean']:.2f}x")
+            col2.metric("Median Multiplier", f"{summary['percentiles'][50]:.2f}x")
+            col3.metric("Highest Multiplier", f"{summary['max']:.2f}x")
+            col4.metric("Lowest Multiplier", f"{summary['min']:.2f}x")
+            st.plotly_chart(distribution, use_container_width=True)
+            st.caption("Percentiles: " + ", ".join(f"p{p:g} {x:.2f}x" for p, x in summary["percentiles"].items()))
+
+            # Provably-fair verification of any played round
+            with st.expander("🔐 Verify a round"):
+                commitments = fair.get_commitments()
+                if commitments:
+                    st.caption(f"Current chain commitment: `{commitments[0][4]}` (house edge {commitments[0][3]:.1%})")
+                # Defaults to the newest round once; a stable key keeps what the user typed
+                # while new rounds arrive
+                if "verify_round_no" not in st.session_state:
+                    st.session_state.verify_round_no = last_round_id
+                round_to_verify = st.number_input("Round #", min_value=1, step=1, key="verify_round_no")
+                proof = fair.verify_round(int(round_to_verify))
+                if proof is None:
+                    st.info("That round was not drawn from the hash chain.")
+                else:
+                    st.code(f"hash:  {proof['hash']}\ncrash: {proof['settled_crash']:.2f}x", language=None)
+                    if proof["round_ok"]:
+                        st.success("Verified: the crash point matches the hash and the hash links into the chain.")
+                    else:
+                        st.error("Verification failed for this round.")
         else:
             st.info("No game history available yet")
     
-    # ----------------- Leaderboard Tab -----------------
-    with tabs[3]:
-        users = get_all_users()
-        if users:
+    # ----------------- Leaderboard View -----------------
+    if game_view == "🏆 Leaderboard":
+        profiling.section("view: Leaderboard")
+        total_players = get_leaderboard_size()
+        if total_players:
             st.subheader("🏆 Global Leaderboard")
-            
-            # Prepare data for leaderboard, filtering out admin users
-            leaderboard_data = []
-            for user in users:
-                if not user[4]:  # Check if the user is not an admin
-                    total_bets = get_total_bets(user[1])  # Get total number of bets for the user
-                    leaderboard_data.append({
-                        "Username": user[1],
-                        "Total Bets": total_bets,  # This now represents the count of bets
-                        "Balance": user[2],
-                    })
-            
-            # Assign ranks starting from 1
-            for rank, user in enumerate(leaderboard_data, start=1):
-                user["Rank"] = rank
-            
-            # Create DataFrame with the desired column order
-            leaderboard_df = pd.DataFrame(leaderboard_data)[["Rank", "Username", "Total Bets", "Balance"]]
-            
+
+            # Page through the leaderboard instead of loading every player
+            page_count = (total_players + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE
+            page = 1
+            if page_count > 1:
+                page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="leaderboard_page")
+            leaderboard = get_leaderboard(limit=LEADERBOARD_PAGE_SIZE, offset=(page - 1) * LEADERBOARD_PAGE_SIZE)
+            leaderboard_df = pd.DataFrame(leaderboard, columns=["Rank", "Username", "Total Bets", "Balance"])
+
             # Display leaderboard with conditional formatting
             st.dataframe(
                 leaderboard_df,
@@ -803,17 +1031,14 @@ if st.session_state.logged_in:
                 use_container_width=True,
                 hide_index=True
             )
-            
+
             # Show user's position if not in top 10
-            user_rank = next((i + 1 for i, user in enumerate(leaderboard_data) if user["Username"] == st.session_state.username), None)
-            
-            # Check if user_rank is None before comparison
-            if user_rank is not None:
-                if user_rank > 10:
-                    user_data = next(user for user in leaderboard_data if user["Username"] == st.session_state.username)
-                    st.subheader(f"Your Position: #{user_rank}")
-                    st.write(f"Balance: ₹{user_data['Balance']:.2f}")
-                    st.write(f"Total Bets: {user_data['Total Bets']}")  # Display the count of bets
+            # Check if the rank is None (admins) before comparison
+            if me.rank is not None:
+                if me.rank > 10:
+                    st.subheader(f"Your Position: #{me.rank}")
+                    st.write(f"Balance: ₹{me.balance:.2f}")
+                    st.write(f"Total Bets: {me.bets}")  # Display the count of bets
             else:
                 st.info("You are not in the leaderboard.")
         else:
@@ -826,3 +1051,5 @@ else:
             <p>Please login or register from the sidebar to start playing</p>
         </div>
     """, unsafe_allow_html=True)
+
+profiling.end_rerun()
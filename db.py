@@ -0,0 +1,1293 @@
+import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import auth
+import profiling
+from cache import cached, invalidate, read_cache
+from storage import open_backend
+
+# --- Repository ---
+# Every read and write the app makes goes through the helpers in this module;
+# the UI never writes SQL. Where the data lives is up to the storage backend
+# (storage.py): a SQLite file, an in-memory database or a PostgreSQL server.
+
+# Database used by the app: a SQLite file path or a backend URL (see storage.py).
+# Override with CRASH_GAME_DB for benchmarks / local runs / shared deployments.
+DB_PATH = os.environ.get("CRASH_GAME_DB", "crash_game_secure.db")
+
+# Maximum number of pooled connections kept open per process
+POOL_SIZE = int(os.environ.get("CRASH_GAME_DB_POOL", "8"))
+
+# Seconds to wait for a free connection before giving up
+POOL_TIMEOUT = 10.0
+
+
+# --- Password Hashing ---
+# Salted, memory-hard hashes computed on auth's bounded worker pool; see auth.py.
+# Both raise auth.HashingBusy when too many hashes are already waiting.
+def hash_password(password):
+    return auth.hash_password(password)
+
+
+# --- Connection Pool ---
+class ConnectionPool:
+    # A small thread-safe pool of connections shared by every session.
+    # Connections are opened lazily up to `size`, configured once by the
+    # backend and then reused, so the per-connection statement cache stays
+    # warm across Streamlit reruns instead of being rebuilt on every call.
+
+    def __init__(self, backend, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.backend = backend
+        self.size = min(size, backend.max_pool_size or size)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self.connects = 0  # total connections opened by this pool
+
+    def _open(self):
+        conn = self.backend.connect()
+        self.connects += 1
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError("Timed out waiting for a database connection")
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._opened = 0
+        self.backend.close()
+
+
+_backend = open_backend(DB_PATH)
+_pool = ConnectionPool(_backend)
+_pool_lock = threading.Lock()
+
+
+def configure(target, size=POOL_SIZE):
+    # Point the process-wide pool at another database: a SQLite file path or a
+    # backend URL such as memory:// (used by benchmarks)
+    global _pool, _backend, DB_PATH
+    with _pool_lock:
+        _pool.close()
+        DB_PATH = target
+        _backend = open_backend(target)
+        _pool = ConnectionPool(_backend, size=size)
+    read_cache.clear()
+    return _pool
+
+
+def get_pool():
+    return _pool
+
+
+def get_backend():
+    return _backend
+
+
+@contextmanager
+def connection():
+    pool = _pool
+    conn = pool.acquire()
+    # Count statements into the calling rerun's profile, if it is being profiled
+    trace = profiling.statement_counter()
+    if trace is not None:
+        conn.set_trace_callback(trace)
+    try:
+        yield conn
+    finally:
+        if trace is not None:
+            conn.set_trace_callback(None)
+        pool.release(conn)
+
+
+@contextmanager
+def transaction():
+    # On SQLite, BEGIN IMMEDIATE takes the write lock up front so read-then-write
+    # sequences cannot be interleaved with another writer
+    with connection() as conn:
+        conn.execute(_backend.begin)
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+# --- Schema Migrations ---
+# Each migration runs exactly once per database file, in version order, and is
+# recorded in schema_version. Append new migrations; never edit shipped ones.
+def _migration_base_tables(c):
+    # Users table with password and admin flag
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            balance REAL DEFAULT 10000.0,
+            rounds_played INTEGER DEFAULT 0,
+            is_admin INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            last_login TEXT
+        )
+    ''')
+
+    # Bets table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS bets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            bet_amount REAL,
+            cashout_multiplier REAL,
+            win_amount REAL,
+            crash_multiplier REAL,
+            timestamp TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _migration_leaderboard(c):
+    # Leaderboard order: non-admins by balance, oldest account first on ties
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_users_leaderboard
+        ON users (is_admin, balance DESC, id)
+    ''')
+
+    # rounds_played is maintained on every settlement; backfill it for
+    # databases created before the counter was kept up to date
+    c.execute('''
+        UPDATE users
+        SET rounds_played = (SELECT COUNT(*) FROM bets WHERE bets.username = users.username)
+    ''')
+
+
+def _migration_bets_indexes(c):
+    # Per-user history (My Bets, delete_user) and time-bucketed admin charts
+    c.execute('CREATE INDEX IF NOT EXISTS idx_bets_username_id ON bets (username, id DESC)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_bets_timestamp ON bets (timestamp)')
+
+
+def _migration_rounds(c):
+    # One row per played round; bets point at the round they were settled in
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS rounds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mode TEXT,
+            crash_multiplier REAL,
+            players INTEGER DEFAULT 0,
+            total_bet REAL DEFAULT 0,
+            total_won REAL DEFAULT 0,
+            started_at TEXT,
+            crashed_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('ALTER TABLE bets ADD COLUMN round_id INTEGER')
+
+    # Every bet placed before shared rounds was its own solo round
+    c.execute('''
+        INSERT INTO rounds (id, mode, crash_multiplier, players, total_bet, total_won, started_at, crashed_at)
+        SELECT id, 'solo', crash_multiplier, 1, bet_amount, win_amount, timestamp, timestamp
+        FROM bets
+    ''')
+    _backend.sync_id_sequence(c, "rounds")
+    c.execute('UPDATE bets SET round_id = id')
+
+
+def _migration_fair_chain(c):
+    # Precomputed crash points (see fair.py). hash_chain.idx is the serving
+    # order; each chain's commitment is published before its first round.
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS fair_chains (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_idx INTEGER,
+            last_idx INTEGER,
+            house_edge REAL,
+            commitment TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS hash_chain (
+            idx INTEGER PRIMARY KEY,
+            hash BLOB NOT NULL,
+            crash_multiplier REAL NOT NULL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS fair_cursor (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            next_idx INTEGER NOT NULL
+        )
+    ''')
+    c.execute('INSERT OR IGNORE INTO fair_cursor (id, next_idx) VALUES (1, 1)')
+    c.execute('ALTER TABLE rounds ADD COLUMN chain_idx INTEGER')
+
+
+def _migration_user_totals(c):
+    # Lifetime totals for My Bets, kept current by every settlement like rounds_played
+    c.execute('ALTER TABLE users ADD COLUMN total_wagered REAL DEFAULT 0')
+    c.execute('ALTER TABLE users ADD COLUMN total_won REAL DEFAULT 0')
+    c.execute('''
+        UPDATE users
+        SET total_wagered = COALESCE((SELECT SUM(bet_amount) FROM bets WHERE bets.username = users.username), 0),
+            total_won = COALESCE((SELECT SUM(win_amount) FROM bets WHERE bets.username = users.username), 0)
+    ''')
+
+
+def _migration_stats(c):
+    # Running aggregates so dashboards read one row instead of scanning the ledger.
+    # Bet totals are written by _record_bet_stats inside each settlement; user
+    # counts and the balance total follow every users write through triggers,
+    # because balances are changed from several helpers.
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS global_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_users INTEGER DEFAULT 0,
+            total_admins INTEGER DEFAULT 0,
+            total_balance REAL DEFAULT 0,
+            total_bets INTEGER DEFAULT 0,
+            total_wagered REAL DEFAULT 0,
+            total_won REAL DEFAULT 0,
+            total_rounds INTEGER DEFAULT 0
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            day TEXT PRIMARY KEY,
+            bets INTEGER DEFAULT 0,
+            wagered REAL DEFAULT 0,
+            won REAL DEFAULT 0,
+            rounds INTEGER DEFAULT 0
+        )
+    ''')
+    c.execute('INSERT OR IGNORE INTO global_stats (id) VALUES (1)')
+    if _backend.dialect == "postgresql":
+        _create_postgres_stats_triggers(c)
+        _rebuild_stats(c)
+        return
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_insert AFTER INSERT ON users
+        BEGIN
+            UPDATE global_stats
+            SET total_users = total_users + 1,
+                total_admins = total_admins + (NEW.is_admin != 0),
+                total_balance = total_balance + COALESCE(NEW.balance, 0)
+            WHERE id = 1;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_delete AFTER DELETE ON users
+        BEGIN
+            UPDATE global_stats
+            SET total_users = total_users - 1,
+                total_admins = total_admins - (OLD.is_admin != 0),
+                total_balance = total_balance - COALESCE(OLD.balance, 0)
+            WHERE id = 1;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_update AFTER UPDATE OF balance, is_admin ON users
+        BEGIN
+            UPDATE global_stats
+            SET total_admins = total_admins + (NEW.is_admin != 0) - (OLD.is_admin != 0),
+                total_balance = total_balance + COALESCE(NEW.balance, 0) - COALESCE(OLD.balance, 0)
+            WHERE id = 1;
+        END
+    ''')
+    _rebuild_stats(c)
+
+
+def _create_postgres_stats_triggers(c):
+    # PostgreSQL flavour of the users triggers above: one row-level trigger function
+    c.execute('''
+        CREATE OR REPLACE FUNCTION users_stats() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE global_stats
+                SET total_users = total_users - 1,
+                    total_admins = total_admins - (CASE WHEN OLD.is_admin != 0 THEN 1 ELSE 0 END),
+                    total_balance = total_balance - COALESCE(OLD.balance, 0)
+                WHERE id = 1;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'INSERT') THEN
+                UPDATE global_stats
+                SET total_users = total_users + 1,
+                    total_admins = total_admins + (CASE WHEN NEW.is_admin != 0 THEN 1 ELSE 0 END),
+                    total_balance = total_balance + COALESCE(NEW.balance, 0)
+                WHERE id = 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    c.execute('''
+        CREATE TRIGGER trg_users_stats AFTER INSERT OR DELETE OR UPDATE OF balance, is_admin ON users
+        FOR EACH ROW EXECUTE FUNCTION users_stats()
+    ''')
+
+
+def _migration_events(c):
+    # Append-only analytics events (logins, bets placed, cash-outs)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT,
+            username TEXT,
+            payload TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _migration_bet_partitions(c):
+    # Catalog of the monthly tables old bets are archived into (see archive_bets)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS bet_partitions (
+            name TEXT PRIMARY KEY,
+            month TEXT,
+            first_id INTEGER,
+            last_id INTEGER,
+            row_count INTEGER DEFAULT 0,
+            updated_at TEXT
+        )
+    ''')
+
+
+def _migration_crash_counts(c):
+    # Rounds per crash point, in cents: the whole crash distribution (histogram,
+    # percentiles) without scanning rounds. Kept up to date by record_round.
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS crash_counts (
+            crash_cents INTEGER PRIMARY KEY,
+            rounds INTEGER DEFAULT 0
+        )
+    ''')
+    _rebuild_crash_counts(c)
+
+
+MIGRATIONS = [
+    (1, "base users and bets tables", _migration_base_tables),
+    (2, "leaderboard index and rounds_played backfill", _migration_leaderboard),
+    (3, "bets indexes on username and timestamp", _migration_bets_indexes),
+    (4, "rounds table and bets.round_id", _migration_rounds),
+    (5, "provably-fair hash chain tables and rounds.chain_idx", _migration_fair_chain),
+    (6, "per-user wagered / won totals", _migration_user_totals),
+    (7, "global and daily statistics tables", _migration_stats),
+    (8, "analytics events table", _migration_events),
+    (9, "bet archive partition catalog", _migration_bet_partitions),
+    (10, "crash point distribution", _migration_crash_counts),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return c.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def migrate():
+    # Bring the database up to SCHEMA_VERSION; returns the versions applied.
+    # An up-to-date database costs one read and no write transaction.
+    with connection() as c:
+        if get_schema_version(c) >= SCHEMA_VERSION:
+            return []
+
+    applied = []
+    with transaction() as c:
+        # Re-check under the write lock in case another process migrated first
+        if _backend.dialect == "postgresql":
+            c.execute('LOCK TABLE schema_version IN EXCLUSIVE MODE')
+        current = get_schema_version(c)
+        for version, description, apply in MIGRATIONS:
+            if version > current:
+                apply(c)
+                c.execute(
+                    'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                    (version, description),
+                )
+                applied.append(version)
+    return applied
+
+
+# --- Database Functions ---
+def init_db():
+    migrate()
+
+    # Create default admin if not exists (only hashed when it has to be,
+    # init_db runs on every fresh server process)
+    with connection() as c:
+        if c.execute("SELECT 1 FROM users WHERE username='admin'").fetchone():
+            return
+    admin_password = hash_password("admin123")
+    with connection() as c:
+        c.execute('''
+            INSERT OR IGNORE INTO users (username, password, is_admin, balance)
+            VALUES (?, ?, 1, 100000)
+        ''', ("admin", admin_password))
+
+
+def add_user(username, password, is_admin=False):
+    hashed_password = hash_password(password)
+    try:
+        with connection() as c:
+            c.execute('''
+                INSERT INTO users (username, password, is_admin)
+                VALUES (?, ?, ?)
+            ''', (username, hashed_password, 1 if is_admin else 0))
+        invalidate("users")
+        return True
+    except _backend.integrity_errors:
+        return False  # Username already exists
+    except Exception as e:
+        print(f"An error occurred: {e}")  # Optional: log the error
+        return False
+
+
+def verify_user(username, password):
+    # The user's row if the password matches, else None. Legacy and outdated
+    # hashes are replaced with one made with the current settings; the UPDATE
+    # only applies if the hash is unchanged, so a concurrent password change wins.
+    with connection() as c:
+        user = c.execute('SELECT * FROM users WHERE username=?', (username,)).fetchone()
+    if user is None:
+        # Hash anyway, so unknown usernames take as long as wrong passwords
+        auth.verify_password(password, auth.dummy_hash())
+        return None
+    stored = user[2]
+    if not auth.verify_password(password, stored):
+        return None
+    if auth.needs_rehash(stored):
+        try:
+            new_hash = hash_password(password)
+        except auth.HashingBusy:
+            return user  # the password was right; rehash at the next login
+        with connection() as c:
+            c.execute(
+                'UPDATE users SET password = ? WHERE username=? AND password=?',
+                (new_hash, username, stored),
+            )
+    return user
+
+
+def get_user(username):
+    with connection() as c:
+        return c.execute('SELECT * FROM users WHERE username=?', (username,)).fetchone()
+
+
+def update_user_password(username, new_password):
+    hashed_password = hash_password(new_password)
+    with connection() as c:
+        c.execute('''
+            UPDATE users
+            SET password = ?
+            WHERE username=?
+        ''', (hashed_password, username))
+
+
+def update_balance(username, amount):
+    with connection() as c:
+        c.execute('''
+            UPDATE users
+            SET balance = balance + ?
+            WHERE username=?
+        ''', (amount, username))
+    invalidate("users")
+
+
+def add_bet(username, bet_amount, cashout_multiplier, win_amount, crash_multiplier):
+    # Ledger-only write (no balance change), so it may go through the write-behind queue
+    row = (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, _utc_now())
+    if _write_behind is not None and _write_behind.submit("bet", row):
+        return
+    with transaction() as c:
+        write_bets(c, [row])
+    invalidate("users")
+
+
+def get_bets(limit=50, username=None):
+    # Newest bets across the hot table and the archive partitions
+    columns = "id, username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, timestamp"
+    where, params = ("username=?", (username,)) if username else ("true", ())
+    partitions = _archive_partitions()
+    with connection() as c:
+        return [row[1:] for row in _newest_bets(c, columns, where, params, limit, partitions)]
+
+
+def get_bets_page(username, before_id=None, limit=50):
+    # Keyset pagination over one player's history, newest first. Pass the
+    # smallest id of the current page as before_id to get the next page.
+    # Archive partitions only holding ids past the cursor are skipped.
+    before_id = before_id if before_id is not None else 2 ** 63 - 1
+    partitions = [p for p in _archive_partitions() if p[2] < before_id]
+    with connection() as c:
+        return _newest_bets(
+            c, "id, bet_amount, cashout_multiplier, win_amount, crash_multiplier, substr(timestamp, 1, 16)",
+            "username=? AND id < ?", (username, before_id), limit, partitions,
+        )
+
+
+def get_user_bet_totals(username):
+    # (total bets, total wagered, total won) from the maintained counters
+    with connection() as c:
+        row = c.execute('''
+            SELECT rounds_played, total_wagered, total_won
+            FROM users
+            WHERE username=?
+        ''', (username,)).fetchone()
+    return row if row else (0, 0.0, 0.0)
+
+
+def iter_bets_after(after_id, chunk=100000):
+    # Every bet with id > after_id, in lists of up to `chunk` rows of
+    # _LEDGER_COLUMNS: archive partitions oldest first, then the hot table,
+    # each in id order. One pooled connection per chunk, so a slow consumer
+    # (the analytics exporter) never holds one.
+    partitions = sorted(_archive_partitions(), key=lambda p: p[2])
+    for table in [p[0] for p in partitions if p[3] > after_id] + ["bets"]:
+        last = after_id
+        while True:
+            with connection() as c:
+                rows = c.execute(f'''
+                    SELECT {_LEDGER_COLUMNS} FROM {table}
+                    WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last, chunk)).fetchall()
+            if not rows:
+                break
+            yield rows
+            last = rows[-1][0]
+
+
+def get_user_totals():
+    # Every user's balance and betting totals, for the analytics export
+    with connection() as c:
+        return c.execute('''
+            SELECT id, username, balance, is_admin, rounds_played, total_wagered, total_won, created_at, last_login
+            FROM users
+            ORDER BY id
+        ''').fetchall()
+
+
+@cached("users")
+def get_all_users():
+    with connection() as c:
+        return c.execute('''
+            SELECT id, username, balance, rounds_played, is_admin, created_at, last_login
+            FROM users
+            ORDER BY balance DESC
+        ''').fetchall()
+
+
+def delete_user(username):
+    with transaction() as c:
+        # Take the user's ledger out of the global and daily aggregates too
+        c.execute('''
+            UPDATE global_stats
+            SET total_bets = global_stats.total_bets - u.rounds_played,
+                total_wagered = global_stats.total_wagered - u.total_wagered,
+                total_won = global_stats.total_won - u.total_won
+            FROM (SELECT rounds_played, total_wagered, total_won FROM users WHERE username=?) AS u
+            WHERE global_stats.id = 1
+        ''', (username,))
+        tables = _bet_tables(c)
+        ledger = _ledger("timestamp, bet_amount, win_amount", "username=?", tables)
+        c.execute(f'''
+            UPDATE daily_stats
+            SET bets = daily_stats.bets - d.bets, wagered = daily_stats.wagered - d.wagered, won = daily_stats.won - d.won
+            FROM (
+                SELECT substr(timestamp, 1, 10) AS day, COUNT(*) AS bets, SUM(bet_amount) AS wagered, SUM(win_amount) AS won
+                FROM {ledger} GROUP BY substr(timestamp, 1, 10)
+            ) AS d
+            WHERE daily_stats.day = d.day
+        ''', (username,) * len(tables))
+        c.execute('DELETE FROM users WHERE username=?', (username,))
+        for table in tables:
+            deleted = c.execute(f'DELETE FROM {table} WHERE username=?', (username,)).rowcount
+            if table != "bets" and deleted:
+                c.execute('UPDATE bet_partitions SET row_count = row_count - ? WHERE name = ?', (deleted, table))
+    invalidate("users")
+
+
+def update_user_balance(username, new_balance):
+    with connection() as c:
+        c.execute('''
+            UPDATE users
+            SET balance = ?
+            WHERE username=?
+        ''', (new_balance, username))
+    invalidate("users")
+
+
+def set_user_admin(user_id, is_admin):
+    with connection() as c:
+        c.execute('''
+            UPDATE users
+            SET is_admin = ?
+            WHERE id = ?
+        ''', (1 if is_admin else 0, user_id))
+    invalidate("users")
+
+
+def apply_user_changes(admin_updates=(), balance_updates=()):
+    # Bulk admin edits in one transaction.
+    # admin_updates: (is_admin, user_id) pairs; balance_updates: (new_balance, user_id) pairs
+    with transaction() as c:
+        c.executemany('UPDATE users SET is_admin = ? WHERE id = ?', [(1 if a else 0, i) for a, i in admin_updates])
+        c.executemany('UPDATE users SET balance = ? WHERE id = ?', balance_updates)
+    invalidate("users")
+
+
+def update_last_login(username):
+    row = (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), username)
+    if _write_behind is not None and _write_behind.submit("last_login", row):
+        return
+    with connection() as c:
+        write_last_logins(c, [row])
+    invalidate("users")
+
+
+def log_event(kind, username=None, payload=None):
+    # Analytics event; batched through the write-behind queue when it is running
+    row = (kind, username, payload, _utc_now())
+    if _write_behind is not None and _write_behind.submit("event", row):
+        return
+    with connection() as c:
+        write_events(c, [row])
+
+
+# --- Batched Writers ---
+# Each takes an open cursor and a list of rows so the write-behind queue can
+# flush many of them in one transaction. Used directly for synchronous writes.
+def write_bets(c, rows):
+    # rows: (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, timestamp)
+    c.executemany('''
+        INSERT INTO bets (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+    c.executemany('''
+        UPDATE users
+        SET rounds_played = rounds_played + 1, total_wagered = total_wagered + ?, total_won = total_won + ?
+        WHERE username=?
+    ''', [(r[1], r[3], r[0]) for r in rows])
+    _record_bet_stats(c, len(rows), sum(r[1] for r in rows), sum(r[3] for r in rows))
+
+
+def write_last_logins(c, rows):
+    # rows: (last_login, username); only the latest login per user is written
+    latest = {username: ts for ts, username in rows}
+    c.executemany('UPDATE users SET last_login = ? WHERE username=?', [(ts, u) for u, ts in latest.items()])
+
+
+def write_events(c, rows):
+    # rows: (kind, username, payload, created_at)
+    c.executemany('INSERT INTO events (kind, username, payload, created_at) VALUES (?, ?, ?, ?)', rows)
+
+
+BATCH_WRITERS = {
+    "bet": write_bets,
+    "last_login": write_last_logins,
+    "event": write_events,
+}
+
+# Tables whose cached reads a flush of each kind makes stale
+BATCH_INVALIDATES = {
+    "bet": ("users",),
+    "last_login": ("users",),
+    "event": (),
+}
+
+# Optional write-behind queue (writer.WriteBehind), installed by set_write_behind
+_write_behind = None
+
+
+def set_write_behind(queue):
+    global _write_behind
+    _write_behind = queue
+
+
+def _utc_now():
+    # Same text format as SQLite's CURRENT_TIMESTAMP
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _utc_days_ago(days):
+    # UTC "YYYY-MM-DD HH:MM:SS" `days` ago, or "" (before everything) for None.
+    # Cutoffs are computed here rather than with SQLite date functions so the
+    # same queries run on every backend; timestamps and days are compared as text.
+    if days is None:
+        return ""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_rounds_played(username):
+    # Read the maintained counter instead of counting the bets ledger
+    with connection() as c:
+        row = c.execute('SELECT rounds_played FROM users WHERE username=?', (username,)).fetchone()
+    return row[0] if row else 0
+
+
+def get_total_bets(username):
+    return get_rounds_played(username)
+
+
+# --- Leaderboard ---
+@cached("users")
+def get_leaderboard(limit=100, offset=0):
+    # One page of (rank, username, total bets, balance), non-admins only
+    with connection() as c:
+        rows = c.execute('''
+            SELECT username, rounds_played, balance
+            FROM users
+            WHERE is_admin = 0
+            ORDER BY balance DESC, id
+            LIMIT ? OFFSET ?
+        ''', (limit, offset)).fetchall()
+    return [(offset + i, *row) for i, row in enumerate(rows, start=1)]
+
+
+@cached("users")
+def get_leaderboard_size():
+    with connection() as c:
+        return c.execute('SELECT COUNT(*) FROM users WHERE is_admin = 0').fetchone()[0]
+
+
+# Leaderboard position of the users row aliased `me`: the players ahead of it
+# on the leaderboard index, plus one
+_RANK_SQL = '''
+    1 + (SELECT COUNT(*) FROM users AS u
+         WHERE u.is_admin = 0 AND u.balance > me.balance)
+      + (SELECT COUNT(*) FROM users AS u
+         WHERE u.is_admin = 0 AND u.balance = me.balance AND u.id < me.id)
+'''
+
+
+@cached("users")
+def get_user_rank(username):
+    # Seek the user, then count the players ahead of them on the leaderboard index.
+    # Returns None for admins and unknown users.
+    with connection() as c:
+        row = c.execute(f'''
+            SELECT {_RANK_SQL}
+            FROM users AS me
+            WHERE me.username = ? AND me.is_admin = 0
+        ''', (username,)).fetchone()
+    return row[0] if row else None
+
+
+# --- User Context ---
+class UserContext:
+    # What one logged-in rerun shows about its user (sidebar, balance header,
+    # bet form, My Bets totals, Leaderboard position), read in one statement at
+    # the top of the rerun and passed around instead of re-querying. Every
+    # write that changes these ends its rerun with st.rerun(), so the next
+    # rerun reads them fresh. Shared through the read cache: don't mutate.
+    __slots__ = ("username", "balance", "is_admin", "bets", "wagered", "won", "rank")
+
+    def __init__(self, username, balance, is_admin, bets, wagered, won, rank):
+        self.username = username
+        self.balance = balance
+        self.is_admin = bool(is_admin)
+        self.bets = bets  # settled bets (users.rounds_played)
+        self.wagered = wagered
+        self.won = won
+        self.rank = rank  # leaderboard position, None for admins
+
+
+@cached("users")
+def get_user_context(username):
+    # UserContext for `username`, or None if the user no longer exists
+    with connection() as c:
+        row = c.execute(f'''
+            SELECT me.username, me.balance, me.is_admin, me.rounds_played, me.total_wagered, me.total_won,
+                   CASE WHEN me.is_admin = 0 THEN {_RANK_SQL} END
+            FROM users AS me
+            WHERE me.username = ?
+        ''', (username,)).fetchone()
+    return UserContext(*row) if row else None
+
+
+# --- Statistics ---
+def _record_bet_stats(c, bets, wagered, won, rounds=0):
+    # Fold a settled batch into the global and today's aggregates (same transaction)
+    c.execute('''
+        UPDATE global_stats
+        SET total_bets = total_bets + ?, total_wagered = total_wagered + ?,
+            total_won = total_won + ?, total_rounds = total_rounds + ?
+        WHERE id = 1
+    ''', (bets, wagered, won, rounds))
+    c.execute('''
+        INSERT INTO daily_stats (day, bets, wagered, won, rounds)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(day) DO UPDATE SET
+            bets = daily_stats.bets + excluded.bets,
+            wagered = daily_stats.wagered + excluded.wagered,
+            won = daily_stats.won + excluded.won,
+            rounds = daily_stats.rounds + excluded.rounds
+    ''', (_utc_now()[:10], bets, wagered, won, rounds))
+
+
+def _rebuild_stats(c, tables=("bets",)):
+    # tables: the hot table plus any archive partitions; archived bets count
+    # exactly like hot ones
+    ledger = _ledger("username, bet_amount, win_amount, timestamp", "true", list(tables))
+    c.execute(f'''
+        UPDATE users
+        SET rounds_played = COALESCE(b.bets, 0), total_wagered = COALESCE(b.wagered, 0), total_won = COALESCE(b.won, 0)
+        FROM users AS u
+        LEFT JOIN (
+            SELECT username, COUNT(*) AS bets, SUM(bet_amount) AS wagered, SUM(win_amount) AS won
+            FROM {ledger} GROUP BY username
+        ) AS b ON b.username = u.username
+        WHERE users.id = u.id
+    ''')
+    c.execute(f'''
+        UPDATE global_stats
+        SET total_users = u.users, total_admins = u.admins, total_balance = u.balance,
+            total_bets = b.bets, total_wagered = b.wagered, total_won = b.won,
+            total_rounds = (SELECT COUNT(*) FROM rounds)
+        FROM (SELECT COUNT(*) AS users, COALESCE(SUM(CASE WHEN is_admin != 0 THEN 1 ELSE 0 END), 0) AS admins,
+                     COALESCE(SUM(balance), 0) AS balance FROM users) AS u,
+             (SELECT COUNT(*) AS bets, COALESCE(SUM(bet_amount), 0) AS wagered,
+                     COALESCE(SUM(win_amount), 0) AS won FROM {ledger}) AS b
+        WHERE global_stats.id = 1
+    ''')
+    c.execute('DELETE FROM daily_stats')
+    c.execute(f'''
+        INSERT INTO daily_stats (day, bets, wagered, won)
+        SELECT substr(timestamp, 1, 10), COUNT(*), SUM(bet_amount), SUM(win_amount)
+        FROM {ledger} GROUP BY substr(timestamp, 1, 10)
+    ''')
+    c.execute('''
+        INSERT INTO daily_stats (day, rounds)
+        SELECT substr(crashed_at, 1, 10), COUNT(*) FROM rounds WHERE true GROUP BY substr(crashed_at, 1, 10)
+        ON CONFLICT(day) DO UPDATE SET rounds = excluded.rounds
+    ''')
+
+
+def _rebuild_crash_counts(c):
+    c.execute('DELETE FROM crash_counts')
+    c.execute('''
+        INSERT INTO crash_counts (crash_cents, rounds)
+        SELECT CAST(ROUND(crash_multiplier * 100) AS INTEGER), COUNT(*)
+        FROM rounds WHERE crash_multiplier IS NOT NULL
+        GROUP BY CAST(ROUND(crash_multiplier * 100) AS INTEGER)
+    ''')
+
+
+def rebuild_stats():
+    # Recompute every aggregate from the bets and rounds tables
+    with transaction() as c:
+        _rebuild_stats(c, _bet_tables(c))
+        _rebuild_crash_counts(c)
+    invalidate("users", "rounds")
+
+
+def get_game_stats():
+    # Totals shown on the admin Game Statistics tab (one row, no ledger scan)
+    with connection() as c:
+        row = c.execute('''
+            SELECT total_users, total_admins, total_balance, total_bets, total_wagered, total_won, total_rounds
+            FROM global_stats WHERE id = 1
+        ''').fetchone()
+    keys = ("total_users", "total_admins", "total_balance", "total_bets", "total_wagered", "total_won", "total_rounds")
+    return dict(zip(keys, row))
+
+
+def get_bet_volume(bucket="day", days=None):
+    # Pre-aggregated bet volume for charts: (bucket labels, bet counts, amounts wagered).
+    # Day and week buckets come from the daily_stats rollup; hour buckets are
+    # grouped in SQL over the timestamp index for the requested range only,
+    # reading the archive partitions of the months it reaches back into.
+    since = _utc_days_ago(days)
+    tables = ["bets"] + [p[0] for p in _archive_partitions() if p[1] >= since[:7]]
+    with connection() as c:
+        if bucket == "hour":
+            rows = c.execute(f'''
+                SELECT substr(timestamp, 1, 13) || ':00' AS hour, COUNT(*), SUM(bet_amount)
+                FROM {_ledger("timestamp, bet_amount", "timestamp >= ?", tables)}
+                GROUP BY hour
+                ORDER BY hour
+            ''', (since,) * len(tables)).fetchall()
+        elif bucket == "week":
+            rows = c.execute(f'''
+                SELECT {_backend.week_start("day")} AS week, SUM(bets), SUM(wagered)
+                FROM daily_stats
+                WHERE day >= ? AND bets > 0
+                GROUP BY week
+                ORDER BY week
+            ''', (since[:10],)).fetchall()
+        else:
+            rows = c.execute('''
+                SELECT day, bets, wagered
+                FROM daily_stats
+                WHERE day >= ? AND bets > 0
+                ORDER BY day
+            ''', (since[:10],)).fetchall()
+    labels, counts, amounts = [], [], []
+    for label, count, amount in rows:
+        labels.append(label)
+        counts.append(count)
+        amounts.append(amount or 0.0)
+    return labels, counts, amounts
+
+
+def get_daily_stats(days=None):
+    # (day, bets, wagered, won, rounds) oldest first; the last `days` days if given
+    with connection() as c:
+        if days:
+            return c.execute('''
+                SELECT day, bets, wagered, won, rounds FROM daily_stats
+                WHERE day >= ?
+                ORDER BY day
+            ''', (_utc_days_ago(days - 1)[:10],)).fetchall()
+        return c.execute('SELECT day, bets, wagered, won, rounds FROM daily_stats ORDER BY day').fetchall()
+
+
+# --- Bet Settlement ---
+def place_bet(username, bet_amount):
+    # Debit the stake; the guard rejects the bet instead of letting the balance go negative
+    with transaction() as c:
+        cur = c.execute('''
+            UPDATE users
+            SET balance = balance - ?
+            WHERE username=? AND balance >= ?
+        ''', (bet_amount, username, bet_amount))
+    invalidate("users")
+    return cur.rowcount == 1
+
+
+def _settle(c, settlements, round_id=None):
+    # settlements: iterable of (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier)
+    settlements = list(settlements)
+    c.executemany('''
+        INSERT INTO bets (username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, round_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(*s, round_id) for s in settlements])
+    c.executemany('''
+        UPDATE users
+        SET balance = balance + ?,
+            rounds_played = rounds_played + 1,
+            total_wagered = total_wagered + ?,
+            total_won = total_won + ?
+        WHERE username=?
+    ''', [(s[3], s[1], s[3], s[0]) for s in settlements])
+    _record_bet_stats(c, len(settlements), sum(s[1] for s in settlements), sum(s[3] for s in settlements))
+
+
+def settle_bet(username, bet_amount, cashout_multiplier, win_amount, crash_multiplier):
+    # Credit the winnings and write the ledger row in one transaction
+    with transaction() as c:
+        _settle(c, [(username, bet_amount, cashout_multiplier, win_amount, crash_multiplier)])
+    invalidate("users")
+
+
+def settle_bets(settlements):
+    # Settle a whole round in a single commit (one fsync instead of one per player)
+    with transaction() as c:
+        _settle(c, settlements)
+    invalidate("users")
+
+
+def reserve_round_id():
+    # The rounds.id the next shared round will be recorded under (see
+    # RoundScheduler), taken when its betting opens so players, the round
+    # history and the verifier all see the same round number
+    with transaction() as c:
+        return _backend.reserve_id(c, "rounds")
+
+
+def record_round(crash_multiplier, settlements, mode="shared", started_at=None, chain_idx=None, round_id=None):
+    # Write the rounds row and settle every bet placed in it in one commit.
+    # chain_idx links the round to the hash_chain entry it was drawn from;
+    # round_id is one from reserve_round_id, or None for the next free id.
+    # Returns the round id.
+    settlements = list(settlements)
+    row = (
+        mode,
+        crash_multiplier,
+        len(settlements),
+        sum(s[1] for s in settlements),
+        sum(s[3] for s in settlements),
+        started_at,
+        chain_idx,
+    )
+    with transaction() as c:
+        if round_id is None:
+            round_id = c.execute('''
+                INSERT INTO rounds (mode, crash_multiplier, players, total_bet, total_won, started_at, chain_idx)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                RETURNING id
+            ''', row).fetchone()[0]
+        else:
+            c.execute('''
+                INSERT INTO rounds (id, mode, crash_multiplier, players, total_bet, total_won, started_at, chain_idx)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (round_id, *row))
+        _settle(c, settlements, round_id)
+        _record_bet_stats(c, 0, 0.0, 0.0, rounds=1)
+        c.execute('''
+            INSERT INTO crash_counts (crash_cents, rounds) VALUES (?, 1)
+            ON CONFLICT(crash_cents) DO UPDATE SET rounds = crash_counts.rounds + 1
+        ''', (round(crash_multiplier * 100),))
+    invalidate("users", "rounds")
+    return round_id
+
+
+@cached("rounds")
+def get_rounds(limit=50):
+    with connection() as c:
+        return c.execute('''
+            SELECT id, mode, crash_multiplier, players, total_bet, total_won, started_at, crashed_at
+            FROM rounds
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (limit,)).fetchall()
+
+
+@cached("rounds")
+def get_round_id_range():
+    # (first, last) round id, (0, 0) before the first round
+    with connection() as c:
+        # Separate subqueries: SQLite reads a lone MIN / MAX off the index, not both together
+        first, last = c.execute('SELECT (SELECT MIN(id) FROM rounds), (SELECT MAX(id) FROM rounds)').fetchone()
+    return first or 0, last or 0
+
+
+def get_crash_series(first_id, last_id):
+    # (id, crash_multiplier) of the rounds with ids in [first_id, last_id], oldest first
+    with connection() as c:
+        return c.execute('''
+            SELECT id, crash_multiplier FROM rounds
+            WHERE id BETWEEN ? AND ? AND crash_multiplier IS NOT NULL
+            ORDER BY id
+        ''', (first_id, last_id)).fetchall()
+
+
+@cached("rounds")
+def get_crash_distribution():
+    # [(crash point in cents, rounds)] over every round, lowest first
+    with connection() as c:
+        return c.execute('SELECT crash_cents, rounds FROM crash_counts ORDER BY crash_cents').fetchall()
+
+
+# --- Ledger Archive ---
+# bets only ever grows. archive_bets moves bets older than ARCHIVE_AFTER_DAYS
+# into one table per month (bets_YYYY_MM, listed in bet_partitions), a chunk
+# at a time, so the hot table and its indexes stay small enough to live in
+# the page cache. The maintained counters and rollups are left as they are,
+# so totals don't change; the readers of individual bets (My Bets, hourly
+# volume, delete_user, rebuild_stats) read the partitions they need too.
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get("CRASH_GAME_ARCHIVE_DAYS", "90"))
+
+# Bet ids moved per transaction, and seconds to pause between transactions
+ARCHIVE_CHUNK = int(os.environ.get("CRASH_GAME_ARCHIVE_CHUNK", "1000"))
+ARCHIVE_PAUSE = 0.01
+
+_LEDGER_COLUMNS = "id, username, bet_amount, cashout_multiplier, win_amount, crash_multiplier, timestamp, round_id"
+
+
+def _partition_name(month):
+    # "YYYY-MM" -> bets_YYYY_MM, or None for a malformed timestamp
+    if len(month) != 7 or month[4] != "-" or not (month[:4] + month[5:]).isdigit():
+        return None
+    return f"bets_{month[:4]}_{month[5:]}"
+
+
+def _partitions(c):
+    # [(table, "YYYY-MM", first id, last id)] of the non-empty partitions, newest first
+    return c.execute(
+        'SELECT name, month, first_id, last_id FROM bet_partitions WHERE row_count > 0 ORDER BY last_id DESC'
+    ).fetchall()
+
+
+@cached("archive", ttl=60)
+def _archive_partitions():
+    # _partitions for readers. The TTL bounds how long another process takes
+    # to notice a partition created by its archiver.
+    with connection() as c:
+        return _partitions(c)
+
+
+def _bet_tables(c=None):
+    # The hot table and every partition; pass the open cursor inside a
+    # transaction (reads the catalog as of that transaction, uncached)
+    partitions = _partitions(c) if c is not None else _archive_partitions()
+    return ["bets"] + [p[0] for p in partitions]
+
+
+def _ledger(columns, where, tables):
+    # FROM-clause source with `columns` of the bets in `tables` matching
+    # `where`; pass the where parameters once per table
+    if tables == ["bets"]:
+        return f"(SELECT {columns} FROM bets WHERE {where}) AS ledger"
+    union = " UNION ALL ".join(f"SELECT {columns} FROM {t} WHERE {where}" for t in tables)
+    return f"({union}) AS ledger"
+
+
+def _newest_bets(c, columns, where, params, limit, partitions):
+    # The newest `limit` rows matching `where` (id first in `columns`): the
+    # hot table first, then partitions by descending last id until none of
+    # the rest could hold an id newer than the page's oldest. A page of
+    # recent bets never touches the archive.
+    sql = "SELECT {columns} FROM {table} WHERE {where} ORDER BY id DESC LIMIT ?"
+    page = c.execute(sql.format(columns=columns, table="bets", where=where), (*params, limit)).fetchall()
+    for name, _, _, last_id in partitions:
+        if len(page) >= limit and last_id < page[-1][0]:
+            break
+        page += c.execute(sql.format(columns=columns, table=name, where=where), (*params, limit)).fetchall()
+        page.sort(key=lambda row: row[0], reverse=True)
+        del page[limit:]
+    return page
+
+
+def _ensure_partition(c, name, month):
+    c.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            username TEXT,
+            bet_amount REAL,
+            cashout_multiplier REAL,
+            win_amount REAL,
+            crash_multiplier REAL,
+            timestamp TEXT,
+            round_id INTEGER
+        )
+    ''')
+    c.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_username_id ON {name} (username, id DESC)')
+    c.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_timestamp ON {name} (timestamp)')
+    c.execute('''
+        INSERT OR IGNORE INTO bet_partitions (name, month, first_id, last_id, row_count)
+        VALUES (?, ?, NULL, NULL, 0)
+    ''', (name, month))
+
+
+def archive_bets(older_than_days=ARCHIVE_AFTER_DAYS, chunk=ARCHIVE_CHUNK, pause=ARCHIVE_PAUSE):
+    # Move settled bets older than `older_than_days` into their monthly
+    # partitions; returns the number of bets moved. Walks the hot table in
+    # id order, one short transaction per `chunk` ids, so live bets only ever
+    # wait for one chunk.
+    horizon = _utc_days_ago(older_than_days)
+    with connection() as c:
+        last_id = c.execute('SELECT MAX(id) FROM bets WHERE timestamp < ?', (horizon,)).fetchone()[0]
+        lo = c.execute('SELECT MIN(id) FROM bets').fetchone()[0]
+    if last_id is None:
+        return 0
+    moved = 0
+    while lo <= last_id:
+        hi = min(lo + chunk, last_id + 1)
+        with transaction() as c:
+            months = [row[0] for row in c.execute('''
+                SELECT DISTINCT substr(timestamp, 1, 7) FROM bets
+                WHERE id >= ? AND id < ? AND timestamp < ?
+            ''', (lo, hi, horizon)).fetchall()]
+            for month in months:
+                name = _partition_name(month)
+                if name is None:
+                    continue  # malformed timestamp: leave the row in the hot table
+                _ensure_partition(c, name, month)
+                where = "id >= ? AND id < ? AND timestamp < ? AND substr(timestamp, 1, 7) = ?"
+                params = (lo, hi, horizon, month)
+                count, first, last = c.execute(
+                    f'SELECT COUNT(*), MIN(id), MAX(id) FROM bets WHERE {where}', params
+                ).fetchone()
+                c.execute(f'INSERT INTO {name} ({_LEDGER_COLUMNS}) SELECT {_LEDGER_COLUMNS} FROM bets WHERE {where}',
+                          params)
+                c.execute(f'DELETE FROM bets WHERE {where}', params)
+                c.execute('''
+                    UPDATE bet_partitions
+                    SET row_count = row_count + ?,
+                        first_id = CASE WHEN first_id IS NULL OR first_id > ? THEN ? ELSE first_id END,
+                        last_id = CASE WHEN last_id IS NULL OR last_id < ? THEN ? ELSE last_id END,
+                        updated_at = ?
+                    WHERE name = ?
+                ''', (count, first, first, last, last, _utc_now(), name))
+                moved += count
+        invalidate("archive")
+        lo = hi
+        if pause and lo <= last_id:
+            time.sleep(pause)
+    return moved
+
+
+def get_archive_partitions():
+    # (table, month, bets, first id, last id, last archived), newest first
+    with connection() as c:
+        return c.execute('''
+            SELECT name, month, row_count, first_id, last_id, updated_at
+            FROM bet_partitions ORDER BY month DESC
+        ''').fetchall()
+
+
+# --- Instrumentation ---
+# Helpers the app calls during a rerun; each reports its calls, statements,
+# rows and wall time to the rerun's profile (see profiling.py)
+HELPERS = (
+    "init_db", "add_user", "verify_user", "get_user", "update_user_password", "update_balance",
+    "add_bet", "get_bets", "get_bets_page", "get_user_bet_totals", "get_all_users", "delete_user",
+    "update_user_balance", "set_user_admin", "apply_user_changes", "update_last_login", "log_event",
+    "get_rounds_played", "get_total_bets", "get_leaderboard", "get_leaderboard_size", "get_user_rank",
+    "get_user_context", "rebuild_stats", "get_game_stats", "get_bet_volume", "get_daily_stats",
+    "place_bet", "settle_bet", "settle_bets", "reserve_round_id", "record_round", "get_rounds",
+    "get_round_id_range", "get_crash_series", "get_crash_distribution",
+    "archive_bets", "get_archive_partitions", "get_user_totals",
+)
+profiling.instrument(globals(), HELPERS)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Crash game database maintenance")
+    parser.add_argument("command", nargs="?", default="migrate", choices=["migrate", "rebuild-stats", "archive"])
+    args = parser.parse_args()
+
+    # python db.py  ->  upgrade the database file in place
+    applied = migrate()
+    if applied:
+        print(f"Applied migrations {applied} to {DB_PATH}")
+    else:
+        print(f"{DB_PATH} is already at schema version {SCHEMA_VERSION}")
+
+    if args.command == "rebuild-stats":
+        rebuild_stats()
+        print(f"Rebuilt statistics in {DB_PATH}: {get_game_stats()}")
+
+    if args.command == "archive":
+        moved = archive_bets()
+        print(f"Archived {moved:,} bets older than {ARCHIVE_AFTER_DAYS} days in {DB_PATH}")
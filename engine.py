@@ -0,0 +1,319 @@
+import math
+import time
+import random
+import logging
+import threading
+
+# --- Round Engine ---
+# A round is a plain dict kept in st.session_state. The multiplier is a pure
+# function of server time since the round started, so nothing has to tick:
+# any rerun (or fragment refresh) can work out where the round is right now.
+
+# The multiplier grows by `speed` every TICK_SECONDS (the old 0.2 s loop step)
+TICK_SECONDS = 0.2
+
+# Balance tiers: (minimum balance, crash range, speed). Richer players get
+# lower crash points and a faster climb. Checked top to bottom.
+CRASH_TIERS = (
+    (30000, (1.0, 2.0), 0.2),
+    (15000, (2.0, 4.0), 0.1),
+    (None, (4.0, 7.0), 0.05),
+)
+
+
+def tier_for(balance):
+    for threshold, crash_range, speed in CRASH_TIERS:
+        if threshold is None or balance > threshold:
+            return crash_range, speed
+
+
+def tier_crash(crash_range, u):
+    # Map a uniform draw in [0, 1) into a tier's crash range
+    low, high = crash_range
+    return round(low + (high - low) * u, 2)
+
+
+def draw_crash(balance, u=None):
+    # Crash point and climb speed for a new round at this balance.
+    # Pass `u` from fair.next_draw() to make the round verifiable.
+    crash_range, speed = tier_for(balance)
+    return tier_crash(crash_range, random.random() if u is None else u), speed
+
+
+def multiplier_at(elapsed, speed):
+    return 1.0 + speed * max(0.0, elapsed) / TICK_SECONDS
+
+
+def seconds_to(multiplier, speed):
+    # Inverse of multiplier_at: how long after the start `multiplier` is reached
+    return (multiplier - 1.0) * TICK_SECONDS / speed
+
+
+def new_round(username, bet_amount, crash_multiplier, speed, auto_cashout=None, now=None):
+    return {
+        "username": username,
+        "bet_amount": bet_amount,
+        "crash_multiplier": crash_multiplier,
+        "speed": speed,
+        "auto_cashout": auto_cashout,
+        "started_at": time.time() if now is None else now,
+    }
+
+
+def target_reached(target, crash):
+    # A cash-out target pays when the round reaches it. Crash points are
+    # floored to cents, so a target equal to the crash point is reached: with
+    # P(crash >= m) = (1 - edge) / m a fixed target returns exactly 1 - edge.
+    # Works on numpy arrays too (simulate.py).
+    return target <= crash
+
+
+def round_status(current, now=None):
+    # Returns (status, multiplier) where status is "flying", "auto_cashout" or "crashed".
+    # An auto cash-out target the round reaches always wins, even if both it
+    # and the crash point were passed between two refreshes.
+    now = time.time() if now is None else now
+    crash = current["crash_multiplier"]
+    auto = current["auto_cashout"]
+    multiplier = multiplier_at(now - current["started_at"], current["speed"])
+    if auto is not None and target_reached(auto, crash) and multiplier >= auto:
+        return "auto_cashout", auto
+    if multiplier >= crash:
+        return "crashed", crash
+    return "flying", multiplier
+
+
+def cash_out(current, now=None):
+    # Validate a manual cash-out against server time. Returns the multiplier
+    # paid (floored to 2 decimals, so never above the crash point) or None if
+    # the round had already crashed.
+    status, multiplier = round_status(current, now)
+    if status == "crashed":
+        return None
+    if status == "auto_cashout":
+        return multiplier
+    return math.floor(multiplier * 100) / 100
+
+
+# --- Shared Rounds ---
+# One process-wide scheduler runs every shared round: a betting window, the
+# flight, the crash, then a single batched settlement. Sessions only read
+# snapshots and submit bets / cash-outs, so N players cost one ticker thread.
+
+BETTING_SECONDS = 6.0
+COOLDOWN_SECONDS = 3.0
+SHARED_SPEED = 0.1
+
+# Range for the fallback draw_shared_crash (the old reset range)
+SHARED_CRASH_RANGE = (1.5, 7.0)
+
+# How often the scheduler thread advances the phases
+SCHEDULER_TICK_SECONDS = 0.05
+
+# Settled rounds whose per-player results stay available to sessions
+RESULTS_KEPT = 20
+
+# Seconds before a failed settlement is tried again
+SETTLE_RETRY_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def draw_shared_crash(rng=random):
+    # Unverifiable fallback draw: (crash_multiplier, chain_idx=None).
+    # The app uses fair.next_crash instead.
+    return round(rng.uniform(*SHARED_CRASH_RANGE), 2), None
+
+
+def utc_timestamp(epoch):
+    # Same "YYYY-MM-DD HH:MM:SS" UTC text SQLite's CURRENT_TIMESTAMP produces
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch))
+
+
+class RoundScheduler:
+    # debit(username, amount) -> bool takes the stake when a bet is placed.
+    # settle(crash_multiplier, settlements, mode, started_at, chain_idx, round_id) -> round id
+    # settles the whole round at once (db.record_round).
+    # draw() -> (crash_multiplier, chain_idx) picks each round's crash point.
+    # reserve() -> round id numbers each round when its betting opens
+    # (db.reserve_round_id), so the number players see is the rounds.id it is
+    # recorded and verified under. Without it rounds are numbered by this
+    # process only and settle() gets round_id=None.
+    #
+    # None of the four run under self._lock, so snapshot() and cash_out()
+    # never wait on the database. Only the ticker thread moves the phases
+    # (betting -> flight -> settling -> crashed -> betting), which keeps the
+    # state it reads outside the lock stable while it settles and draws.
+
+    def __init__(self, debit, settle, draw=draw_shared_crash, reserve=None, speed=SHARED_SPEED,
+                 betting_seconds=BETTING_SECONDS, cooldown_seconds=COOLDOWN_SECONDS):
+        self.debit = debit
+        self.settle = settle
+        self.draw = draw
+        self.reserve = reserve
+        self.speed = speed
+        self.betting_seconds = betting_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.round_no = 0
+        self.round_id = None  # rounds.id of the last settled round
+        self.settle_failures = 0
+        # round_no -> {username: (cashout_multiplier or None, win_amount)} for
+        # the last RESULTS_KEPT settled rounds, oldest first
+        self.results = {}
+        self._open_betting(time.time(), *self._next_round())
+
+    def _next_round(self):
+        # (round_no, (crash_multiplier, chain_idx)) for the next round, outside the lock.
+        # The number is reserved first: if the draw then fails only a round id
+        # is skipped, never a served chain entry.
+        round_no = self.reserve() if self.reserve is not None else self.round_no + 1
+        return round_no, self.draw()
+
+    def _open_betting(self, now, round_no, drawn):
+        self.round_no = round_no
+        self.phase = "betting"
+        self.crash_multiplier, self.chain_idx = drawn
+        self.betting_ends = now + self.betting_seconds
+        self.flight_started = None
+        self.crashes_at = None
+        self.cooldown_ends = None
+        self._settle_after = 0.0
+        self.bets = {}  # username -> {"bet_amount", "auto_cashout", "cashed_at"}
+        self._debiting = set()  # usernames whose stake is being debited
+
+    # --- Session API ---
+    def place_bet(self, username, bet_amount, auto_cashout=None):
+        # Returns (round_no, message); round_no is None if the bet was refused.
+        # The stake is debited immediately, outside the lock; the seat is held
+        # in self._debiting meanwhile and the round doesn't take off until
+        # every debit in progress is through.
+        with self._lock:
+            if self.phase != "betting":
+                return None, "Bets are only accepted while the next round is open."
+            if username in self.bets or username in self._debiting:
+                return None, "You already have a bet in this round."
+            self._debiting.add(username)
+            round_no = self.round_no
+        debited = False
+        try:
+            debited = self.debit(username, bet_amount)
+        finally:
+            with self._lock:
+                self._debiting.discard(username)
+                if debited:
+                    self.bets[username] = {"bet_amount": bet_amount, "auto_cashout": auto_cashout, "cashed_at": None}
+        if not debited:
+            return None, "Insufficient Balance!"
+        return round_no, f"Bet placed for round #{round_no} 🚀"
+
+    def cash_out(self, username, now=None):
+        # Lock in a cash-out at the current server-time multiplier; paid when the round settles
+        now = time.time() if now is None else now
+        with self._lock:
+            bet = self.bets.get(username)
+            if self.phase != "flight" or bet is None or bet["cashed_at"] is not None:
+                return None
+            multiplier = multiplier_at(now - self.flight_started, self.speed)
+            if multiplier >= self.crash_multiplier:
+                return None
+            bet["cashed_at"] = math.floor(multiplier * 100) / 100
+            return bet["cashed_at"]
+
+    def result_for(self, username, round_no):
+        # (cashout_multiplier or None, win_amount) once round_no has settled, else None
+        with self._lock:
+            return self.results.get(round_no, {}).get(username)
+
+    def snapshot(self, username=None, now=None):
+        # Public round state plus `username`'s own bet (copied, so callers can't mutate it)
+        now = time.time() if now is None else now
+        with self._lock:
+            snap = {"round_no": self.round_no, "phase": self.phase, "players": len(self.bets)}
+            if self.phase == "betting":
+                snap["seconds_left"] = max(0.0, self.betting_ends - now)
+            elif self.phase == "flight":
+                snap["multiplier"] = min(multiplier_at(now - self.flight_started, self.speed), self.crash_multiplier)
+            else:
+                # "settling" (results not written yet) or "crashed"
+                snap["crash_multiplier"] = self.crash_multiplier
+                cooldown_ends = self.cooldown_ends if self.cooldown_ends is not None else now + self.cooldown_seconds
+                snap["seconds_left"] = max(0.0, cooldown_ends - now)
+            bet = self.bets.get(username)
+            snap["my_bet"] = dict(bet) if bet is not None else None
+            return snap
+
+    # --- Ticker ---
+    def tick(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.phase == "betting" and now >= self.betting_ends and not self._debiting:
+                self.phase = "flight"
+                self.flight_started = self.betting_ends
+                self.crashes_at = self.flight_started + seconds_to(self.crash_multiplier, self.speed)
+            if self.phase == "flight" and now >= self.crashes_at:
+                # Bets are frozen from here on: no new bets or cash-outs
+                self.phase = "settling"
+            settle = self.phase == "settling" and now >= self._settle_after
+            reopen = self.phase == "crashed" and now >= self.cooldown_ends
+        if settle:
+            self._crash(now)
+        elif reopen:
+            round_no, drawn = self._next_round()
+            with self._lock:
+                self._open_betting(now, round_no, drawn)
+
+    def _crash(self, now):
+        # Settle the frozen round in one settle() call, outside the lock.
+        # Results are published only once they are written; if the settlement
+        # fails the round stays "settling" (stakes debited, nothing paid, no
+        # results) and is retried SETTLE_RETRY_SECONDS later.
+        crash = self.crash_multiplier
+        settlements = []
+        results = {}
+        for username, bet in self.bets.items():
+            cashed_at = bet["cashed_at"]
+            auto = bet["auto_cashout"]
+            if cashed_at is None and auto is not None and target_reached(auto, crash):
+                cashed_at = auto
+            win_amount = bet["bet_amount"] * cashed_at if cashed_at is not None else 0.0
+            settlements.append((username, bet["bet_amount"], cashed_at if cashed_at is not None else crash, win_amount, crash))
+            results[username] = (cashed_at, win_amount)
+        try:
+            round_id = self.settle(crash, settlements, "shared", utc_timestamp(self.flight_started), self.chain_idx,
+                                   self.round_no if self.reserve is not None else None)
+        except Exception:
+            self.settle_failures += 1
+            logger.exception("Settling round %s failed, retrying in %.0f s", self.round_no, SETTLE_RETRY_SECONDS)
+            with self._lock:
+                self._settle_after = now + SETTLE_RETRY_SECONDS
+            return
+        with self._lock:
+            self.round_id = round_id
+            self.results[self.round_no] = results
+            # Round numbers from reserve() have gaps (other processes' rounds), so drop by age
+            while len(self.results) > RESULTS_KEPT:
+                del self.results[next(iter(self.results))]
+            self.phase = "crashed"
+            self.cooldown_ends = now + self.cooldown_seconds
+
+    def _run(self):
+        while not self._stop.wait(SCHEDULER_TICK_SECONDS):
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Round scheduler tick failed")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="round-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,197 @@
+import os
+import hashlib
+import threading
+
+import numpy as np
+
+import db
+import engine
+import profiling
+
+# --- Provably-Fair Crash Points ---
+# A chain is built by hashing a random seed over and over: h[0] = seed,
+# h[i] = sha256(h[i-1]). Rounds are served in *reverse* order, so each revealed
+# hash is the sha256 preimage of the previous round's hash, and nobody can
+# work out a future hash from the ones already revealed. The commitment,
+# sha256 of the first served hash, is published before any round is played.
+#
+# Crash points are a pure function of the hash, precomputed when the chain is
+# built and stored next to it, so serving and verifying a round are O(1).
+
+# Share of every bet the house keeps in expectation: P(crash >= m) = (1 - edge) / m
+HOUSE_EDGE = float(os.environ.get("CRASH_GAME_HOUSE_EDGE", "0.01"))
+
+# Rounds per chain; a new chain is built when the current one runs out
+CHAIN_LENGTH = int(os.environ.get("CRASH_GAME_CHAIN_LENGTH", "1000000"))
+
+# Rows inserted per executemany batch while persisting a chain
+INSERT_BATCH = 50000
+
+# 52 bits of the hash give a uniform draw with full float precision
+_BITS = 52
+_SCALE = float(2 ** _BITS)
+
+
+def hash_to_uniform(h):
+    return (int.from_bytes(h[:7], "big") >> (56 - _BITS)) / _SCALE
+
+
+def crash_point(h, house_edge=HOUSE_EDGE):
+    # The first `house_edge` of the unit interval busts at 1.00x
+    x = hash_to_uniform(h)
+    return max(1.0, int(100 * (1 - house_edge) / (1 - x)) / 100)
+
+
+def crash_points(hashes, house_edge=HOUSE_EDGE):
+    # Vectorised crash_point over many hashes
+    raw = np.frombuffer(b"".join(h[:8] for h in hashes), dtype=">u8")
+    x = (raw >> np.uint64(64 - _BITS)).astype(np.float64) / _SCALE
+    return uniform_crash_points(x, house_edge).tolist()
+
+
+def uniform_crash_points(x, house_edge=HOUSE_EDGE):
+    # crash_point for a numpy array of uniform draws in [0, 1) (see simulate.py)
+    return np.maximum(1.0, np.floor(100 * (1 - house_edge) / (1 - x)) / 100)
+
+
+def build_chain(length, seed=None):
+    # Hashes in serving order, plus the commitment to publish
+    h = seed if seed is not None else os.urandom(32)
+    sha256 = hashlib.sha256
+    chain = [h]
+    for _ in range(length - 1):
+        h = sha256(h).digest()
+        chain.append(h)
+    chain.reverse()
+    return chain, sha256(chain[0]).hexdigest()
+
+
+def create_chain(length=CHAIN_LENGTH, house_edge=HOUSE_EDGE, seed=None):
+    # Build a chain, precompute its crash points and append it after the last one.
+    # Returns the fair_chains row id.
+    chain, commitment = build_chain(length, seed)
+    points = crash_points(chain, house_edge)
+    with db.transaction() as c:
+        first_idx = c.execute('SELECT COALESCE(MAX(idx), 0) + 1 FROM hash_chain').fetchone()[0]
+        for start in range(0, length, INSERT_BATCH):
+            c.executemany(
+                'INSERT INTO hash_chain (idx, hash, crash_multiplier) VALUES (?, ?, ?)',
+                zip(range(first_idx + start, first_idx + min(start + INSERT_BATCH, length)),
+                    chain[start:start + INSERT_BATCH],
+                    points[start:start + INSERT_BATCH]),
+            )
+        return c.execute('''
+            INSERT INTO fair_chains (first_idx, last_idx, house_edge, commitment)
+            VALUES (?, ?, ?, ?)
+            RETURNING id
+        ''', (first_idx, first_idx + length - 1, house_edge, commitment)).fetchone()[0]
+
+
+_chain_lock = threading.Lock()
+
+
+def ensure_chain(length=CHAIN_LENGTH):
+    # Make sure there are unserved crash points left; builds a chain at first start
+    with _chain_lock:
+        with db.connection() as c:
+            next_idx = c.execute('SELECT next_idx FROM fair_cursor WHERE id = 1').fetchone()[0]
+            last_idx = c.execute('SELECT COALESCE(MAX(idx), 0) FROM hash_chain').fetchone()[0]
+        if next_idx > last_idx:
+            create_chain(length)
+
+
+def next_draw():
+    # Claim the next unserved entry: (chain_idx, hash, crash_multiplier, uniform).
+    # The cursor is advanced in the database so restarts and other processes
+    # never hand out the same round twice. It only moves onto an entry that
+    # exists: when the chain runs out it stays put until ensure_chain has
+    # appended the next one, so no index (and no published hash) is skipped.
+    with db.transaction() as c:
+        claimed = c.execute('''
+            UPDATE fair_cursor SET next_idx = next_idx + 1
+            WHERE id = 1 AND EXISTS (SELECT 1 FROM hash_chain WHERE idx = fair_cursor.next_idx)
+            RETURNING next_idx - 1
+        ''').fetchone()
+        row = None
+        if claimed is not None:
+            idx = claimed[0]
+            row = c.execute('SELECT hash, crash_multiplier FROM hash_chain WHERE idx = ?', (idx,)).fetchone()
+    if row is None:
+        ensure_chain()
+        return next_draw()
+    h, crash = row
+    return idx, h, crash, hash_to_uniform(h)
+
+
+def next_crash():
+    # Draw for RoundScheduler: (crash_multiplier, chain_idx)
+    idx, _, crash, _ = next_draw()
+    return crash, idx
+
+
+def verify(chain_idx):
+    # Check one served entry without walking the chain:
+    #  * its crash point is what the hash says under the chain's house edge
+    #  * sha256(hash) is the previous entry's hash (or the chain's commitment)
+    with db.connection() as c:
+        # Never reveal a hash that has not been served yet
+        next_idx = c.execute('SELECT next_idx FROM fair_cursor WHERE id = 1').fetchone()[0]
+        if chain_idx >= next_idx:
+            return None
+        row = c.execute('SELECT hash, crash_multiplier FROM hash_chain WHERE idx = ?', (chain_idx,)).fetchone()
+        if row is None:
+            return None
+        h, stored_crash = row
+        first_idx, house_edge, commitment = c.execute('''
+            SELECT first_idx, house_edge, commitment FROM fair_chains
+            WHERE first_idx <= ? AND last_idx >= ?
+        ''', (chain_idx, chain_idx)).fetchone()
+        if chain_idx == first_idx:
+            expected_link = commitment
+        else:
+            expected_link = c.execute('SELECT hash FROM hash_chain WHERE idx = ?', (chain_idx - 1,)).fetchone()[0].hex()
+    link = hashlib.sha256(h).hexdigest()
+    crash = crash_point(h, house_edge)
+    return {
+        "chain_idx": chain_idx,
+        "hash": h.hex(),
+        "crash_multiplier": crash,
+        "crash_ok": crash == stored_crash,
+        "link_ok": link == expected_link,
+        "uniform": hash_to_uniform(h),
+    }
+
+
+def verify_round(round_id):
+    # verify() for a played round, also checking the crash point it was settled at
+    with db.connection() as c:
+        row = c.execute('SELECT mode, crash_multiplier, chain_idx FROM rounds WHERE id = ?', (round_id,)).fetchone()
+    if row is None or row[2] is None:
+        return None
+    mode, settled_crash, chain_idx = row
+    result = verify(chain_idx)
+    if result is None:
+        return None
+    result["round_id"] = round_id
+    result["settled_crash"] = settled_crash
+    if mode == "shared":
+        result["round_ok"] = result["crash_ok"] and result["link_ok"] and settled_crash == result["crash_multiplier"]
+    else:
+        # Solo rounds map the same uniform draw into the player's balance tier
+        candidates = {engine.tier_crash(crash_range, result["uniform"]) for _, crash_range, _ in engine.CRASH_TIERS}
+        result["round_ok"] = result["link_ok"] and settled_crash in candidates
+    return result
+
+
+def get_commitments():
+    # Published commitments, newest chain first
+    with db.connection() as c:
+        return c.execute('''
+            SELECT id, first_idx, last_idx, house_edge, commitment, created_at
+            FROM fair_chains
+            ORDER BY id DESC
+        ''').fetchall()
+
+
+# Report the database-backed helpers to the rerun profiler, like db.HELPERS
+profiling.instrument(globals(), ("ensure_chain", "next_draw", "next_crash", "verify", "verify_round", "get_commitments"))
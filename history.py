@@ -0,0 +1,163 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import db
+
+# --- Crash History ---
+# The Crash History view can span millions of rounds, so the browser never
+# gets them all: the timeline is downsampled here to at most MAX_POINTS with
+# Largest-Triangle-Three-Buckets, and the distribution comes from the
+# maintained crash_counts table (db.get_crash_distribution) instead of a scan.
+#
+# Rounds are append-only, so the timeline is reduced in blocks of
+# BLOCK_ROUNDS ids. A full block is reduced once, to the lowest and highest
+# crash point of each SPAN rounds (spikes survive), and cached; only the
+# block still filling up is read again when new rounds arrive. LTTB then
+# picks the final points from the cached candidates. Shorter windows
+# (RAW_ROUNDS) skip the blocks and go to LTTB directly.
+
+MAX_POINTS = 2000
+
+# Rounds per cached block, and rounds per min/max pair inside a block
+BLOCK_ROUNDS = 10000
+SPAN = 50
+
+# Windows up to this many rounds are read whole and go straight to LTTB
+RAW_ROUNDS = 5 * BLOCK_ROUNDS
+
+# Reduced full blocks kept in memory (each is ~2 * BLOCK_ROUNDS / SPAN points)
+BLOCKS_KEPT = 2000
+
+# Percentiles shown by the distribution summary
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Histogram bin edges for crash points (the last bin is open-ended)
+HISTOGRAM_EDGES = (1.0, 1.1, 1.25, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0, 50.0, 100.0)
+
+
+def lttb(x, y, n):
+    # Largest-Triangle-Three-Buckets: n of the (x, y) points, keeping the first
+    # and last, and from each bucket in between the point spanning the largest
+    # triangle with the previously kept point and the next bucket's average
+    size = len(x)
+    if n >= size or n < 3:
+        return x, y
+    edges = np.linspace(1, size - 1, n - 1).astype(np.intp)
+    keep = np.empty(n, dtype=np.intp)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        start, end = edges[i], edges[i + 1]
+        if i == n - 3:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx, cy = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        area = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def _min_max(x, y):
+    # The lowest and highest point of every SPAN points, in x order
+    if len(x) <= 2 * SPAN:
+        return x, y
+    cut = len(x) - len(x) % SPAN
+    rows = y[:cut].reshape(-1, SPAN)
+    base = np.arange(0, cut, SPAN)
+    picks = np.sort(np.concatenate([base + rows.argmin(axis=1), base + rows.argmax(axis=1)]))
+    picks = np.concatenate([picks, np.arange(cut, len(x))])
+    return x[picks], y[picks]
+
+
+def _fetch(first_id, last_id):
+    rows = db.get_crash_series(first_id, last_id)
+    if not rows:
+        return np.empty(0), np.empty(0)
+    ids, crashes = zip(*rows)
+    return np.array(ids, dtype=np.float64), np.array(crashes, dtype=np.float64)
+
+
+class _BlockCache:
+    # Reduced full blocks per database, least recently used dropped first
+
+    def __init__(self, size=BLOCKS_KEPT):
+        self.size = size
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, block):
+        key = (db.DB_PATH, block)
+        with self._lock:
+            if key in self._blocks:
+                self._blocks.move_to_end(key)
+                return self._blocks[key]
+        first = block * BLOCK_ROUNDS + 1
+        reduced = _min_max(*_fetch(first, first + BLOCK_ROUNDS - 1))
+        with self._lock:
+            self._blocks[key] = reduced
+            while len(self._blocks) > self.size:
+                self._blocks.popitem(last=False)
+        return reduced
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+blocks = _BlockCache()
+
+
+def crash_series(rounds=None, max_points=MAX_POINTS):
+    # (round ids, crash points) of the last `rounds` rounds (None: all of them),
+    # at most max_points of them
+    first_id, last_id = db.get_round_id_range()
+    if not last_id:
+        return np.empty(0), np.empty(0)
+    if rounds is not None:
+        first_id = max(first_id, last_id - rounds + 1)
+    if last_id - first_id < RAW_ROUNDS:
+        return lttb(*_fetch(first_id, last_id), max_points)
+
+    parts = []
+    # Ids are served from 1, so block b holds ids b * BLOCK_ROUNDS + 1 ..
+    first_block, last_block = (first_id - 1) // BLOCK_ROUNDS, (last_id - 1) // BLOCK_ROUNDS
+    for block in range(first_block, last_block + 1):
+        start, end = block * BLOCK_ROUNDS + 1, (block + 1) * BLOCK_ROUNDS
+        if start >= first_id and end <= last_id:
+            parts.append(blocks.get(block))
+        else:
+            # The partly requested first block and the block still filling up
+            parts.append(_min_max(*_fetch(max(start, first_id), min(end, last_id))))
+    x = np.concatenate([p[0] for p in parts])
+    y = np.concatenate([p[1] for p in parts])
+    return lttb(x, y, max_points)
+
+
+def crash_summary():
+    # Distribution of every round's crash point from the crash_counts table:
+    # {"rounds", "mean", "min", "max", "percentiles": {p: x}, "histogram": [(label, rounds)]}
+    rows = db.get_crash_distribution()
+    if not rows:
+        return None
+    cents, counts = (np.array(column, dtype=np.float64) for column in zip(*rows))
+    values = cents / 100
+    total = counts.sum()
+    cumulative = np.cumsum(counts)
+    # Lowest crash point with at least p% of the rounds at or below it
+    percentiles = {p: float(values[min(np.searchsorted(cumulative, total * p / 100), len(values) - 1)])
+                   for p in PERCENTILES}
+    edges = np.array(HISTOGRAM_EDGES + (np.inf,))
+    binned, _ = np.histogram(values, bins=edges, weights=counts)
+    labels = [f"{low:g}-{high:g}x" for low, high in zip(HISTOGRAM_EDGES, HISTOGRAM_EDGES[1:])]
+    labels.append(f"{HISTOGRAM_EDGES[-1]:g}x+")
+    return {
+        "rounds": int(total),
+        "mean": float((values * counts).sum() / total),
+        "min": float(values[0]),
+        "max": float(values[-1]),
+        "percentiles": percentiles,
+        "histogram": list(zip(labels, binned.astype(int).tolist())),
+    }
@@ -0,0 +1,342 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+from collections import deque
+
+# --- Per-Rerun Profiling ---
+# Each script rerun (or fragment refresh) gets a Profile on the thread that
+# runs it. The UI marks sections as it goes; every db / fair helper reports
+# its calls, SQL statements, rows returned and wall time to the profile of the
+# calling thread. Threads with no profile (the round scheduler, the
+# write-behind flusher) skip all of it.
+#
+# Finished profiles feed process-wide totals, exported as Prometheus text
+# (CRASH_GAME_METRICS_FILE, for node_exporter's textfile collector, or the
+# admin download button) and optionally as one JSON log line per rerun
+# (CRASH_GAME_PROFILE_LOG=1).
+
+# Write one JSON line per rerun to the "crash_game.profile" logger
+PROFILE_LOG = os.environ.get("CRASH_GAME_PROFILE_LOG", "0") == "1"
+
+# Prometheus textfile rewritten after reruns, at most every METRICS_FILE_INTERVAL seconds
+METRICS_FILE = os.environ.get("CRASH_GAME_METRICS_FILE")
+METRICS_FILE_INTERVAL = 10.0
+
+# Finished profiles kept for the admin profiling panel
+RECENT_PROFILES = 200
+
+# Upper bounds (seconds) of the rerun duration histogram
+RERUN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+logger = logging.getLogger("crash_game.profile")
+
+
+class Profile:
+
+    def __init__(self, kind, label=None):
+        self.kind = kind  # "rerun" or a fragment name
+        self.label = label
+        self.started = time.perf_counter()
+        self.last_activity = self.started
+        self.status = None
+        self.total_ms = None
+        self.sections = {}  # name -> wall ms
+        self.queries = {}  # helper -> [calls, statements, rows, ms]
+        self.statements = 0
+        self._section = None  # (name, started)
+        self._helper_depth = 0
+        self._helper = None
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def section(self, name):
+        # Close the open section (if any) and start `name`
+        now = time.perf_counter()
+        if self._section is not None:
+            open_name, started = self._section
+            self.sections[open_name] = self.sections.get(open_name, 0.0) + (now - started) * 1000
+        self._section = (name, now) if name is not None else None
+        self.last_activity = now
+
+    def count_statement(self, sql=None):
+        # SQLite traces trigger bodies as "-- TRIGGER ..." comments; those are not extra statements
+        if sql is not None and sql.startswith("--"):
+            return
+        self.statements += 1
+        if self._helper is not None:
+            self._helper[1] += 1
+
+    def finish(self, status, now=None):
+        now = time.perf_counter() if now is None else now
+        if self._section is not None:
+            open_name, started = self._section
+            self.sections[open_name] = self.sections.get(open_name, 0.0) + (now - started) * 1000
+            self._section = None
+        self.status = status
+        self.total_ms = (now - self.started) * 1000
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "label": self.label,
+            "status": self.status,
+            "ms": round(self.total_ms or 0.0, 3),
+            "statements": self.statements,
+            "sections": {name: round(ms, 3) for name, ms in self.sections.items()},
+            "queries": {
+                name: {"calls": calls, "statements": statements, "rows": rows, "ms": round(ms, 3)}
+                for name, (calls, statements, rows, ms) in self.queries.items()
+            },
+        }
+
+
+class Registry:
+    # Process-wide totals of every finished profile
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = {}  # thread ident -> (thread, profile) not finished yet
+        self.recent = deque(maxlen=RECENT_PROFILES)
+        self.reruns = {}  # (kind, status) -> count
+        self.rerun_buckets = {}  # kind -> counts per RERUN_BUCKETS bound (+Inf last)
+        self.rerun_seconds = {}  # kind -> total seconds
+        self.sections = {}  # section -> [count, seconds]
+        self.queries = {}  # helper -> [calls, statements, rows, seconds]
+        self._metrics_written = 0.0
+
+    def opened(self, thread, profile):
+        # Reruns cut short by st.rerun() / st.stop() never reach end_rerun: the
+        # thread's previous one and those of finished threads are closed here,
+        # at their last recorded activity
+        with self._lock:
+            stale = self._open.pop(thread.ident, None)
+            dead = [ident for ident, (t, _) in self._open.items() if not t.is_alive()]
+            leftovers = [self._open.pop(ident)[1] for ident in dead]
+            self._open[thread.ident] = (thread, profile)
+        if stale is not None:
+            leftovers.append(stale[1])
+        for old in leftovers:
+            old.finish("interrupted", old.last_activity)
+            self.record(old)
+
+    def closed(self, thread):
+        with self._lock:
+            self._open.pop(thread.ident, None)
+
+    def record(self, profile):
+        seconds = profile.total_ms / 1000
+        with self._lock:
+            self.recent.append(profile)
+            key = (profile.kind, profile.status)
+            self.reruns[key] = self.reruns.get(key, 0) + 1
+            buckets = self.rerun_buckets.setdefault(profile.kind, [0] * (len(RERUN_BUCKETS) + 1))
+            for i, bound in enumerate(RERUN_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            buckets[-1] += 1
+            self.rerun_seconds[profile.kind] = self.rerun_seconds.get(profile.kind, 0.0) + seconds
+            for name, ms in profile.sections.items():
+                total = self.sections.setdefault(name, [0, 0.0])
+                total[0] += 1
+                total[1] += ms / 1000
+            for name, (calls, statements, rows, ms) in profile.queries.items():
+                total = self.queries.setdefault(name, [0, 0, 0, 0.0])
+                total[0] += calls
+                total[1] += statements
+                total[2] += rows
+                total[3] += ms / 1000
+            write_metrics = METRICS_FILE and time.monotonic() - self._metrics_written >= METRICS_FILE_INTERVAL
+            if write_metrics:
+                self._metrics_written = time.monotonic()
+        if PROFILE_LOG:
+            logger.info(json.dumps(profile.to_dict()))
+        if write_metrics:
+            self.write_metrics_file(METRICS_FILE)
+
+    def slowest_sections(self, limit=10):
+        # (section, calls, mean ms, worst ms over the recent profiles) by mean time
+        with self._lock:
+            recent = list(self.recent)
+            totals = dict(self.sections)
+        worst = {}
+        for profile in recent:
+            for name, ms in profile.sections.items():
+                worst[name] = max(worst.get(name, 0.0), ms)
+        rows = [(name, count, seconds * 1000 / count, worst.get(name, 0.0)) for name, (count, seconds) in totals.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)[:limit]
+
+    def slowest_queries(self, limit=10):
+        # (helper, calls, statements, rows, mean ms, total ms) by total time
+        with self._lock:
+            totals = dict(self.queries)
+        rows = [
+            (name, calls, statements, fetched, seconds * 1000 / calls, seconds * 1000)
+            for name, (calls, statements, fetched, seconds) in totals.items()
+        ]
+        return sorted(rows, key=lambda row: row[5], reverse=True)[:limit]
+
+    def prometheus_text(self):
+        with self._lock:
+            lines = [
+                "# HELP crash_reruns_total Script reruns and fragment refreshes by outcome.",
+                "# TYPE crash_reruns_total counter",
+            ]
+            for (kind, status), count in sorted(self.reruns.items()):
+                lines.append(f'crash_reruns_total{{kind="{kind}",status="{status}"}} {count}')
+            lines += [
+                "# HELP crash_rerun_seconds Wall time of a rerun or fragment refresh.",
+                "# TYPE crash_rerun_seconds histogram",
+            ]
+            for kind, buckets in sorted(self.rerun_buckets.items()):
+                for bound, count in zip((*RERUN_BUCKETS, "+Inf"), buckets):
+                    lines.append(f'crash_rerun_seconds_bucket{{kind="{kind}",le="{bound}"}} {count}')
+                lines.append(f'crash_rerun_seconds_sum{{kind="{kind}"}} {self.rerun_seconds[kind]:.6f}')
+                lines.append(f'crash_rerun_seconds_count{{kind="{kind}"}} {buckets[-1]}')
+            lines += [
+                "# HELP crash_section_seconds_total Wall time spent rendering each UI section.",
+                "# TYPE crash_section_seconds_total counter",
+            ]
+            for name, (count, seconds) in sorted(self.sections.items()):
+                lines.append(f'crash_section_seconds_total{{section="{name}"}} {seconds:.6f}')
+            lines += [
+                "# HELP crash_section_renders_total Reruns that rendered each UI section.",
+                "# TYPE crash_section_renders_total counter",
+            ]
+            for name, (count, seconds) in sorted(self.sections.items()):
+                lines.append(f'crash_section_renders_total{{section="{name}"}} {count}')
+            for metric, index, help_text in (
+                ("crash_db_calls_total", 0, "Calls of each db helper from a profiled rerun."),
+                ("crash_db_statements_total", 1, "SQL statements executed by each db helper."),
+                ("crash_db_rows_total", 2, "Rows returned by each db helper."),
+                ("crash_db_seconds_total", 3, "Wall time spent in each db helper."),
+            ):
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for name, totals in sorted(self.queries.items()):
+                    value = f"{totals[index]:.6f}" if index == 3 else totals[index]
+                    lines.append(f'{metric}{{helper="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_metrics_file(self, path):
+        # Atomic replace so the collector never reads a half-written file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+registry = Registry()
+_local = threading.local()
+
+
+def current():
+    return getattr(_local, "profile", None)
+
+
+def begin_rerun(kind="rerun", label=None):
+    # Start profiling the rerun running on this thread
+    profile = Profile(kind, label)
+    _local.profile = profile
+    registry.opened(threading.current_thread(), profile)
+    return profile
+
+
+def section(name):
+    # Mark the start of a UI section of the current rerun
+    profile = current()
+    if profile is not None:
+        profile.section(name)
+
+
+def end_rerun(status="ok"):
+    profile = current()
+    if profile is None:
+        return None
+    _local.profile = None
+    registry.closed(threading.current_thread())
+    profile.finish(status)
+    registry.record(profile)
+    return profile
+
+
+class _FragmentProfile:
+    # Profile one fragment refresh on its own, under the fragment's name. When
+    # the fragment runs inside a full rerun, that rerun's profile is set aside
+    # and restored afterwards (its open section keeps the fragment's time).
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.outer = current()
+        self.profile = _local.profile = Profile(self.name)
+        return self.profile
+
+    def __exit__(self, exc_type, exc, tb):
+        # st.rerun() inside a fragment raises to leave it; that is not a failure
+        self.profile.finish("ok" if exc_type is None else "rerun")
+        _local.profile = self.outer
+        registry.record(self.profile)
+        return False
+
+
+def profile_fragment(name):
+    # Decorator for st.fragment bodies: each refresh is recorded as kind=`name`
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _FragmentProfile(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def statement_counter():
+    # Trace callback counting SQL statements into this thread's profile, or None
+    profile = current()
+    return profile.count_statement if profile is not None else None
+
+
+def _row_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])  # parallel column lists, e.g. get_bet_volume
+    return 1
+
+
+def helper(fn):
+    # Wrap a db helper so profiled reruns record its calls, rows and time.
+    # Nested helper calls are attributed to the outermost one.
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = current()
+        if profile is None or profile._helper_depth:
+            return fn(*args, **kwargs)
+        stats = profile.queries.setdefault(fn.__name__, [0, 0, 0, 0.0])
+        profile._helper_depth += 1
+        profile._helper = stats
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            profile._helper_depth -= 1
+            profile._helper = None
+            profile.last_activity = end
+            stats[0] += 1
+            stats[3] += (end - start) * 1000
+        stats[2] += _row_count(result)
+        return result
+    return wrapper
+
+
+def instrument(namespace, names):
+    # Replace the named functions of a module namespace (its globals()) with profiled wrappers
+    for name in names:
+        namespace[name] = helper(namespace[name])
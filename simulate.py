@@ -0,0 +1,221 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import fair
+import engine
+
+# --- Monte Carlo Simulator ---
+# Plays many rounds with the game's own crash-point rules and reports what a
+# bankroll, bet size and auto cash-out target do to the house and the player,
+# so changes to engine.CRASH_TIERS (or the house edge) can be checked before
+# they ship.
+#
+#   solo    engine.tier_crash's rule with the tier of the player's *current* balance,
+#           climbing at that tier's speed
+#   shared  fair crash points under the house edge, at engine.SHARED_SPEED
+#
+# Each grid cell (bet, starting balance, target) runs `sessions` players for
+# up to `rounds` rounds each. The sessions are numpy arrays and the rounds a
+# Python loop, so the tier follows every player's balance; a player stops
+# once the balance can't cover the bet (ruin). Cells are split into chunks
+# of SESSION_CHUNK sessions and run on a process pool.
+#
+#   python simulate.py [--mode solo] [--bets 10,100] [--balances 10000,50000]
+#                      [--targets 1.5,2,3] [--tier 30000:1.0-2.0:0.2 ...]
+
+SESSIONS = int(os.environ.get("CRASH_GAME_SIM_SESSIONS", "10000"))
+ROUNDS = int(os.environ.get("CRASH_GAME_SIM_ROUNDS", "1000"))
+
+# Worker processes (0: one per core)
+WORKERS = int(os.environ.get("CRASH_GAME_SIM_WORKERS", "0")) or os.cpu_count() or 1
+
+# Sessions per worker task
+SESSION_CHUNK = 5000
+
+DEFAULT_BETS = (10.0, 100.0, 1000.0)
+DEFAULT_BALANCES = (10000.0, 20000.0, 50000.0)
+DEFAULT_TARGETS = (1.5, 2.0, 3.0, 5.0)
+
+MODES = ("solo", "shared")
+
+
+def parse_tier(text):
+    # "30000:1.0-2.0:0.2" -> (30000.0, (1.0, 2.0), 0.2); "*" for the catch-all threshold
+    threshold, crash_range, speed = text.split(":")
+    low, high = crash_range.split("-")
+    return (None if threshold.strip() in ("*", "") else float(threshold), (float(low), float(high)), float(speed))
+
+
+def check_tiers(tiers):
+    # Raises ValueError unless the tiers are usable in place of engine.CRASH_TIERS
+    if not tiers or tiers[-1][0] is not None:
+        raise ValueError("The last tier must have no threshold (it catches every other balance)")
+    if any(t[0] is None for t in tiers[:-1]):
+        raise ValueError("Only the last tier may have no threshold")
+    for threshold, (low, high), speed in tiers:
+        if not 1.0 <= low <= high:
+            raise ValueError(f"Crash range {low}-{high} must satisfy 1.0 <= low <= high")
+        if speed <= 0:
+            raise ValueError(f"Speed {speed} must be positive")
+    return tuple(tiers)
+
+
+def _tier_index(balance, thresholds):
+    # engine.tier_for over an array of balances: the first tier whose threshold is passed
+    index = np.full(balance.shape, len(thresholds), dtype=np.intp)
+    for i in range(len(thresholds) - 1, -1, -1):
+        index[balance > thresholds[i]] = i
+    return index
+
+
+def _run_chunk(mode, bet, balance, target, sessions, rounds, tiers, house_edge, seed):
+    # One chunk of sessions of one grid cell; returns sums the caller merges
+    rng = np.random.default_rng(seed)
+    thresholds = [t[0] for t in tiers[:-1]]
+    lows = np.array([t[1][0] for t in tiers])
+    highs = np.array([t[1][1] for t in tiers])
+    speeds = np.array([t[2] for t in tiers])
+
+    balances = np.full(sessions, float(balance))
+    peaks = balances.copy()
+    drawdowns = np.zeros(sessions)
+    played = wins = 0
+    payout_sum = payout_sq = seconds = 0.0
+    win_amount = bet * target
+
+    for _ in range(rounds):
+        active = balances >= bet
+        n_active = int(np.count_nonzero(active))
+        if not n_active:
+            break
+        u = rng.random(sessions)
+        if mode == "solo":
+            tier = _tier_index(balances, thresholds)
+            # engine.tier_crash, vectorised
+            crash = np.round(lows[tier] + (highs[tier] - lows[tier]) * u, 2)
+            speed = speeds[tier]
+        else:
+            crash = fair.uniform_crash_points(u, house_edge)
+            speed = engine.SHARED_SPEED
+        # round_status: the auto cash-out pays when the round reaches it
+        won = active & engine.target_reached(target, crash)
+        n_won = int(np.count_nonzero(won))
+
+        balances -= np.where(active, bet, 0.0)
+        balances += np.where(won, win_amount, 0.0)
+        np.maximum(peaks, balances, out=peaks)
+        np.maximum(drawdowns, peaks - balances, out=drawdowns)
+
+        played += n_active
+        wins += n_won
+        # Per unit staked a round pays `target` or nothing
+        payout_sum += n_won * target
+        payout_sq += n_won * target * target
+        seconds += float(engine.seconds_to(np.minimum(crash, target), speed)[active].sum())
+
+    return {
+        "rounds": played,
+        "wins": wins,
+        "payout_sum": payout_sum,
+        "payout_sq": payout_sq,
+        "seconds": seconds,
+        "ruined": int(np.count_nonzero(balances < bet)),
+        "final_balance": float(balances.sum()),
+        "drawdowns": drawdowns,
+    }
+
+
+def _summary(bet, balance, target, sessions, parts):
+    played = sum(p["rounds"] for p in parts)
+    drawdowns = np.concatenate([p["drawdowns"] for p in parts])
+    wagered = played * bet
+    paid = sum(p["payout_sum"] for p in parts) * bet
+    mean = sum(p["payout_sum"] for p in parts) / played if played else 0.0
+    rtp = paid / wagered if wagered else 0.0
+    return {
+        "bet": bet,
+        "balance": balance,
+        "target": target,
+        "sessions": sessions,
+        "rounds": played,
+        "wagered": wagered,
+        "paid": paid,
+        "rtp": rtp,
+        "house_edge": 1.0 - rtp if wagered else 0.0,
+        "win_rate": sum(p["wins"] for p in parts) / played if played else 0.0,
+        # Of the payout per unit staked, per round
+        "payout_variance": sum(p["payout_sq"] for p in parts) / played - mean * mean if played else 0.0,
+        "mean_round_seconds": sum(p["seconds"] for p in parts) / played if played else 0.0,
+        "mean_final_balance": sum(p["final_balance"] for p in parts) / sessions,
+        "ruin_rate": sum(p["ruined"] for p in parts) / sessions,
+        # Largest peak-to-trough fall of each session's balance
+        "mean_drawdown": float(drawdowns.mean()),
+        "p95_drawdown": float(np.percentile(drawdowns, 95)),
+        "max_drawdown": float(drawdowns.max()),
+    }
+
+
+def simulate(bets=DEFAULT_BETS, balances=DEFAULT_BALANCES, targets=DEFAULT_TARGETS, mode="solo",
+             sessions=SESSIONS, rounds=ROUNDS, tiers=engine.CRASH_TIERS, house_edge=fair.HOUSE_EDGE,
+             workers=WORKERS, seed=None):
+    # One summary dict per (bet, balance, target) cell, in grid order.
+    # The same seed gives the same results for any number of workers.
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r} (expected one of {', '.join(MODES)})")
+    tiers = check_tiers(tiers)
+    cells = [(float(b), float(bal), float(t)) for b in bets for bal in balances for t in targets]
+    chunks = [min(SESSION_CHUNK, sessions - start) for start in range(0, sessions, SESSION_CHUNK)]
+    seeds = iter(np.random.SeedSequence(seed).spawn(len(cells) * len(chunks)))
+    tasks = [(mode, b, bal, t, n, rounds, tiers, house_edge, next(seeds)) for b, bal, t in cells for n in chunks]
+
+    if workers > 1 and len(tasks) > 1:
+        # spawn, not fork: the app process runs threads that hold locks
+        # (connection pool, scheduler) a forked child would inherit mid-use
+        with ProcessPoolExecutor(min(workers, len(tasks)), mp_context=multiprocessing.get_context("spawn")) as pool:
+            parts = list(pool.map(_run_chunk, *zip(*tasks)))
+    else:
+        parts = [_run_chunk(*task) for task in tasks]
+
+    return [_summary(b, bal, t, sessions, parts[i * len(chunks):(i + 1) * len(chunks)])
+            for i, (b, bal, t) in enumerate(cells)]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    def numbers(text):
+        return [float(x) for x in text.split(",") if x.strip()]
+
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of crash points and auto cash-out strategies")
+    parser.add_argument("--mode", choices=MODES, default="solo")
+    parser.add_argument("--bets", type=numbers, default=DEFAULT_BETS, help="comma-separated bet sizes")
+    parser.add_argument("--balances", type=numbers, default=DEFAULT_BALANCES, help="comma-separated starting balances")
+    parser.add_argument("--targets", type=numbers, default=DEFAULT_TARGETS, help="comma-separated auto cash-out targets")
+    parser.add_argument("--sessions", type=int, default=SESSIONS, help="players per grid cell")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="rounds per player")
+    parser.add_argument("--tier", type=parse_tier, action="append",
+                        help="balance tier as min_balance:low-high:speed, highest first, '*' for the last "
+                             "(default: engine.CRASH_TIERS)")
+    parser.add_argument("--house-edge", type=float, default=fair.HOUSE_EDGE, help="shared mode house edge")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = simulate(args.bets, args.balances, args.targets, args.mode, args.sessions, args.rounds,
+                    args.tier or engine.CRASH_TIERS, args.house_edge, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+    total = sum(r["rounds"] for r in rows)
+
+    print(f"{'bet':>8} {'balance':>9} {'target':>6} {'rounds':>11} {'RTP':>7} {'edge':>7} {'win':>6} "
+          f"{'payout var':>10} {'round s':>7} {'ruin':>6} {'mean dd':>10} {'p95 dd':>10} {'max dd':>10}")
+    for r in rows:
+        print(f"{r['bet']:>8,.0f} {r['balance']:>9,.0f} {r['target']:>6.2f} {r['rounds']:>11,} "
+              f"{r['rtp']:>7.2%} {r['house_edge']:>7.2%} {r['win_rate']:>6.1%} {r['payout_variance']:>10.3f} "
+              f"{r['mean_round_seconds']:>7.2f} {r['ruin_rate']:>6.1%} {r['mean_drawdown']:>10,.0f} "
+              f"{r['p95_drawdown']:>10,.0f} {r['max_drawdown']:>10,.0f}")
+    print(f"{total:,} rounds in {elapsed:.1f} s ({total / elapsed:,.0f} rounds/sec, {args.workers} worker(s))")
@@ -0,0 +1,13 @@
+import pytest
+
+import db
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    # A fresh, migrated SQLite database for one test; the previous one is restored afterwards
+    previous = db.DB_PATH
+    db.configure(str(tmp_path / "test.db"))
+    db.migrate()
+    yield
+    db.configure(previous)
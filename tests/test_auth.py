@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+import auth
+
+
+def test_hashing_timeout_raises_hashing_busy():
+    pool = auth.HashingPool(workers=1, queue_size=0)
+    release = threading.Event()
+    with pytest.raises(auth.HashingBusy):
+        pool.run(release.wait, timeout=0.05)
+    # The slot is still taken until the stuck hash finishes
+    with pytest.raises(auth.HashingBusy):
+        pool.run(lambda: None)
+    release.set()
+    pool._executor.shutdown(wait=True)
+    assert pool.rejected == 2
+
+
+def test_hashes_round_trip():
+    stored = auth.make_hash("secret", "pbkdf2_sha256")
+    assert auth.check_hash("secret", stored)
+    assert not auth.check_hash("wrong", stored)
+
+
+def test_login_limiter_blocks_a_username_and_a_client():
+    limiter = auth.LoginRateLimiter(max_failures=2, window=60, max_client_failures=3)
+    limiter.failed("alice", "10.0.0.1", now=0)
+    limiter.failed("alice", "10.0.0.1", now=1)
+    assert limiter.retry_after("alice", "10.0.0.2", now=2) == 58
+    # Random usernames from one address run into the address limit
+    limiter.failed("bob", "10.0.0.1", now=2)
+    assert limiter.retry_after("carol", "10.0.0.1", now=3) == 57
+    assert limiter.retry_after("carol", "10.0.0.2", now=3) == 0
+    # Logging in clears the username, not the address
+    limiter.succeeded("alice")
+    assert limiter.retry_after("alice", now=3) == 0
+    assert limiter.retry_after("alice", "10.0.0.1", now=3) == 57
+
+
+def test_login_limiter_forgets_expired_and_excess_keys():
+    limiter = auth.LoginRateLimiter(max_failures=5, window=60, max_keys=100)
+    for i in range(1000):
+        limiter.failed(f"random{i}", now=0)
+    assert len(limiter._failures) == 100
+    limiter.failed("later", now=61)
+    assert list(limiter._failures) == [("user", "later")]
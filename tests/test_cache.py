@@ -0,0 +1,27 @@
+from cache import ReadCache
+
+
+def test_invalidated_entry_is_reloaded_on_next_read():
+    cache = ReadCache(ttl=60)
+    loads = []
+    load = lambda: loads.append(1) or len(loads)
+    assert cache.get("users", "alice", load) == 1
+    assert cache.get("users", "alice", load) == 1
+    cache.invalidate("users")
+    assert cache.get("users", "alice", load) == 2
+    assert cache.get("rounds", "last", load) == 3
+    cache.invalidate("users")
+    # Other tags are untouched
+    assert cache.get("rounds", "last", load) == 3
+
+
+def test_size_cap_evicts_the_least_recently_used():
+    cache = ReadCache(ttl=60, size=2)
+    cache.get("users", "a", lambda: "a")
+    cache.get("users", "b", lambda: "b")
+    cache.get("users", "a", lambda: "reloaded")  # a is now the most recently used
+    cache.get("users", "c", lambda: "c")
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("users", "a", lambda: "reloaded") == "a"
+    assert cache.get("users", "b", lambda: "reloaded") == "reloaded"
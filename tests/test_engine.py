@@ -0,0 +1,34 @@
+import pytest
+
+import engine
+import simulate
+
+
+def test_auto_cashout_at_the_crash_point_pays():
+    current = engine.new_round("player", 100.0, 2.0, 0.1, auto_cashout=2.0, now=0.0)
+    assert engine.round_status(current, now=engine.seconds_to(2.0, 0.1)) == ("auto_cashout", 2.0)
+
+
+def test_auto_cashout_above_the_crash_point_loses():
+    current = engine.new_round("player", 100.0, 2.0, 0.1, auto_cashout=2.01, now=0.0)
+    assert engine.round_status(current, now=engine.seconds_to(2.01, 0.1)) == ("crashed", 2.0)
+
+
+def test_scheduler_pays_a_target_equal_to_the_crash_point():
+    settled = []
+    scheduler = engine.RoundScheduler(lambda username, amount: True, lambda *args: settled.append(args) or 1,
+                                      draw=lambda: (2.0, None))
+    round_no, _ = scheduler.place_bet("at", 10.0, 2.0)
+    scheduler.place_bet("above", 10.0, 2.01)
+    scheduler.tick(scheduler.betting_ends)
+    scheduler.tick(scheduler.crashes_at)
+    assert scheduler.result_for("at", round_no) == (2.0, 20.0)
+    assert scheduler.result_for("above", round_no) == (None, 0.0)
+    assert len(settled) == 1
+
+
+def test_simulated_rtp_matches_the_house_edge():
+    rows = simulate.simulate((1.0,), (1e12,), (1.01, 2.0), mode="shared", sessions=20000, rounds=50,
+                             house_edge=0.01, workers=1, seed=0)
+    for row in rows:
+        assert row["rtp"] == pytest.approx(0.99, abs=0.01)
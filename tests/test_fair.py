@@ -0,0 +1,47 @@
+import hashlib
+
+import fair
+
+
+def test_draws_cross_a_chain_boundary_without_skipping(temp_db, monkeypatch):
+    ensure_chain = fair.ensure_chain
+    monkeypatch.setattr(fair, "ensure_chain", lambda: ensure_chain(length=3))
+
+    draws = [fair.next_draw() for _ in range(7)]  # chains of 3: two boundaries crossed
+    assert [d[0] for d in draws] == list(range(1, 8))
+    assert len(fair.get_commitments()) == 3
+    for idx, h, crash, _ in draws:
+        proof = fair.verify(idx)
+        assert proof["crash_ok"] and proof["link_ok"]
+        assert proof["crash_multiplier"] == crash
+
+    # Within a chain each served hash is the sha256 preimage of the one before
+    hashes = [d[1] for d in draws]
+    assert hashlib.sha256(hashes[1]).digest() == hashes[0]
+    assert hashlib.sha256(hashes[4]).digest() == hashes[3]
+    # The first hash of a chain links to that chain's published commitment
+    commitments = {first_idx: commitment for _, first_idx, _, _, commitment, _ in fair.get_commitments()}
+    assert hashlib.sha256(hashes[3]).hexdigest() == commitments[4]
+
+
+def test_shared_round_number_is_the_verified_round(temp_db, monkeypatch):
+    import db
+    import engine
+
+    ensure_chain = fair.ensure_chain
+    monkeypatch.setattr(fair, "ensure_chain", lambda: ensure_chain(length=10))
+    db.add_user("player", "secret")
+    # A solo round already holds rounds.id 1, as after migration 4
+    db.record_round(2.0, [], mode="solo")
+
+    scheduler = engine.RoundScheduler(db.place_bet, db.record_round, draw=fair.next_crash,
+                                      reserve=db.reserve_round_id)
+    round_no, message = scheduler.place_bet("player", 10.0, 1.01)
+    assert round_no == 2 and "#2" in message
+    scheduler.tick(scheduler.betting_ends)
+    scheduler.tick(scheduler.crashes_at)
+    assert scheduler.result_for("player", round_no) is not None
+
+    proof = fair.verify_round(round_no)
+    assert proof["round_ok"]
+    assert proof["chain_idx"] == scheduler.chain_idx
@@ -0,0 +1,52 @@
+import pytest
+
+import db
+import writer
+
+
+@pytest.fixture
+def write_behind(temp_db):
+    # A running queue whose thread never flushes on its own during the test
+    queue = writer.WriteBehind(flush_interval=3600, flush_size=10000).start()
+    yield queue
+    queue.stop()
+
+
+def event_count():
+    with db.connection() as c:
+        return c.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+def test_failed_batch_is_retried_on_the_next_flush(write_behind, monkeypatch):
+    def down(c, rows):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setitem(db.BATCH_WRITERS, "event", down)
+    db.log_event("login", "player")
+    assert write_behind.flush() == 0
+    assert write_behind.metrics()["retrying"] == 1
+    assert write_behind.metrics()["failed"] == 1
+
+    monkeypatch.undo()
+    assert write_behind.flush() == 1
+    assert event_count() == 1
+    assert write_behind.metrics()["dropped"] == 0
+
+
+def test_batch_out_of_retries_drops_only_the_failing_rows(write_behind, monkeypatch):
+    write_events = db.BATCH_WRITERS["event"]
+
+    def reject_bad(c, rows):
+        if any(row[0] == "bad" for row in rows):
+            raise ValueError("bad row")
+        write_events(c, rows)
+
+    monkeypatch.setitem(db.BATCH_WRITERS, "event", reject_bad)
+    for kind in ("login", "bad", "logout"):
+        db.log_event(kind, "player")
+    for _ in range(writer.FLUSH_RETRIES - 1):
+        assert write_behind.flush() == 0
+    assert write_behind.flush() == 2
+    assert event_count() == 2
+    assert write_behind.metrics()["dropped"] == 1
+    assert write_behind.metrics()["retrying"] == 0
@@ -0,0 +1,174 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+
+import db
+from cache import invalidate
+
+# --- Write-Behind Queue ---
+# Non-balance writes (ledger-only bet rows, last_login, analytics events) can be
+# queued and flushed by a background thread in batched transactions, so the
+# request path never waits on their fsync. Balance-affecting writes (place_bet,
+# settlement) never go through here and stay synchronous.
+
+# Set CRASH_GAME_WRITE_BEHIND=0 to write everything synchronously
+WRITE_BEHIND_ENABLED = os.environ.get("CRASH_GAME_WRITE_BEHIND", "1") != "0"
+
+# Flush whenever this many seconds pass or this many writes are waiting
+FLUSH_INTERVAL = float(os.environ.get("CRASH_GAME_FLUSH_INTERVAL", "0.5"))
+FLUSH_SIZE = int(os.environ.get("CRASH_GAME_FLUSH_SIZE", "500"))
+
+# Writes allowed to wait before submit() falls back to a synchronous write
+MAX_QUEUE = int(os.environ.get("CRASH_GAME_WRITE_QUEUE", "10000"))
+
+# Flushes a failed batch gets (one per FLUSH_INTERVAL) before it is written
+# row by row, so only rows that fail on their own are dropped
+FLUSH_RETRIES = int(os.environ.get("CRASH_GAME_FLUSH_RETRIES", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehind:
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE, max_queue=MAX_QUEUE):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # set when a full batch is waiting
+        self._thread = None
+        self._retry = None  # (batch, failed attempts) of a batch waiting to be written again
+        # metrics
+        self.submitted = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.rejected = 0  # queue full: caller wrote synchronously instead
+        self.failed = 0  # flushes that failed
+        self.dropped = 0  # rows given up on after FLUSH_RETRIES
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def submit(self, kind, row):
+        # Queue one write; False tells the caller to write it synchronously
+        if self._thread is None or self._stop.is_set():
+            return False
+        try:
+            self._queue.put_nowait((kind, row))
+        except queue.Full:
+            self.rejected += 1
+            return False
+        self.submitted += 1
+        if self._queue.qsize() >= self.flush_size:
+            self._wake.set()
+        return True
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.flush_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        # One transaction for the batch; raises if it could not be written
+        grouped = {}
+        for kind, row in batch:
+            grouped.setdefault(kind, []).append(row)
+        start = time.perf_counter()
+        with db.transaction() as c:
+            for kind, rows in grouped.items():
+                db.BATCH_WRITERS[kind](c, rows)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self.flushes += 1
+        self.flushed += len(batch)
+        invalidate(*{tag for kind in grouped for tag in db.BATCH_INVALIDATES[kind]})
+
+    def _write_rows(self, batch):
+        # Last resort for a batch that keeps failing: one transaction per row
+        written = 0
+        for kind, row in batch:
+            try:
+                self._write([(kind, row)])
+                written += 1
+            except Exception:
+                self.dropped += 1
+                logger.exception("Dropped queued %s write %r", kind, row)
+        return written
+
+    def flush(self, final=False):
+        # Write everything queued so far; returns the number of rows written.
+        # A batch that fails is kept and retried first on the next flush (the
+        # rows behind it keep queueing, and overflow is written synchronously
+        # by submit's callers). After FLUSH_RETRIES failures, or on the final
+        # flush at stop(), it is written row by row instead.
+        with self._flush_lock:
+            written = 0
+            while True:
+                if self._retry is not None:
+                    batch, attempts = self._retry
+                    self._retry = None
+                else:
+                    batch, attempts = self._drain(), 0
+                if not batch:
+                    return written
+                try:
+                    self._write(batch)
+                except Exception:
+                    self.failed += 1
+                    attempts += 1
+                    if attempts < FLUSH_RETRIES and not final:
+                        logger.warning("Flushing %d queued writes failed (attempt %d of %d), retrying",
+                                       len(batch), attempts, FLUSH_RETRIES, exc_info=True)
+                        self._retry = (batch, attempts)
+                        return written
+                    logger.exception("Flushing %d queued writes failed, writing them one by one", len(batch))
+                    written += self._write_rows(batch)
+                    continue
+                written += len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+            db.set_write_behind(self)
+            atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        # Stop accepting writes and flush whatever is still queued
+        db.set_write_behind(None)
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush(final=True)
+
+    def metrics(self):
+        retry = self._retry
+        return {
+            "queue_depth": self._queue.qsize(),
+            "submitted": self.submitted,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "rejected": self.rejected,
+            "retrying": len(retry[0]) if retry is not None else 0,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+        }